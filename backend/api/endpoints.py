@@ -1,22 +1,41 @@
+import asyncio
+import hashlib
+import json
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
 from ninja import Router
-from .schemas import PobDecodeRequest, PobDecodeResponseAny, PobPriceResponseAny
-from parsing.decoder.pob_decoder import pob_xml_to_json, decode_pob_code
-from parsing.pricer.poeninja_pricer import add_prices_to_json
+from .schemas import PobBatchPriceRequest, PobDecodeRequest, PobDecodeResponseAny, PobPriceRequest, PobPriceResponseAny
+from parsing.decoder.pob_decoder import decode_pob_to_json
+from parsing.metrics import METRICS_ENABLED, registry, stage
+from parsing.pricer.economy import ECONOMY_MAX_AGE, get_economy
+from parsing.pricer.batch_pricer import aprice_pob_batch
+from parsing.pricer.poeninja_pricer import (
+    aget_league_prices,
+    apply_league_prices,
+    apply_prices,
+    aresolve_league_prices,
+    normalize_leagues,
+    resolve_league_prices,
+    resolve_prices,
+)
+from parsing.pricer.result_cache import aprice_pob_cached, aprice_pob_leagues
 
 router = Router()
+metrics_router = Router()
+economy_router = Router()
 
 @router.post("/decode", response=PobDecodeResponseAny, tags=["Parsing"])
-def decode_pob_endpoint(request, payload: PobDecodeRequest):
+async def decode_pob_endpoint(request, payload: PobDecodeRequest):
     """
     Decode a PoB string sent in the JSON body and return a structured JSON.
+    Decoding runs on a worker thread so the event loop keeps serving other requests.
     General skeleton of the response is in "docs/parsing_route_response_exemple" (in root folder), with a complete exemple ("parser_exemple.json" file)
     """
     try:
-        # Decode the PoB code into XML
-        pob_xml = decode_pob_code(payload.pob_string)
-
-        # Convert the XML into structured JSON
-        parsed_data = pob_xml_to_json(pob_xml)
+        # Decode the PoB code and convert the streamed XML into structured JSON
+        parsed_data = await asyncio.to_thread(decode_pob_to_json, payload.pob_string)
 
         return {"data": parsed_data}
 
@@ -26,22 +45,102 @@ def decode_pob_endpoint(request, payload: PobDecodeRequest):
 
 
 @router.post("/price", response=PobPriceResponseAny, tags=["Parsing"])
-def price_pob_endpoint(request, payload: PobDecodeRequest):
+async def price_pob_endpoint(request, payload: PobPriceRequest):
     """
     Decode a PoB string from the JSON body, convert it into structured JSON,
     and enrich it with prices using add_prices_to_json().
+    Prices are those of "league" (Standard by default), as of the "as_of" date when given.
+    With "leagues", the build is decoded once and priced in every league of the list
+    (prices by league on each item and gem, the first league in the usual fields).
+    Identical PoB codes are served from a result cache until the league prices change.
+    Upstream price fetches are awaited without holding a worker thread.
     General skeleton of the response is in "docs/parsing_route_response_exemple" (in root folder), with a complete exemple ("pricer_exemple.json"):
 
     """
     try:
-        # Decode the PoB into JSON
-        pob_xml = decode_pob_code(payload.pob_string)
-        parsed_data = pob_xml_to_json(pob_xml)
-
-        # Add pricing data
-        priced_data = add_prices_to_json(parsed_data)
+        if payload.leagues:
+            # One decode, prices of every league resolved concurrently
+            priced_data = await aprice_pob_leagues(payload.pob_string, payload.leagues, as_of=payload.as_of)
+        else:
+            # Decode the PoB into JSON and add pricing data (cached per PoB code and price snapshot)
+            priced_data = await aprice_pob_cached(payload.pob_string, league=payload.league, as_of=payload.as_of)
 
         return {"data": priced_data}
 
     except Exception as e:
         return {"data": {"error": str(e)}}
+
+
+@router.post("/price/batch", tags=["Parsing"])
+async def price_pob_batch_endpoint(request, payload: PobBatchPriceRequest):
+    """
+    Price a list of PoB strings with the prices of one league, or of every league of "leagues"
+    (and "as_of" date). Prices are resolved once and shared by the whole batch (current prices with
+    the async pricer, price history through the ORM with sync_to_async), codes are decoded
+    in parallel (over a process pool for large batches).
+    The response is streamed as JSON lines, one line per build in input order:
+    {"index": position in "pob_strings", "data": same content as the "/price" route}
+    Lines come from an async generator, so under ASGI each one is sent as soon as it is priced.
+    """
+    try:
+        # Price history goes through the (synchronous) ORM, current prices through the async pricer
+        if payload.leagues:
+            leagues = normalize_leagues(payload.leagues)
+            if payload.as_of is not None:
+                prices_by_league, errors = await sync_to_async(resolve_league_prices)(leagues, payload.as_of)
+            else:
+                prices_by_league, errors = await aresolve_league_prices(leagues)
+            prices, apply = prices_by_league, partial(apply_league_prices, errors=errors)
+        else:
+            if payload.as_of is not None:
+                prices = await sync_to_async(resolve_prices)(payload.league, payload.as_of)
+            else:
+                with stage("prices"):
+                    prices = await aget_league_prices(payload.league)
+            apply = apply_prices
+    except Exception as e:
+        return {"data": {"error": str(e)}}
+
+    results = aprice_pob_batch(payload.pob_strings, prices, apply=apply)
+    lines = (json.dumps(result, ensure_ascii=False) + "\n" async for result in results)
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+@metrics_router.get("", tags=["Metrics"])
+def metrics_endpoint(request):
+    """
+    Totals of the tracked requests since the server started: number of requests,
+    per-stage durations (count, total, mean and max in ms) and counters
+    (poe.ninja fetches, cache hits/misses, gem fallbacks...).
+    The same values are sent per request in the "Server-Timing" response header.
+    """
+    if not METRICS_ENABLED:
+        return {"data": {"error": "Metrics are disabled (POE_METRICS_ENABLED)"}}
+    return {"data": registry.snapshot()}
+
+
+@economy_router.get("", tags=["Economy"])
+def economy_endpoint(request, response: HttpResponse, league: str = None):
+    """
+    Active leagues and the currency rates (chaos value of every currency, chaos per divine)
+    of "league" (current challenge league by default), read from the backend price snapshots,
+    so clients share the server cache instead of calling poe.ninja themselves.
+    Responses carry Cache-Control, Last-Modified and ETag headers, and "If-None-Match" gets a 304.
+    """
+    try:
+        data = get_economy(league)
+    except Exception as e:
+        return {"data": {"error": str(e)}}
+
+    etag = '"%s"' % hashlib.md5(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={ECONOMY_MAX_AGE}"}
+    if data["fetchedAt"]:
+        headers["Last-Modified"] = http_date(data["fetchedAt"])
+    if request.headers.get("If-None-Match") == etag:
+        not_modified = HttpResponseNotModified()
+        for name, value in headers.items():
+            not_modified[name] = value
+        return not_modified
+    for name, value in headers.items():
+        response[name] = value
+    return {"data": data}
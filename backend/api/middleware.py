@@ -0,0 +1,35 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from parsing.metrics import METRICS_ENABLED, track_request
+
+
+class ServerTimingMiddleware:
+    """
+    Track the stage durations and counters of each request (see parsing/metrics.py),
+    add them to the response as a "Server-Timing" header and to the totals of /api/metrics.
+    Removed from the middleware chain when POE_METRICS_ENABLED is off.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        if not METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with track_request() as metrics:
+            response = self.get_response(request)
+        response["Server-Timing"] = metrics.server_timing()
+        return response
+
+    async def __acall__(self, request):
+        with track_request() as metrics:
+            response = await self.get_response(request)
+        response["Server-Timing"] = metrics.server_timing()
+        return response
@@ -1,6 +1,8 @@
 from ninja import NinjaAPI
-from api.endpoints import router as pob_router
+from api.endpoints import economy_router, metrics_router, router as pob_router
 
 api = NinjaAPI()
 
-api.add_router("/pob/", pob_router)
\ No newline at end of file
+api.add_router("/pob/", pob_router)
+api.add_router("/metrics", metrics_router)
+api.add_router("/economy", economy_router)
\ No newline at end of file
@@ -1,5 +1,7 @@
-from ninja import Schema
-from typing import Any, Dict
+from ninja import Field, Schema
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from parsing.pricer.batch_pricer import BATCH_MAX_CODES
 
 class PobDecodeResponseAny(Schema):
     data: Dict[str, Any]
@@ -7,5 +9,17 @@ class PobDecodeResponseAny(Schema):
 class PobDecodeRequest(Schema):
     pob_string: str
 
+class PobPriceRequest(Schema):
+    pob_string: str
+    league: str = "Standard"
+    leagues: Optional[List[str]] = None  # Price in every league of the list instead of "league"
+    as_of: Optional[datetime] = None  # Price with the stored price history at this date
+
+class PobBatchPriceRequest(Schema):
+    pob_strings: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_CODES)
+    league: str = "Standard"
+    leagues: Optional[List[str]] = None
+    as_of: Optional[datetime] = None
+
 class PobPriceResponseAny(Schema):
     data: Dict[str, Any]
\ No newline at end of file
@@ -0,0 +1,274 @@
+import base64
+import json
+import os
+import random
+import zlib
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from parsing.decoder.pob_decoder import BASE_TYPE_INDEX, decode_pob_to_json
+from parsing.pricer.fetcher import FetchResult, fetch_categories
+from parsing.pricer.poeninja_pricer import CURRENCY_CATEGORY, GEM_CATEGORY, UNIQUE_CATEGORIES
+
+# -------------------
+# Corpus location
+# -------------------
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+POB_CODES_FILE = "pob_codes.txt"
+NINJA_DIR = "ninja"
+NINJA_CATEGORIES = UNIQUE_CATEGORIES + [GEM_CATEGORY, CURRENCY_CATEGORY]
+
+# Same seed -> same corpus, so timings of two runs compare the same work
+DEFAULT_SEED = 1337
+DEFAULT_BUILDS = 40
+UNIQUES_PER_CATEGORY = 400
+GEM_NAMES = 600
+
+CLASSES = [
+    ("Witch", "Necromancer"), ("Ranger", "Deadeye"), ("Marauder", "Juggernaut"),
+    ("Duelist", "Slayer"), ("Templar", "Inquisitor"), ("Shadow", "Trickster"), ("Scion", "Ascendant"),
+]
+SLOTS = ["Helmet", "Body Armour", "Gloves", "Boots", "Weapon 1", "Weapon 2", "Amulet", "Ring 1", "Ring 2", "Belt"]
+GEM_VARIANTS = [(1, 0), (16, 20), (20, 0), (20, 20), (21, 0), (21, 20), (20, 23), (21, 23), (5, 20), (6, 20), (3, 0), (4, 0)]
+
+
+# -------------------
+# Names shared by the PoB codes and the poe.ninja fixtures
+# -------------------
+def unique_names(category: str) -> list:
+    return [f"{category} Unique {i}" for i in range(UNIQUES_PER_CATEGORY)]
+
+def gem_names() -> list:
+    names = []
+    for i in range(GEM_NAMES):
+        if i % 20 == 0:
+            names.append(f"Awakened Gem {i} Support")
+        elif i % 20 == 1:
+            names.append(f"Empower Gem {i} Support")
+        elif i % 3 == 0:
+            names.append(f"Gem {i} Support")
+        else:
+            names.append(f"Gem {i}")
+    return names
+
+
+# -------------------
+# poe.ninja fixtures
+# -------------------
+def sparkline(rng: random.Random) -> dict:
+    # Real lines carry these unused history fields, kept for realistic payload sizes
+    return {"data": [round(rng.uniform(-10, 10), 2) for _ in range(7)], "totalChange": round(rng.uniform(-50, 50), 2)}
+
+def make_ninja_payloads(seed: int = DEFAULT_SEED) -> dict:
+    """
+    Build poe.ninja shaped payloads (category -> JSON) for every category the pricer fetches.
+    """
+    rng = random.Random(seed)
+    bases = sorted(BASE_TYPE_INDEX)
+    payloads = {}
+
+    for category in UNIQUE_CATEGORIES:
+        lines = []
+        for i, name in enumerate(unique_names(category)):
+            base = rng.choice(bases)
+            line = {
+                "id": len(lines), "name": name, "baseType": base, "chaosValue": round(rng.uniform(1, 5000), 2),
+                "divineValue": 0, "count": rng.randint(1, 500), "listingCount": rng.randint(1, 500),
+                "sparkline": sparkline(rng), "lowConfidenceSparkline": sparkline(rng), "implicitModifiers": [],
+                "explicitModifiers": [{"text": f"+{rng.randint(1, 100)} to something", "optional": False}],
+                "detailsId": name.lower().replace(" ", "-"), "itemClass": 3,
+            }
+            lines.append(line)
+            if category in ("UniqueArmour", "UniqueWeapon") and i % 4 == 0:
+                for links in (5, 6):
+                    lines.append(dict(line, id=len(lines), links=links, chaosValue=line["chaosValue"] * links))
+        payloads[category] = {"lines": lines}
+
+    gem_lines = []
+    for name in gem_names():
+        for level, quality in GEM_VARIANTS:
+            gem_lines.append({
+                "id": len(gem_lines), "name": name, "baseType": name, "variant": f"{level}/{quality}",
+                "gemLevel": level, "gemQuality": quality, "corrupted": level > 20 or quality > 20,
+                "chaosValue": round(rng.uniform(1, 300), 2), "divineValue": 0, "listingCount": rng.randint(1, 200),
+                "sparkline": sparkline(rng), "lowConfidenceSparkline": sparkline(rng),
+                "explicitModifiers": [], "detailsId": f"{name.lower().replace(' ', '-')}-{level}-{quality}",
+            })
+    payloads[GEM_CATEGORY] = {"lines": gem_lines}
+
+    payloads[CURRENCY_CATEGORY] = {"lines": [
+        {"currencyTypeName": "Divine Orb", "chaosEquivalent": 210.5, "detailsId": "divine-orb"},
+        {"currencyTypeName": "Exalted Orb", "chaosEquivalent": 14.2, "detailsId": "exalted-orb"},
+        {"currencyTypeName": "Orb of Alchemy", "chaosEquivalent": 0.3, "detailsId": "orb-of-alchemy"},
+    ]}
+    return payloads
+
+
+# -------------------
+# PoB codes
+# -------------------
+def make_item_text(rng: random.Random, rarity: str, name: str, base: str, sockets: str) -> str:
+    lines = [
+        f"Rarity: {rarity}", name, base,
+        f"Unique ID: {rng.getrandbits(128):032x}",
+        f"Item Level: {rng.randint(60, 86)}",
+        f"Quality: {rng.choice([0, 20])}",
+        f"Sockets: {sockets}",
+        f"LevelReq: {rng.randint(40, 70)}",
+        "Implicits: 1",
+        f"+{rng.randint(10, 30)} to maximum Life",
+    ]
+    lines += [f"+{rng.randint(1, 100)}% increased Stat {rng.randint(1, 50)}" for _ in range(rng.randint(3, 6))]
+    if rng.random() < 0.2:
+        lines.append("Corrupted")
+    return "\n".join(lines)
+
+def make_pob_xml(rng: random.Random, ninja_names: dict, gems: list) -> str:
+    """
+    Build a PoB XML with items, skills and the large sections a real export carries (Calcs, Tree, Notes, Config),
+    in the order PoB writes them: Build, Import, Calcs, Skills, Tree, Notes, TreeView, Items, Config.
+    """
+    class_name, ascendancy = rng.choice(CLASSES)
+    bases = sorted(BASE_TYPE_INDEX)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        "<PathOfBuilding>",
+        f'<Build level="{rng.randint(85, 100)}" className="{class_name}" ascendClassName="{ascendancy}" '
+        'targetVersion="3_0" mainSocketGroup="1">',
+    ]
+    parts += [f'<PlayerStat stat="Stat{i}" value="{rng.uniform(0, 10000):.2f}"/>' for i in range(120)]
+    parts.append("</Build>")
+    parts.append('<Import lastAccountHash="" lastCharacterHash="" lastRealm="PC"/>')
+
+    # Skills: 6 links in the body armour, smaller groups elsewhere
+    skill_parts = ['<Skills activeSkillSet="1"><SkillSet id="1">']
+    for slot in SLOTS:
+        size = 6 if slot == "Body Armour" else rng.randint(1, 4)
+        skill_parts.append(f'<Skill slot="{slot}" enabled="true" mainActiveSkill="1">')
+        for _ in range(size):
+            name = rng.choice(gems)
+            level, quality = rng.choice(GEM_VARIANTS)
+            skill_parts.append(
+                f'<Gem nameSpec={quoteattr(name)} skillId="{name.replace(" ", "")}" level="{level}" '
+                f'quality="{quality}" enabled="true" count="1" gemId="Metadata/Items/Gems/{name.replace(" ", "")}"/>'
+            )
+        skill_parts.append("</Skill>")
+    skill_parts.append("</SkillSet></Skills>")
+
+    # Items: half uniques priced by the fixtures, half rares
+    item_parts = ['<Items activeItemSet="1">']
+    for item_id in range(1, rng.randint(14, 22)):
+        base = rng.choice(bases)
+        sockets = "-".join(rng.choice("RGB") for _ in range(rng.randint(1, 6)))
+        if rng.random() < 0.5:
+            category = rng.choice(UNIQUE_CATEGORIES)
+            text = make_item_text(rng, "UNIQUE", rng.choice(ninja_names[category]), base, sockets)
+        else:
+            text = make_item_text(rng, "RARE", f"Rare Item {item_id}", base, sockets)
+        item_parts.append(f'<Item id="{item_id}">{escape(text)}</Item>')
+    item_parts.append('<ItemSet id="1">')
+    item_parts += [f'<Slot name="{slot}" itemId="{i + 1}"/>' for i, slot in enumerate(SLOTS)]
+    item_parts.append("</ItemSet></Items>")
+
+    # Sections never used by the decoder, but often the largest part of a real export
+    tree = ['<Tree activeSpec="1"><Spec treeVersion="3_25" classId="3" ascendClassId="1">']
+    tree.append("<URL>https://www.pathofexile.com/passive-skill-tree/" + "A" * rng.randint(400, 800) + "</URL>")
+    tree.append('<Sockets>' + "".join(f'<Socket nodeId="{n}" itemId="0"/>' for n in range(40)) + "</Sockets>")
+    tree.append("</Spec></Tree>")
+    notes = "<Notes>" + escape(" ".join(f"note{rng.randint(0, 99999)}" for _ in range(rng.randint(200, 3000)))) + "</Notes>"
+    calcs = "<Calcs>" + "".join(f'<Input name="input{i}" number="{i}"/>' for i in range(300)) + "</Calcs>"
+    tree_view = '<TreeView searchStr="" zoomY="0" showHeatMap="false" zoomLevel="3" zoomX="0"/>'
+    config = '<Config>' + "".join(f'<Input name="config{i}" boolean="true"/>' for i in range(60)) + "</Config>"
+
+    parts += [calcs] + skill_parts + tree + [notes, tree_view] + item_parts + [config, "</PathOfBuilding>"]
+    return "".join(parts)
+
+def generated_counts(pob_code: str) -> tuple:
+    """
+    (items, gems) written in a PoB code, counted on the full XML tree (independently of the decoder).
+    """
+    root = ET.fromstring(zlib.decompress(base64.urlsafe_b64decode(pob_code)))
+    return len(root.findall("./Items/Item")), len(root.findall("./Skills//Gem"))
+
+def check_decoded_counts(pob_codes: list) -> list:
+    """
+    Positions of the codes whose decoded build does not hold every generated item and gem,
+    so a decoder losing part of a build cannot pass for a faster one.
+    """
+    mismatches = []
+    for i, code in enumerate(pob_codes):
+        data = decode_pob_to_json(code)
+        decoded = (len(data["items"]), sum(len(skill["gems"]) for skill in data["skills"]))
+        if decoded != generated_counts(code):
+            mismatches.append(i)
+    return mismatches
+
+def encode_pob_xml(pob_xml: str) -> str:
+    """
+    Encode an XML the way PoB exports it (zlib + urlsafe base64).
+    """
+    return base64.urlsafe_b64encode(zlib.compress(pob_xml.encode("utf-8"))).decode("ascii")
+
+def make_pob_codes(count: int = DEFAULT_BUILDS, seed: int = DEFAULT_SEED) -> list:
+    rng = random.Random(seed)
+    ninja_names = {category: unique_names(category) for category in UNIQUE_CATEGORIES}
+    gems = gem_names()
+    return [encode_pob_xml(make_pob_xml(rng, ninja_names, gems)) for _ in range(count)]
+
+
+# -------------------
+# Read / write fixtures
+# -------------------
+def write_ninja_payloads(payloads: dict, fixtures_dir: str = FIXTURES_DIR) -> None:
+    ninja_dir = os.path.join(fixtures_dir, NINJA_DIR)
+    os.makedirs(ninja_dir, exist_ok=True)
+    for category, payload in payloads.items():
+        with open(os.path.join(ninja_dir, f"{category}.json"), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+def write_pob_codes(codes: list, fixtures_dir: str = FIXTURES_DIR) -> None:
+    os.makedirs(fixtures_dir, exist_ok=True)
+    with open(os.path.join(fixtures_dir, POB_CODES_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(codes) + "\n")
+
+def generate_corpus(builds: int = DEFAULT_BUILDS, seed: int = DEFAULT_SEED, fixtures_dir: str = FIXTURES_DIR) -> None:
+    """
+    Write the generated PoB codes and poe.ninja payloads into the fixtures folder.
+    """
+    write_pob_codes(make_pob_codes(builds, seed), fixtures_dir)
+    write_ninja_payloads(make_ninja_payloads(seed), fixtures_dir)
+
+def record_ninja_payloads(league: str, fixtures_dir: str = FIXTURES_DIR) -> dict:
+    """
+    Replace the poe.ninja fixtures by the live responses of a league. Returns the failed categories.
+    """
+    result = fetch_categories(league, NINJA_CATEGORIES)
+    write_ninja_payloads(result.payloads, fixtures_dir)
+    return result.errors
+
+def load_pob_codes(fixtures_dir: str = FIXTURES_DIR) -> list:
+    with open(os.path.join(fixtures_dir, POB_CODES_FILE), "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def load_ninja_payloads(fixtures_dir: str = FIXTURES_DIR) -> FetchResult:
+    """
+    Load the poe.ninja fixtures as the result of a fetch, ready for build_league_snapshot().
+    """
+    result = FetchResult()
+    for category in NINJA_CATEGORIES:
+        path = os.path.join(fixtures_dir, NINJA_DIR, f"{category}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result.payloads[category] = json.load(f)
+        except OSError as e:
+            result.errors[category] = str(e)
+    return result
+
+def ensure_corpus(fixtures_dir: str = FIXTURES_DIR) -> None:
+    """
+    Generate the default corpus if the fixtures folder does not hold one yet.
+    """
+    if not os.path.exists(os.path.join(fixtures_dir, POB_CODES_FILE)):
+        write_pob_codes(make_pob_codes(), fixtures_dir)
+    if not os.path.isdir(os.path.join(fixtures_dir, NINJA_DIR)):
+        write_ninja_payloads(make_ninja_payloads(), fixtures_dir)
@@ -0,0 +1,211 @@
+"""
+Local stand-in for the poe.ninja API, replaying recorded "itemoverview" / "currencyoverview" responses.
+
+Run from the backend folder:
+    python -m benchmarks.ninja_standin --port 8099 --latency-ms 150 --jitter-ms 50 --error-rate 0.05
+then point the pricer to it:
+    POE_NINJA_API_URL=http://127.0.0.1:8099/api/data python manage.py runserver
+
+Responses come from "<fixtures>/ninja/<League>/<Category>.json" when it exists,
+"<fixtures>/ninja/<Category>.json" otherwise (see benchmarks/corpus.py).
+They carry an ETag, and a request sending it back in If-None-Match gets an empty 304.
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.corpus import FIXTURES_DIR, NINJA_DIR, ensure_corpus
+
+OVERVIEWS = {"itemoverview", "currencyoverview"}
+
+
+# -------------------
+# Stand-in state
+# -------------------
+class StandinState:
+    """
+    Configuration and counters shared by the request handlers of one server.
+    - latency_ms / jitter_ms: delay added before each answer (uniform in latency ± jitter)
+    - error_rate: share of requests answered with a 503
+    - stall_rate: share of requests stalled for `stall_s` seconds (to exercise client timeouts)
+    """
+
+    def __init__(self, fixtures_dir: str, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, stall_rate: float = 0, stall_s: float = 30, seed: int = None):
+        self.ninja_dir = os.path.join(fixtures_dir, NINJA_DIR)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_s = stall_s
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.payloads = {}  # (league, category) -> (bytes, ETag), read once
+        self.stats = {"requests": 0, "served": 0, "not_modified": 0, "errors": 0, "stalled": 0, "not_found": 0}
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def draw(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def payload(self, league: str, category: str):
+        """
+        (recorded body, ETag) of a category (league specific file first), or None.
+        """
+        key = (league, category)
+        with self.lock:
+            if key in self.payloads:
+                return self.payloads[key]
+        for path in (os.path.join(self.ninja_dir, league, f"{category}.json"),
+                     os.path.join(self.ninja_dir, f"{category}.json")):
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    body = f.read()
+                payload = body, '"%s"' % hashlib.md5(body).hexdigest()
+                break
+        else:
+            payload = None
+        with self.lock:
+            self.payloads[key] = payload
+        return payload
+
+
+# -------------------
+# HTTP handler
+# -------------------
+class NinjaStandinHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API, so pooled client sessions are exercised
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        state = self.server.state
+        state.count("requests")
+        url = urlparse(self.path)
+        overview = url.path.rstrip("/").rsplit("/", 1)[-1]
+        params = parse_qs(url.query)
+        league = params.get("league", ["Standard"])[0]
+        category = params.get("type", [""])[0]
+
+        time.sleep(state.delay())
+        draw = state.draw()
+        if draw < state.stall_rate:
+            state.count("stalled")
+            time.sleep(state.stall_s)
+        elif draw < state.stall_rate + state.error_rate:
+            state.count("errors")
+            self.send_body(503, b'{"error": "injected failure"}')
+            return
+
+        payload = state.payload(league, category) if overview in OVERVIEWS else None
+        if payload is None:
+            state.count("not_found")
+            self.send_body(404, b'{"error": "unknown category"}')
+            return
+        body, etag = payload
+        if self.headers.get("If-None-Match") == etag:
+            state.count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        state.count("served")
+        self.send_body(200, body, etag)
+
+    def send_body(self, status: int, body: bytes, etag: str = None) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# -------------------
+# Server
+# -------------------
+class NinjaStandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a slow answer (timeouts) are expected, not errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+def make_server(host: str = "127.0.0.1", port: int = 0, fixtures_dir: str = FIXTURES_DIR,
+                verbose: bool = False, **state_options) -> ThreadingHTTPServer:
+    """
+    Create the stand-in server (port 0 picks a free port). state_options go to StandinState.
+    """
+    server = NinjaStandinServer((host, port), NinjaStandinHandler)
+    server.state = StandinState(fixtures_dir, **state_options)
+    server.verbose = verbose
+    return server
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    """
+    Value to give to POE_NINJA_API_URL to use this server.
+    """
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/api/data"
+
+def start_in_thread(**options) -> ThreadingHTTPServer:
+    """
+    Start a stand-in server in a background thread. Stop it with server.shutdown().
+    """
+    server = make_server(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded poe.ninja responses locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Corpus folder (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to each answer")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- variation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with a 503")
+    parser.add_argument("--stall-rate", type=float, default=0, help="Share of requests stalled (client timeouts)")
+    parser.add_argument("--stall-s", type=float, default=30, help="Duration of a stalled request")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the injected latency and failures")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    ensure_corpus(args.fixtures)
+    server = make_server(
+        args.host, args.port, args.fixtures, verbose=args.verbose,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        stall_rate=args.stall_rate, stall_s=args.stall_s, seed=args.seed,
+    )
+    print(f"poe.ninja stand-in listening, use POE_NINJA_API_URL={base_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stats: {server.state.stats}")
+
+
+if __name__ == "__main__":
+    main()
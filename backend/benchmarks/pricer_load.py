@@ -0,0 +1,111 @@
+"""
+Load test of the pricer against the local poe.ninja stand-in (no request reaches poe.ninja).
+
+Run from the backend folder:
+    python -m benchmarks.pricer_load --requests 400 --concurrency 16 --latency-ms 200 --error-rate 0.1
+    python -m benchmarks.pricer_load --invalidate-every 50 --timeout 0.5 --stall-rate 0.05 --stall-s 2
+
+Every request prices one corpus build with add_prices_to_json(). Invalidating the
+price cache every N requests forces refetches, which shows how cold fetches, upstream
+latency, failures and timeouts weigh on the pricer throughput.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import ninja_standin
+from benchmarks.corpus import FIXTURES_DIR, ensure_corpus, load_pob_codes
+from benchmarks.run_benchmarks import percentile
+from parsing.decoder.pob_decoder import decode_pob_to_json
+from parsing.pricer import fetcher
+from parsing.pricer.poeninja_pricer import add_prices_to_json, invalidate_prices
+from parsing.pricer import snapshot_store
+
+LOAD_LEAGUE = "LoadTest"
+
+
+def price_one(code: str, league: str) -> float:
+    """
+    Price one build, return its duration in seconds.
+    """
+    start = time.perf_counter()
+    add_prices_to_json(decode_pob_to_json(code), league=league)
+    return time.perf_counter() - start
+
+
+def run_load(codes: list, requests: int, concurrency: int, invalidate_every: int, league: str = LOAD_LEAGUE) -> dict:
+    """
+    Price `requests` builds over `concurrency` threads, invalidating the league prices every `invalidate_every` requests.
+    """
+    invalidate_prices(league)
+
+    def task(i):
+        if invalidate_every and i and i % invalidate_every == 0:
+            invalidate_prices(league)
+        try:
+            return price_one(codes[i % len(codes)], league)
+        except Exception:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(task, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    durations = sorted(o for o in outcomes if o is not None)
+    return {
+        "requests": requests,
+        "failed": requests - len(durations),
+        "throughput_req_s": round(requests / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(durations) * 1e3, 2) if durations else None,
+        "p50_ms": round(percentile(durations, 0.50) * 1e3, 2) if durations else None,
+        "p95_ms": round(percentile(durations, 0.95) * 1e3, 2) if durations else None,
+        "p99_ms": round(percentile(durations, 0.99) * 1e3, 2) if durations else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the pricer against a local poe.ninja stand-in.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Corpus folder (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=200, help="Builds to price (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent pricing threads (default: %(default)s)")
+    parser.add_argument("--invalidate-every", type=int, default=0,
+                        help="Invalidate the league prices every N requests (default: never)")
+    parser.add_argument("--timeout", type=float, default=fetcher.POE_NINJA_TIMEOUT,
+                        help="poe.ninja request timeout in seconds (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Stand-in delay per answer")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- variation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of stand-in answers that are 503")
+    parser.add_argument("--stall-rate", type=float, default=0, help="Share of stand-in answers stalled")
+    parser.add_argument("--stall-s", type=float, default=30, help="Duration of a stalled answer")
+    parser.add_argument("--seed", type=int, default=1337, help="Seed of the injected latency and failures")
+    args = parser.parse_args(argv)
+
+    ensure_corpus(args.fixtures)
+    codes = load_pob_codes(args.fixtures)
+    server = ninja_standin.start_in_thread(
+        fixtures_dir=args.fixtures, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, stall_rate=args.stall_rate, stall_s=args.stall_s, seed=args.seed,
+    )
+    # Point the pricer to the stand-in, and keep published snapshots (refresh_prices) out of the way
+    fetcher.POE_NINJA_API_URL = ninja_standin.base_url(server)
+    fetcher.POE_NINJA_TIMEOUT = args.timeout
+    try:
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            snapshot_store.SNAPSHOT_DIR = snapshot_dir
+            results = run_load(codes, args.requests, args.concurrency, args.invalidate_every)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for key, value in results.items():
+        print(f"{key:<20}{value}")
+    print(f"{'upstream':<20}{server.state.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Benchmarks of the decode and pricing pipeline.
+
+Run from the backend folder:
+    python -m benchmarks.run_benchmarks                       # run every benchmark
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.run_benchmarks --generate --builds 100 --seed 7
+    python -m benchmarks.run_benchmarks --record Standard      # use live poe.ninja payloads as fixtures
+"""
+import argparse
+import copy
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import (
+    FIXTURES_DIR,
+    check_decoded_counts,
+    ensure_corpus,
+    generate_corpus,
+    load_ninja_payloads,
+    load_pob_codes,
+    record_ninja_payloads,
+)
+from parsing.decoder.pob_decoder import (
+    decode_pob_code,
+    decode_pob_to_json,
+    parse_items,
+    parse_pob_xml,
+    parse_skills,
+    pob_xml_to_json,
+    rebuild_sockets,
+    get_item_type_and_subtype,
+)
+from parsing.pricer.compact_snapshot import CompactSnapshot, encode_compact_snapshot
+from parsing.pricer.gem_index import build_gem_index
+from parsing.pricer.poeninja_pricer import (
+    add_prices_to_json,
+    build_league_snapshot,
+    cache_league_snapshot,
+    find_gem_price,
+    unique_item_price,
+)
+from parsing.pricer.unique_index import build_unique_index
+
+# League name used to load the fixtures in the price cache (never fetched from poe.ninja)
+BENCH_LEAGUE = "Benchmark"
+
+
+# -------------------
+# Benchmarks
+# -------------------
+# Each benchmark takes the prepared corpus and returns a list of (setup, operation):
+# setup() runs outside the timed region and returns the argument of operation().
+def bench_decode_pob_code(corpus):
+    return [(lambda code=code: code, decode_pob_code) for code in corpus["codes"]]
+
+def bench_pob_xml_to_json(corpus):
+    return [(lambda xml=xml: xml, pob_xml_to_json) for xml in corpus["xmls"]]
+
+def bench_rebuild_sockets(corpus):
+    def operation(args):
+        rebuild_sockets(*args)
+    return [(lambda parsed=parsed: copy.deepcopy(parsed), operation) for parsed in corpus["parsed_sockets"]]
+
+def bench_build_gem_index(corpus):
+    return [(lambda: corpus["gem_lines"], build_gem_index)]
+
+def bench_find_gem_price(corpus):
+    gem_index, rate = corpus["gem_index"], corpus["divine"]
+    return [(lambda gem=gem: gem, lambda gem: find_gem_price(gem, gem_index, rate)) for gem in corpus["gems"]]
+
+def bench_find_gem_price_compact(corpus):
+    gem_index, rate = corpus["compact"].gems, corpus["divine"]
+    return [(lambda gem=gem: gem, lambda gem: find_gem_price(gem, gem_index, rate)) for gem in corpus["gems"]]
+
+def bench_build_unique_index(corpus):
+    return [(lambda: corpus["unique_lines"], build_unique_index)]
+
+def bench_unique_item_price(corpus):
+    unique_index, rate = corpus["unique_index"], corpus["divine"]
+    return [(lambda item=item: item, lambda item: unique_item_price(item, unique_index, rate)) for item in corpus["items"]]
+
+def bench_unique_item_price_compact(corpus):
+    unique_index, rate = corpus["compact"].uniques, corpus["divine"]
+    return [(lambda item=item: item, lambda item: unique_item_price(item, unique_index, rate)) for item in corpus["items"]]
+
+def bench_encode_compact_snapshot(corpus):
+    return [(lambda: corpus["snapshot"], encode_compact_snapshot)]
+
+def bench_add_prices_to_json(corpus):
+    def operation(code):
+        add_prices_to_json(decode_pob_to_json(code), league=BENCH_LEAGUE)
+    return [(lambda code=code: code, operation) for code in corpus["codes"]]
+
+BENCHMARKS = {
+    "decode_pob_code": bench_decode_pob_code,
+    "pob_xml_to_json": bench_pob_xml_to_json,
+    "rebuild_sockets": bench_rebuild_sockets,
+    "build_gem_index": bench_build_gem_index,
+    "find_gem_price": bench_find_gem_price,
+    "find_gem_price_compact": bench_find_gem_price_compact,
+    "build_unique_index": bench_build_unique_index,
+    "unique_item_price": bench_unique_item_price,
+    "unique_item_price_compact": bench_unique_item_price_compact,
+    "encode_compact_snapshot": bench_encode_compact_snapshot,
+    "add_prices_to_json": bench_add_prices_to_json,
+}
+
+
+# -------------------
+# Corpus preparation
+# -------------------
+def prepare_corpus(fixtures_dir: str) -> dict:
+    """
+    Load the fixtures and precompute the inputs of each benchmark.
+    The poe.ninja fixtures are loaded in the price cache, so no benchmark touches the network.
+    """
+    codes = load_pob_codes(fixtures_dir)
+    mismatches = check_decoded_counts(codes)
+    if mismatches:
+        raise SystemExit(f"Decoded builds miss items or gems for the PoB codes at positions {mismatches}")
+    result = load_ninja_payloads(fixtures_dir)
+    if result.errors:
+        raise SystemExit(f"Missing poe.ninja fixtures: {', '.join(result.errors)}")
+    snapshot = build_league_snapshot(BENCH_LEAGUE, result)
+    cache_league_snapshot(BENCH_LEAGUE, snapshot)
+
+    xmls = [decode_pob_code(code) for code in codes]
+    parsed_sockets = []
+    items_list = []
+    gems = []
+    for xml in xmls:
+        root = parse_pob_xml([xml])
+        items = parse_items(root)
+        for item in items:
+            item["type"], item["subType"] = get_item_type_and_subtype(item.get("itemBase"))
+        skills, links_by_slot = parse_skills(root)
+        parsed_sockets.append((items, links_by_slot))
+        items_list += items
+        gems += [gem for group in skills for gem in group["gems"]]
+
+    return {
+        "codes": codes,
+        "xmls": xmls,
+        "parsed_sockets": parsed_sockets,
+        "items": items_list,
+        "gems": gems,
+        "unique_lines": snapshot["uniques"],
+        "unique_index": build_unique_index(snapshot["uniques"]),
+        "gem_lines": snapshot["gems"],
+        "gem_index": build_gem_index(snapshot["gems"]),
+        "snapshot": snapshot,
+        "compact": CompactSnapshot(encode_compact_snapshot(snapshot)),
+        "divine": snapshot["divine"],
+    }
+
+
+# -------------------
+# Measures
+# -------------------
+def percentile(sorted_values: list, ratio: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(ratio * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_benchmark(cases: list, rounds: int) -> dict:
+    """
+    Time every operation `rounds` times (after one warm-up round), then measure
+    the peak memory of one extra round with tracemalloc.
+    """
+    for setup, operation in cases:
+        operation(setup())
+
+    durations = []
+    for _ in range(rounds):
+        for setup, operation in cases:
+            arg = setup()
+            start = time.perf_counter_ns()
+            operation(arg)
+            durations.append(time.perf_counter_ns() - start)
+
+    tracemalloc.start()
+    for setup, operation in cases:
+        arg = setup()
+        tracemalloc.reset_peak()
+        operation(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    durations.sort()
+    total_s = sum(durations) / 1e9
+    return {
+        "ops": len(durations),
+        "throughput_ops_s": round(len(durations) / total_s, 1) if total_s else None,
+        "mean_us": round(statistics.fmean(durations) / 1e3, 2),
+        "p50_us": round(percentile(durations, 0.50) / 1e3, 2),
+        "p95_us": round(percentile(durations, 0.95) / 1e3, 2),
+        "p99_us": round(percentile(durations, 0.99) / 1e3, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return a message for each benchmark whose p50 got slower than the baseline by more than `threshold`.
+    """
+    regressions = []
+    for name, measure in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get("p50_us"):
+            continue
+        ratio = measure["p50_us"] / reference["p50_us"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: p50 {reference['p50_us']}us -> {measure['p50_us']}us (x{ratio:.2f})")
+    return regressions
+
+def print_results(results: dict) -> None:
+    header = f"{'benchmark':<26}{'ops':>8}{'ops/s':>12}{'p50 us':>12}{'p95 us':>12}{'p99 us':>12}{'peak KiB':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, m in results.items():
+        print(f"{name:<26}{m['ops']:>8}{m['throughput_ops_s']:>12}{m['p50_us']:>12}"
+              f"{m['p95_us']:>12}{m['p99_us']:>12}{m['peak_kib']:>12}")
+
+
+# -------------------
+# Main
+# -------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the PoB decode and pricing pipeline.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Corpus folder (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark (default: %(default)s)")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--generate", action="store_true", help="Regenerate the corpus before running")
+    parser.add_argument("--builds", type=int, default=40, help="Builds in a generated corpus (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1337, help="Seed of a generated corpus (default: %(default)s)")
+    parser.add_argument("--record", metavar="LEAGUE", help="Record live poe.ninja payloads of a league as fixtures")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results to a baseline file")
+    parser.add_argument("--compare", metavar="PATH", help="Compare the results with a baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed p50 slowdown against the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generate_corpus(args.builds, args.seed, args.fixtures)
+    else:
+        ensure_corpus(args.fixtures)
+    if args.record:
+        errors = record_ninja_payloads(args.record, args.fixtures)
+        for category, error in errors.items():
+            print(f"Error recording {category}: {error}", file=sys.stderr)
+
+    corpus = prepare_corpus(args.fixtures)
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = run_benchmark(BENCHMARKS[name](corpus), args.rounds)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,9 @@
 from django.contrib import admin
 
+from .models import DecodedBuild, League, PriceSnapshot, SavedBuild
+
 # Register your models here.
+admin.site.register(League)
+admin.site.register(DecodedBuild)
+admin.site.register(PriceSnapshot)
+admin.site.register(SavedBuild)
@@ -1,8 +1,9 @@
 import os
 
-import requests
 import json
 
+from parsing.http_client import client
+
 
 POE_API_URL = "https://www.pathofexile.com/character-window/get-items"
 
@@ -26,8 +27,8 @@ def fetch_account_data(account_name: str, character_name: str, poesessid: str) -
         "character": character_name
     }
 
-    resp = requests.post(POE_API_URL, headers=headers, data=data)
-    resp.raise_for_status()
+    # Shared client: pooled connection, default timeout, retries on rate limits and transient errors
+    resp = client.post(POE_API_URL, headers=headers, data=data)
     return resp.json()
 
 
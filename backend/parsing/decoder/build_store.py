@@ -0,0 +1,132 @@
+import hashlib
+import json
+import zlib
+
+from django.db import transaction
+
+from parsing.decoder.bulk_decoder import decode_pob_bulk
+from parsing.decoder.pob_decoder import DECODER_VERSION, decode_pob_to_json, normalize_pob_string
+from parsing.metrics import incr, stage
+from parsing.models import DecodedBuild, DecodedBuildKey, PobCode
+from parsing.price_keys import price_keys
+
+# Rows inserted per bulk_create query
+BULK_BATCH_SIZE = 1000
+# zlib level of the stored JSON (decoded builds are written once and read many times)
+COMPRESSION_LEVEL = 6
+
+
+# -------------------
+# Hashes and blobs
+# -------------------
+def code_hash(pob_code: str) -> str:
+    """
+    sha256 of the decoder version and of a normalized PoB code (whitespace and padding do not change the build).
+    Codes stored by an older decoder version (see DECODER_VERSION) are not found anymore, so they are decoded again.
+    """
+    return hashlib.sha256(f"{DECODER_VERSION}:{normalize_pob_string(pob_code)}".encode("utf-8")).hexdigest()
+
+def pack_build(data: dict) -> tuple:
+    """
+    (content hash, compressed blob, raw size) of a decoded build.
+    The JSON is canonical (sorted keys, no spaces) so identical builds get the same hash.
+    """
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, COMPRESSION_LEVEL), len(raw)
+
+def unpack_build(blob) -> dict:
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+# -------------------
+# Lookup
+# -------------------
+def load_decoded_builds(code_hashes) -> dict:
+    """
+    code hash -> decoded build, for the codes already stored (one query).
+    """
+    rows = PobCode.objects.filter(code_hash__in=list(code_hashes)).values_list("code_hash", "build__data")
+    return {h: unpack_build(blob) for h, blob in rows.iterator()}
+
+
+# -------------------
+# Bulk upsert
+# -------------------
+def upsert_decoded_builds(decoded: dict, batch_size: int = BULK_BATCH_SIZE) -> None:
+    """
+    Store decoded builds (code hash -> decoded build) in bulk: one DecodedBuild per new content,
+    with its price keys, and one PobCode per code. Rows already stored (including by a
+    concurrent import) are left as they are.
+    """
+    contents = {}  # content hash -> (blob, raw size, data)
+    code_contents = {}  # code hash -> content hash
+    for h, data in decoded.items():
+        content_hash, blob, raw_size = pack_build(data)
+        contents.setdefault(content_hash, (blob, raw_size, data))
+        code_contents[h] = content_hash
+
+    with transaction.atomic():
+        existing = set(
+            DecodedBuild.objects.filter(content_hash__in=list(contents)).values_list("content_hash", flat=True)
+        )
+        new = {content_hash: value for content_hash, value in contents.items() if content_hash not in existing}
+        DecodedBuild.objects.bulk_create(
+            [DecodedBuild(content_hash=content_hash, data=blob, raw_size=raw_size,
+                          class_name=data.get("class") or "", ascendancy=data.get("ascendClass") or "")
+             for content_hash, (blob, raw_size, data) in new.items()],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        ids = dict(DecodedBuild.objects.filter(content_hash__in=list(contents)).values_list("content_hash", "id"))
+        DecodedBuildKey.objects.bulk_create(
+            [DecodedBuildKey(build_id=ids[content_hash], key=key)
+             for content_hash, (_, _, data) in new.items()
+             for key in price_keys(data)],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        PobCode.objects.bulk_create(
+            [PobCode(code_hash=h, build_id=ids[content_hash]) for h, content_hash in code_contents.items()],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+    incr("decoded_builds_stored", len(new))
+
+def store_decoded_builds(pob_codes: list, processes: int = 1) -> list:
+    """
+    Decoded build of every PoB code (or {"error": message}), in input order.
+    Codes already stored are read back without decoding; the others are decoded
+    (over `processes` processes, see decode_pob_bulk()) and stored in bulk.
+    """
+    hashes = [code_hash(code) for code in pob_codes]
+    with stage("build_store"):
+        stored = load_decoded_builds(set(hashes))
+    incr("decoded_build_hits", sum(h in stored for h in hashes))
+
+    missing = {}  # code hash -> first position of the code
+    for position, h in enumerate(hashes):
+        if h not in stored:
+            missing.setdefault(h, position)
+    decoded = {}
+    if missing:
+        positions = list(missing.values())
+        for index, data in decode_pob_bulk([pob_codes[p] for p in positions], processes=processes):
+            decoded[hashes[positions[index]]] = data
+        valid = {h: data for h, data in decoded.items() if "error" not in data}
+        if valid:
+            with stage("build_store"):
+                upsert_decoded_builds(valid)
+    return [stored[h] if h in stored else decoded[h] for h in hashes]
+
+def load_or_decode(pob_code: str) -> dict:
+    """
+    Decoded build of a PoB code, read from the database when it was stored before,
+    decoded and stored otherwise. Raises on invalid codes, like decode_pob_to_json().
+    """
+    h = code_hash(pob_code)
+    with stage("build_store"):
+        stored = load_decoded_builds([h])
+    if h in stored:
+        incr("decoded_build_hits")
+        return stored[h]
+    data = decode_pob_to_json(pob_code)
+    with stage("build_store"):
+        upsert_decoded_builds({h: data})
+    return data
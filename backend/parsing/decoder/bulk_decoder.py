@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from parsing.decoder.pob_decoder import decode_pob
+
+# -------------------
+# Bulk decode configuration
+# -------------------
+# Worker processes decoding PoB codes (default: one per core)
+BULK_DECODE_PROCESSES = int(os.getenv("POE_BULK_DECODE_PROCESSES", "0")) or os.cpu_count() or 1
+# PoB codes sent to a worker process at once (amortizes the inter-process round trips)
+BULK_DECODE_CHUNK_SIZE = int(os.getenv("POE_BULK_DECODE_CHUNK_SIZE", "64"))
+# Maximum number of chunks submitted and not yet yielded, per worker process
+BULK_WINDOW_PER_PROCESS = 2
+
+
+def decode_chunk(chunk: list) -> list:
+    """
+    Decode a list of (index, PoB code) in a worker process, return [(index, decoded build or {"error": message})].
+    """
+    return [(index, decode_pob(pob_code)) for index, pob_code in chunk]
+
+def iter_chunks(pob_codes, chunk_size: int):
+    """
+    Split an iterable of PoB codes into lists of (index, PoB code), without reading it all.
+    """
+    codes = enumerate(pob_codes)
+    while True:
+        chunk = list(islice(codes, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# -------------------
+# Bulk decoding
+# -------------------
+def decode_pob_bulk(pob_codes, processes: int = BULK_DECODE_PROCESSES,
+                    chunk_size: int = BULK_DECODE_CHUNK_SIZE, ordered: bool = True, pool: ProcessPoolExecutor = None):
+    """
+    Decode many PoB codes over a pool of processes, so decoding uses every core instead of one GIL.
+    `pob_codes` can be any iterable (e.g. the lines of a file): it is read chunk by chunk,
+    with a bounded number of chunks in flight, so memory does not grow with the input.
+    Yields (index in pob_codes, decoded build or {"error": message}), in input order,
+    or as soon as each chunk is decoded with ordered=False.
+    processes=1 decodes in the calling process. With `pool`, chunks are decoded over that
+    (shared) pool instead of a pool started for this call, `processes` only sizing the window.
+    """
+    chunks = iter_chunks(pob_codes, max(1, chunk_size))
+    if processes <= 1:
+        for chunk in chunks:
+            yield from decode_chunk(chunk)
+        return
+
+    window = processes * BULK_WINDOW_PER_PROCESS
+    if pool is not None:
+        yield from decode_chunks(pool, chunks, window, ordered)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        yield from decode_chunks(pool, chunks, window, ordered)
+
+def decode_chunks(pool: ProcessPoolExecutor, chunks, window: int, ordered: bool):
+    """
+    Decode chunks over a process pool with at most `window` chunks in flight (see decode_pob_bulk()).
+    Chunks still pending when the caller stops reading are cancelled.
+    """
+    pending = deque(pool.submit(decode_chunk, chunk) for chunk in islice(chunks, window))
+
+    def refill():
+        for chunk in islice(chunks, window - len(pending)):
+            pending.append(pool.submit(decode_chunk, chunk))
+
+    try:
+        if ordered:
+            while pending:
+                future = pending.popleft()
+                refill()
+                yield from future.result()
+        else:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                refill()
+                for future in done:
+                    yield from future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# -------------------
+# Shared pool
+# -------------------
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def shared_decode_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    Process pool shared by every bulk decode of a long-running process (the web server),
+    started on first use with `processes` workers and kept for the life of the process.
+    A pool broken by a crashed worker is replaced.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or getattr(_shared_pool, "_broken", False):
+            _shared_pool = ProcessPoolExecutor(max_workers=max(1, processes))
+        return _shared_pool
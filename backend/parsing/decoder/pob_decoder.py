@@ -1,19 +1,75 @@
 import base64
+import marshal
 import os
+import sys
 import zlib
 import xml.etree.ElementTree as ET
 import json
 from collections import defaultdict
+from parsing.metrics import stage
+
+# -------------------
+# DECODER VERSION
+# -------------------
+# Version of the decoded JSON. Bump it whenever a decoder change alters what decode_pob_to_json()
+# returns for the same code: builds stored by an older version are then decoded again (see build_store.py).
+DECODER_VERSION = 2
 
 # -------------------
 # ITEM TYPES MAPPING
 # -------------------
-# Load a list of item type / subtype
-ITEM_TYPE_MAPPING = {}
-mapping_path = os.path.join(os.path.dirname(__file__), "lists/item_types.json")
-if os.path.exists(mapping_path):
-    with open(mapping_path, "r", encoding="utf-8") as f:
-        ITEM_TYPE_MAPPING = json.load(f)
+# Reverse index of the item type / subtype list: base -> (type, subtype).
+# Compiled once from "lists/item_types.json" and cached as a marshal file in
+# "lists/__pycache__/", so later imports load it without parsing the JSON again.
+def build_base_type_index(mapping: dict) -> dict:
+    """
+    Flatten a {type: {subtype: [bases]}} mapping into {base: (type, subtype)}.
+    When a base is listed several times, the first listing is kept.
+    """
+    index = {}
+    for item_type, subtypes in mapping.items():
+        for sub_type, bases in subtypes.items():
+            for base in bases:
+                index.setdefault(base, (item_type, sub_type))
+    return index
+
+def load_base_type_index(json_path: str) -> dict:
+    """
+    Load the base type index compiled from `json_path`.
+    Uses the marshal cache when it was built from the current JSON file,
+    otherwise compiles the JSON and (re)writes the cache when the folder is writable.
+    """
+    if not os.path.exists(json_path):
+        return {}
+
+    stat = os.stat(json_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cache_dir = os.path.join(os.path.dirname(json_path), "__pycache__")
+    cache_name = os.path.splitext(os.path.basename(json_path))[0]
+    cache_path = os.path.join(cache_dir, f"{cache_name}.{sys.implementation.cache_tag}.marshal")
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached_stamp, index = marshal.load(f)
+        if tuple(cached_stamp) == stamp:
+            return index
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        index = build_base_type_index(json.load(f))
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            marshal.dump((stamp, index), f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return index
+
+BASE_TYPE_INDEX = load_base_type_index(os.path.join(os.path.dirname(__file__), "lists/item_types.json"))
 
 # -------------------
 # SUBTYPE TO SLOT MAPPING
@@ -33,33 +89,76 @@ LINK_ELIGIBLE_SUBTYPES = {
     "Body Armour", "Bow", "Staff", "War staff", "2H Sword", "2H Axe", "2H Mace"
 }
 
+# -------------------
+# PoB CODE LIMITS
+# -------------------
+# Longest PoB code accepted (checked before any decoding)
+MAX_POB_CODE_LENGTH = int(os.getenv("POE_MAX_POB_CODE_LENGTH", str(2 * 1024 * 1024)))
+# Largest decompressed XML accepted
+MAX_POB_XML_SIZE = int(os.getenv("POE_MAX_POB_XML_SIZE", str(16 * 1024 * 1024)))
+# Size of the decompressed chunks fed to the XML parser
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
 # -------------------
 # Utility Functions
 # -------------------
-def get_item_type_and_subtype(item_base: str, mapping: dict):
+def get_item_type_and_subtype(item_base: str, mapping: dict = None):
     """
-    Given an item base, return its generic type and subtype using ITEM_TYPE_MAPPING.
+    Given an item base, return its generic type and subtype using BASE_TYPE_INDEX.
     Example: "Sinner Tricorne" → ("Armour", "Helmet").
+    A custom {type: {subtype: [bases]}} mapping can be given instead of the default list.
     """
-    if not item_base or not mapping:
+    index = BASE_TYPE_INDEX if mapping is None else build_base_type_index(mapping)
+    if not item_base or not index:
         return None, None
-    for item_type, subtypes in mapping.items():
-        for sub_type, bases in subtypes.items():
-            if item_base in bases:
-                return item_type, sub_type
-    return None, None
+    return index.get(item_base, (None, None))
 
-def decode_pob_code(pob_code: str) -> str:
+def normalize_pob_string(pob_string: str) -> str:
     """
-    Decode a PoB pastebin code back into its raw XML.
-    Uses base64 urlsafe and zlib to decode.
+    Remove what does not change the decoded build: whitespace and base64 padding.
     """
+    return "".join(pob_string.split()).rstrip("=")
+
+def iter_pob_xml_chunks(pob_code: str, max_size: int = None):
+    """
+    Decode a PoB pastebin code into its raw XML, yielded as bytes chunks.
+    Uses base64 urlsafe and a zlib decompressobj, so the XML is never held in
+    one buffer. Raises ValueError as soon as the code or the decompressed XML
+    goes over its size limit.
+    """
+    max_size = MAX_POB_XML_SIZE if max_size is None else max_size
     pob_code = pob_code.strip()
+    if len(pob_code) > MAX_POB_CODE_LENGTH:
+        raise ValueError(f"PoB code too long ({len(pob_code)} characters, limit is {MAX_POB_CODE_LENGTH})")
     missing_padding = len(pob_code) % 4
     if missing_padding:
         pob_code += '=' * (4 - missing_padding)
-    decoded = base64.urlsafe_b64decode(pob_code)
-    return zlib.decompress(decoded).decode('utf-8')
+    # Timed per chunk: the consumer's time between two chunks is not part of the stage
+    inflate = stage("inflate")
+    with inflate:
+        data = base64.urlsafe_b64decode(pob_code)
+
+    decompressor = zlib.decompressobj()
+    total = 0
+    while not decompressor.eof:
+        with inflate:
+            chunk = decompressor.decompress(data, DECOMPRESS_CHUNK_SIZE)
+        data = decompressor.unconsumed_tail
+        if not chunk and not data:
+            break
+        total += len(chunk)
+        if total > max_size:
+            raise ValueError(f"Decoded PoB is too large (limit is {max_size} bytes)")
+        yield chunk
+    if not decompressor.eof:
+        raise ValueError("Incomplete PoB code (truncated compressed data)")
+
+def decode_pob_code(pob_code: str) -> str:
+    """
+    Decode a PoB pastebin code back into its raw XML.
+    Uses base64 urlsafe and zlib to decode, with the size limits of iter_pob_xml_chunks().
+    """
+    return b"".join(iter_pob_xml_chunks(pob_code)).decode('utf-8')
 
 def contains_any_in_fields(gem: dict, keywords) -> bool:
     """
@@ -342,10 +441,68 @@ def rebuild_sockets(items: list, links_by_slot: dict) -> None:
         else:
             item["5/6Link"] = False
 
+# -------------------
+# Streaming XML parsing
+# -------------------
+# Top level sections of the PoB XML used to build the JSON, everything else
+# (Tree, Notes, Calcs, Config, ...) is dropped while it is parsed
+KEPT_SECTIONS = {"Build", "Items", "Skills"}
+# Size of the slices fed to the parser when the XML is given as one string
+XML_FEED_SIZE = 64 * 1024
+
+def iter_xml_slices(pob_xml):
+    """
+    Yield slices of an XML string/bytes, so it can be parsed incrementally.
+    """
+    for start in range(0, len(pob_xml), XML_FEED_SIZE):
+        yield pob_xml[start:start + XML_FEED_SIZE]
+
+def parse_pob_xml(chunks) -> ET.Element:
+    """
+    Incrementally parse PoB XML chunks (str or bytes) and return the root element
+    holding only the KEPT_SECTIONS. Elements of other sections are emptied as soon
+    as they are closed and their section is detached when it closes, so memory
+    follows the kept sections, not the whole XML.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    stack = []
+    skipping = False  # Inside a top level section that is not kept
+
+    def handle_events():
+        nonlocal root, skipping
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                elif len(stack) == 1:
+                    skipping = elem.tag not in KEPT_SECTIONS
+                stack.append(elem)
+            else:
+                stack.pop()
+                if skipping and stack:
+                    # Events are read after a whole chunk is parsed: later siblings may already
+                    # be attached, so the closed element is emptied / detached by identity
+                    if len(stack) == 1:
+                        root.remove(elem)
+                        skipping = False
+                    else:
+                        elem.clear()
+
+    xml = stage("xml")
+    for chunk in chunks:
+        with xml:
+            parser.feed(chunk)
+            handle_events()
+    with xml:
+        parser.close()
+        handle_events()
+    return root
+
 # -------------------
 # Convert PoB XML to JSON
 # -------------------
-def pob_xml_to_json(pob_xml: str) -> dict:
+def pob_xml_to_json(pob_xml) -> dict:
     """
     Convert a PoB XML string to structured JSON with the following structure:
     - class: character class
@@ -354,8 +511,11 @@ def pob_xml_to_json(pob_xml: str) -> dict:
     - skills: list of skills
     - linksBySlot: dictionary of links by slot
     Detailed description of the structure are available in the docs/backend/parsing_route_response_exemple.
+    The XML (a string, or an iterable of str/bytes chunks) is parsed in streaming:
+    only the Build, Items and Skills sections are kept in memory.
     """
-    root = ET.fromstring(pob_xml)
+    chunks = iter_xml_slices(pob_xml) if isinstance(pob_xml, (str, bytes)) else pob_xml
+    root = parse_pob_xml(chunks)
     build_elem = root.find(".//Build")
     character_class = build_elem.attrib.get("className") if build_elem is not None else None
     ascend_class = build_elem.attrib.get("ascendClassName") if build_elem is not None else None
@@ -369,36 +529,45 @@ def pob_xml_to_json(pob_xml: str) -> dict:
     }
 
     # Parse items
-    items = parse_items(root)
+    with stage("items"):
+        items = parse_items(root)
     data["items"] = items
 
     # Parse skills + links
-    skills, links_by_slot = parse_skills(root)
+    with stage("skills"):
+        skills, links_by_slot = parse_skills(root)
     data["skills"] = skills
     data["linksBySlot"] = links_by_slot
 
     # Add type/subtype info
-    if ITEM_TYPE_MAPPING:
-        for item in items:
-            if item.get("itemBase"):
-                t, st = get_item_type_and_subtype(item["itemBase"], ITEM_TYPE_MAPPING)
-                item["type"] = t
-                item["subType"] = st
-
-    # Rewrite sockets
-    rebuild_sockets(items, links_by_slot)
+    with stage("slots"):
+        if BASE_TYPE_INDEX:
+            for item in items:
+                if item.get("itemBase"):
+                    t, st = get_item_type_and_subtype(item["itemBase"])
+                    item["type"] = t
+                    item["subType"] = st
+
+        # Rewrite sockets
+        rebuild_sockets(items, links_by_slot)
     return data
 
 # -------------------
 # Decode full PoB code
 # -------------------
-def decode_pob(pob_code: str) -> dict:
+def decode_pob_to_json(pob_code: str) -> dict:
     """
     Full pipeline: take a PoB code string → decode XML → convert to JSON.
+    The decompressed chunks go straight into the streaming XML parser. Raises on invalid codes.
+    """
+    return pob_xml_to_json(iter_pob_xml_chunks(pob_code))
+
+def decode_pob(pob_code: str) -> dict:
+    """
+    Same as decode_pob_to_json(), but returns {"error": message} on invalid codes.
     """
     try:
-        xml_data = decode_pob_code(pob_code)
-        return pob_xml_to_json(xml_data)
+        return decode_pob_to_json(pob_code)
     except Exception as e:
         return {"error": str(e)}
 
@@ -0,0 +1,154 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from parsing.metrics import incr
+
+# -----------------------
+# Client configuration
+# -----------------------
+# Timeout (in seconds) of a request that does not give its own
+HTTP_TIMEOUT = float(os.getenv("POE_HTTP_TIMEOUT", "10"))
+# Retries after a connection error, a timeout or a retryable status
+HTTP_MAX_RETRIES = int(os.getenv("POE_HTTP_MAX_RETRIES", "2"))
+# Backoff before retry n: random between 0 and min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2^n) seconds
+HTTP_BACKOFF_BASE = float(os.getenv("POE_HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("POE_HTTP_BACKOFF_MAX", "8"))
+# Longest Retry-After (seconds) waited for; a host asking for more fails fast until then
+HTTP_MAX_RETRY_AFTER = float(os.getenv("POE_HTTP_MAX_RETRY_AFTER", "30"))
+# Requests in flight at the same time towards one host, across all threads
+HTTP_MAX_PER_HOST = int(os.getenv("POE_HTTP_MAX_PER_HOST", "8"))
+# Keep-alive connections kept per host
+HTTP_POOL_SIZE = 16
+
+# Statuses worth retrying: rate limited or upstream temporarily unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitedError(requests.RequestException):
+    """
+    Raised without calling the host when it asked to wait (Retry-After) longer than HTTP_MAX_RETRY_AFTER.
+    """
+
+
+def retry_after_seconds(response) -> float:
+    """
+    Delay asked by a Retry-After header (seconds or HTTP date), or None.
+    """
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# -----------------------
+# Shared HTTP client
+# -----------------------
+class HttpClient:
+    """
+    Outbound HTTP client shared by every fetcher:
+    - one pooled keep-alive session (connections are reused between requests and threads)
+    - a default timeout on every request
+    - bounded retries with jittered exponential backoff on connection errors,
+      timeouts and RETRY_STATUSES, waiting for Retry-After when the host sends it
+    - at most `max_per_host` requests in flight per host
+    """
+
+    def __init__(self, max_retries: int = HTTP_MAX_RETRIES, backoff_base: float = HTTP_BACKOFF_BASE,
+                 backoff_max: float = HTTP_BACKOFF_MAX, max_retry_after: float = HTTP_MAX_RETRY_AFTER,
+                 max_per_host: int = HTTP_MAX_PER_HOST, timeout: float = HTTP_TIMEOUT):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+        self._lock = threading.Lock()
+        self._host_slots = {}  # host -> BoundedSemaphore
+        self._blocked_until = {}  # host -> time.monotonic() before which the host asked not to be called
+
+    def host_slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slots
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def block_host(self, host: str, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._blocked_until[host] = max(until, self._blocked_until.get(host, 0))
+
+    def wait_if_blocked(self, host: str) -> None:
+        """
+        Sleep until the host accepts requests again, or raise RateLimitedError if that is too long.
+        """
+        with self._lock:
+            remaining = self._blocked_until.get(host, 0) - time.monotonic()
+        if remaining <= 0:
+            return
+        if remaining > self.max_retry_after:
+            raise RateLimitedError(f"{host} is rate limited for {remaining:.0f}s")
+        time.sleep(remaining)
+
+    def request(self, method: str, url: str, timeout: float = None, retries: int = None, **kwargs):
+        """
+        Send a request and return the response, raising on network errors and HTTP
+        errors once the retries are exhausted. Use retries=0 for calls that must not be repeated.
+        """
+        host = urlsplit(url).netloc
+        retries = self.max_retries if retries is None else retries
+        send = getattr(self.session, method.lower())
+        for attempt in range(retries + 1):
+            self.wait_if_blocked(host)
+            try:
+                with self.host_slots(host):
+                    response = send(url, timeout=timeout or self.timeout, **kwargs)
+                response.raise_for_status()
+                return response
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUSES:
+                    raise
+                # Retry-After also holds back the other threads calling this host
+                delay = retry_after_seconds(e.response)
+                if delay is not None:
+                    self.block_host(host, delay)
+                if attempt == retries:
+                    raise
+                if delay is None:
+                    time.sleep(self.backoff(attempt))
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                time.sleep(self.backoff(attempt))
+            incr("http_retries")
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+# Shared client of the process
+client = HttpClient()
@@ -0,0 +1,72 @@
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from parsing.decoder.bulk_decoder import BULK_DECODE_CHUNK_SIZE, BULK_DECODE_PROCESSES, decode_pob_bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Decode PoB codes in bulk (one per line, from a file or stdin) over a pool of processes "
+        "and write one JSON line per build: {\"index\": position of the code, \"data\": decoded build}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", nargs="?", default="-",
+                            help="File of PoB codes, one per line, blank lines ignored (default: stdin)")
+        parser.add_argument("--output", "-o", default="-",
+                            help="JSON lines output file (default: stdout)")
+        parser.add_argument("--processes", type=int, default=BULK_DECODE_PROCESSES,
+                            help="Decoding processes, 1 to decode in this process (default: %(default)s)")
+        parser.add_argument("--chunk-size", type=int, default=BULK_DECODE_CHUNK_SIZE,
+                            help="PoB codes sent to a process at once (default: %(default)s)")
+        parser.add_argument("--unordered", action="store_true",
+                            help="Write builds as soon as they are decoded instead of in input order")
+        parser.add_argument("--store", action="store_true",
+                            help="Also store the decoded builds in the database (deduplicated by content), "
+                                 "codes stored before are read back instead of decoded")
+
+    def handle(self, *args, **options):
+        source = sys.stdin if options["input"] == "-" else open(options["input"], encoding="utf-8")
+        target = self.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8")
+        started = time.perf_counter()
+        decoded = errors = 0
+        try:
+            codes = (line.strip() for line in source if line.strip())
+            if options["store"]:
+                results = self.store_builds(codes, options["processes"])
+            else:
+                results = decode_pob_bulk(codes, processes=options["processes"],
+                                          chunk_size=options["chunk_size"], ordered=not options["unordered"])
+            for index, data in results:
+                decoded += 1
+                errors += "error" in data
+                target.write(json.dumps({"index": index, "data": data}, ensure_ascii=False) + "\n")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if target is not self.stdout:
+                target.close()
+
+        elapsed = time.perf_counter() - started
+        rate = decoded / elapsed if elapsed else 0
+        self.stderr.write(f"Decoded {decoded} builds ({errors} errors) in {elapsed:.2f}s, {rate:.0f} builds/s")
+
+    def store_builds(self, codes, processes: int):
+        """
+        Yield (index, decoded build) like decode_pob_bulk(), going through the decoded build store
+        one batch of codes at a time.
+        """
+        # Imported here: only this option needs the database
+        from parsing.decoder.build_store import BULK_BATCH_SIZE, store_decoded_builds
+        index = 0
+        while True:
+            batch = list(islice(codes, BULK_BATCH_SIZE))
+            if not batch:
+                return
+            for data in store_decoded_builds(batch, processes=processes):
+                yield index, data
+                index += 1
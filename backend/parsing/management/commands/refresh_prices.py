@@ -0,0 +1,102 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from parsing.pricer.poeninja_pricer import fetch_league_snapshot
+from parsing.pricer.price_history import ingest_snapshot
+from parsing.pricer.saved_builds import reprice_saved_builds
+from parsing.pricer.snapshot_store import load_snapshot, publish_snapshot
+
+# Leagues refreshed when --leagues is not given (comma separated)
+DEFAULT_LEAGUES = os.getenv("POE_PRICE_LEAGUES", "Standard")
+# Seconds between two refreshes when --interval is not given
+DEFAULT_INTERVAL = int(os.getenv("POE_PRICE_REFRESH_INTERVAL", "600"))
+# Parts of a published snapshot
+SNAPSHOT_PARTS = ("uniques", "gems", "divine", "currency")
+
+
+class Command(BaseCommand):
+    help = (
+        "Periodically fetch poe.ninja prices for a list of leagues and publish them "
+        "as snapshots read by the pricing endpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--leagues", default=DEFAULT_LEAGUES,
+                            help="Comma separated list of leagues to refresh (default: %(default)s)")
+        parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL,
+                            help="Seconds between two refreshes (default: %(default)s)")
+        parser.add_argument("--once", action="store_true",
+                            help="Refresh every league once then exit")
+        parser.add_argument("--history", action="store_true",
+                            help="Also store every published snapshot in the price history tables")
+        parser.add_argument("--reprice", action="store_true",
+                            help="Also update the saved builds depending on the prices that changed")
+
+    def handle(self, *args, **options):
+        # league -> parts of the last published snapshot, to skip publishing unchanged prices
+        self.published = {}
+        # Leagues whose saved builds must all be re-priced (their last re-pricing failed)
+        self.reprice_all = set()
+        leagues = [league.strip() for league in options["leagues"].split(",") if league.strip()]
+        while True:
+            for league in leagues:
+                try:
+                    self.refresh_league(league, options["history"], options["reprice"])
+                except Exception as e:
+                    # Keep refreshing the other leagues: this one is published, stored and re-priced again next time
+                    self.published.pop(league, None)
+                    self.reprice_all.add(league)
+                    self.stderr.write(f"[{league}] Refresh failed: {e!r}")
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+
+    def refresh_league(self, league: str, history: bool = False, reprice: bool = False) -> None:
+        """
+        Fetch and publish the snapshot of one league.
+        Parts that failed to download are taken from the previously published snapshot.
+        Categories unchanged on poe.ninja (304) keep their previous parts, and a snapshot
+        where every part is unchanged is not published again.
+        With `reprice`, saved builds are re-priced from the difference with the previous snapshot.
+        """
+        started = time.perf_counter()
+        snapshot, errors = fetch_league_snapshot(league)
+        for category, error in errors.items():
+            self.stderr.write(f"[{league}] Error fetching {category}: {error}")
+
+        published = self.published.get(league)
+        if published is not None and all(snapshot[part] is published[part] for part in SNAPSHOT_PARTS):
+            self.stdout.write(f"[{league}] Prices unchanged, snapshot kept")
+            return
+        # Prices the saved builds were last updated with (re-pricing every build when unknown)
+        old_snapshot = None
+        if reprice and league not in self.reprice_all:
+            old_snapshot = published if published is not None else load_snapshot(league)
+
+        if any(snapshot[part] is None for part in SNAPSHOT_PARTS):
+            previous = load_snapshot(league) or {}
+            for part in SNAPSHOT_PARTS:
+                if snapshot[part] is None:
+                    snapshot[part] = previous.get(part)
+
+        if not any(snapshot[part] for part in ("uniques", "gems", "divine")):
+            self.stderr.write(f"[{league}] Nothing to publish, keeping the previous snapshot")
+            return
+
+        path = publish_snapshot(league, snapshot)
+        self.published[league] = {part: snapshot[part] for part in SNAPSHOT_PARTS}
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"[{league}] Snapshot published to {path} in {elapsed:.2f}s")
+
+        if history:
+            price_snapshot = ingest_snapshot(snapshot)
+            self.stdout.write(f"[{league}] Snapshot stored in price history (id {price_snapshot.pk})")
+
+        if reprice:
+            started = time.perf_counter()
+            updated = reprice_saved_builds(league, old_snapshot, snapshot)
+            self.reprice_all.discard(league)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"[{league}] {updated} saved builds re-priced in {elapsed:.2f}s")
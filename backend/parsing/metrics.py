@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+# -----------------------
+# Metrics configuration
+# -----------------------
+# When disabled, stage() and incr() return immediately and no request is tracked
+METRICS_ENABLED = os.getenv("POE_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Metrics of the request being served (None outside of a tracked request)
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Stage durations (nanoseconds, summed when a stage runs several times) and
+    counters recorded while serving one request.
+    """
+    __slots__ = ("stages", "counters", "started", "_lock")
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter_ns()
+        # Stages can be recorded from worker threads running with a copy of the request context
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, duration_ns: int) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0) + duration_ns
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def server_timing(self) -> str:
+        """
+        Value of the Server-Timing header: one entry per stage (ms), then one per counter.
+        """
+        total_ns = time.perf_counter_ns() - self.started
+        entries = [f"{name};dur={ns / 1e6:.2f}" for name, ns in self.stages.items()]
+        entries.append(f"total;dur={total_ns / 1e6:.2f}")
+        entries += [f'{name};desc="{count}"' for name, count in self.counters.items()]
+        return ", ".join(entries)
+
+
+class Stage:
+    """
+    Context manager adding the time spent inside it to a stage of the request metrics.
+    Can be entered several times (e.g. once per chunk of a streamed input).
+    """
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: RequestMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_stage(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+# Returned by stage() when nothing is tracked, reusable and free to enter
+NO_STAGE = nullcontext()
+
+
+# -----------------------
+# Instrumentation API
+# -----------------------
+def stage(name: str):
+    """
+    Time a block as stage `name` of the current request: `with stage("xml"): ...`
+    """
+    metrics = current_metrics.get() if METRICS_ENABLED else None
+    if metrics is None:
+        return NO_STAGE
+    return Stage(metrics, name)
+
+def incr(name: str, n: int = 1) -> None:
+    """
+    Increment counter `name` of the current request.
+    """
+    if METRICS_ENABLED:
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.incr(name, n)
+
+
+# -----------------------
+# Process-wide aggregation
+# -----------------------
+class MetricsRegistry:
+    """
+    Totals of every tracked request since start (or the last reset), served by the metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.stages = {}  # name -> [count, total ns, max ns]
+            self.counters = {}
+
+    def record(self, metrics: RequestMetrics) -> None:
+        with self._lock:
+            self.requests += 1
+            for name, ns in metrics.stages.items():
+                totals = self.stages.setdefault(name, [0, 0, 0])
+                totals[0] += 1
+                totals[1] += ns
+                totals[2] = max(totals[2], ns)
+            for name, count in metrics.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "stages": {
+                    name: {"count": count, "totalMs": round(total / 1e6, 2),
+                           "meanMs": round(total / count / 1e6, 3), "maxMs": round(peak / 1e6, 2)}
+                    for name, (count, total, peak) in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def track_request():
+    """
+    Collect the metrics of the code run inside the block, then add them to the registry.
+    Yields the RequestMetrics (None when metrics are disabled).
+    """
+    if not METRICS_ENABLED:
+        yield None
+        return
+    metrics = RequestMetrics()
+    token = current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current_metrics.reset(token)
+        registry.record(metrics)
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='League',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PriceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fetched_at', models.DateTimeField()),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='parsing.league')),
+            ],
+            options={
+                'get_latest_by': 'fetched_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='GemPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('variant', models.CharField(blank=True, default='', max_length=20)),
+                ('gem_level', models.PositiveSmallIntegerField()),
+                ('gem_quality', models.PositiveSmallIntegerField()),
+                ('corrupted', models.BooleanField(default=False)),
+                ('chaos_value', models.FloatField()),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gem_prices', to='parsing.pricesnapshot')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CurrencyRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=100)),
+                ('chaos_equivalent', models.FloatField()),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='currency_rates', to='parsing.pricesnapshot')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UniquePrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('links', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('chaos_value', models.FloatField()),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unique_prices', to='parsing.pricesnapshot')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pricesnapshot',
+            index=models.Index(fields=['league', '-fetched_at'], name='snapshot_league_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gemprice',
+            index=models.Index(fields=['snapshot', 'name'], name='gem_snapshot_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='currencyrate',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'currency'), name='currency_snapshot_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='uniqueprice',
+            index=models.Index(fields=['snapshot', 'name'], name='unique_snapshot_name_idx'),
+        ),
+    ]
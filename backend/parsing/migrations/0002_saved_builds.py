@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, default='', max_length=100)),
+                ('pob_code', models.TextField()),
+                ('lines', models.JSONField(default=list)),
+                ('total_chaos', models.FloatField(default=0)),
+                ('total_divine', models.FloatField(blank=True, null=True)),
+                ('priced_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_builds', to='parsing.league')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BuildPriceKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=120)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='parsing.league')),
+                ('build', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_keys', to='parsing.savedbuild')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['league', 'key'], name='build_key_league_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('build', 'key'), name='build_key_unique')],
+            },
+        ),
+    ]
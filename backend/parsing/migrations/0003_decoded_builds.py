@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsing', '0002_saved_builds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecodedBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField()),
+                ('class_name', models.CharField(blank=True, db_index=True, default='', max_length=50)),
+                ('ascendancy', models.CharField(blank=True, db_index=True, default='', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PobCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code_hash', models.CharField(max_length=64, unique=True)),
+                ('build', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codes', to='parsing.decodedbuild')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DecodedBuildKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=120)),
+                ('build', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keys', to='parsing.decodedbuild')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('build', 'key'), name='decoded_build_key_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsing', '0003_decoded_builds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uniqueprice',
+            name='base_type',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='uniqueprice',
+            name='relic',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='uniqueprice',
+            name='variant',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
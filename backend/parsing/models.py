@@ -1,3 +1,153 @@
 from django.db import models
 
-# Create your models here.
+
+# -------------------
+# Price history
+# -------------------
+class League(models.Model):
+    """
+    A PoE league priced by poe.ninja (e.g. "Standard", "Hardcore").
+    """
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PriceSnapshot(models.Model):
+    """
+    One poe.ninja price fetch of a league. Prices rows all point to a snapshot,
+    so the prices "as of" a date are the rows of the latest snapshot before it.
+    """
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name="snapshots")
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["league", "-fetched_at"], name="snapshot_league_date_idx")]
+        get_latest_by = "fetched_at"
+
+    def __str__(self):
+        return f"{self.league} @ {self.fetched_at:%Y-%m-%d %H:%M}"
+
+
+class UniquePrice(models.Model):
+    """
+    Price of a poe.ninja unique line in a snapshot. `links` is 5 or 6 for link specific prices, null otherwise.
+    """
+    snapshot = models.ForeignKey(PriceSnapshot, on_delete=models.CASCADE, related_name="unique_prices")
+    name = models.CharField(max_length=100)
+    base_type = models.CharField(max_length=100, blank=True, default="")
+    variant = models.CharField(max_length=100, blank=True, default="")
+    links = models.PositiveSmallIntegerField(null=True, blank=True)
+    relic = models.BooleanField(default=False)
+    chaos_value = models.FloatField()
+
+    class Meta:
+        indexes = [models.Index(fields=["snapshot", "name"], name="unique_snapshot_name_idx")]
+
+
+class GemPrice(models.Model):
+    """
+    Price of a gem at a given level / quality in a snapshot.
+    """
+    snapshot = models.ForeignKey(PriceSnapshot, on_delete=models.CASCADE, related_name="gem_prices")
+    name = models.CharField(max_length=100)
+    variant = models.CharField(max_length=20, blank=True, default="")
+    gem_level = models.PositiveSmallIntegerField()
+    gem_quality = models.PositiveSmallIntegerField()
+    corrupted = models.BooleanField(default=False)
+    chaos_value = models.FloatField()
+
+    class Meta:
+        indexes = [models.Index(fields=["snapshot", "name"], name="gem_snapshot_name_idx")]
+
+
+class CurrencyRate(models.Model):
+    """
+    Value in chaos of a currency in a snapshot (e.g. "Divine Orb").
+    """
+    snapshot = models.ForeignKey(PriceSnapshot, on_delete=models.CASCADE, related_name="currency_rates")
+    currency = models.CharField(max_length=100)
+    chaos_equivalent = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["snapshot", "currency"], name="currency_snapshot_unique")
+        ]
+
+
+# -------------------
+# Saved builds
+# -------------------
+class SavedBuild(models.Model):
+    """
+    A build kept priced in a league. `lines` holds its priced elements (see parsing/pricer/repricer.py),
+    so a price refresh only re-prices the lines whose prices changed.
+    """
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name="saved_builds")
+    name = models.CharField(max_length=100, blank=True, default="")
+    pob_code = models.TextField()
+    lines = models.JSONField(default=list)
+    total_chaos = models.FloatField(default=0)
+    total_divine = models.FloatField(null=True, blank=True)
+    priced_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name or self.pk} ({self.league})"
+
+
+class BuildPriceKey(models.Model):
+    """
+    Reverse index of the saved builds: one row per price key ("u:<unique>", "g:<gem>") a build depends on.
+    """
+    build = models.ForeignKey(SavedBuild, on_delete=models.CASCADE, related_name="price_keys")
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=120)
+
+    class Meta:
+        indexes = [models.Index(fields=["league", "key"], name="build_key_league_key_idx")]
+        constraints = [
+            models.UniqueConstraint(fields=["build", "key"], name="build_key_unique")
+        ]
+
+
+# -------------------
+# Decoded builds
+# -------------------
+class DecodedBuild(models.Model):
+    """
+    A decoded PoB build, stored once per content: `content_hash` is the sha256 of its canonical JSON,
+    kept zlib-compressed in `data`. Class, ascendancy and price keys are extracted to be queried.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+    raw_size = models.PositiveIntegerField()
+    class_name = models.CharField(max_length=50, blank=True, default="", db_index=True)
+    ascendancy = models.CharField(max_length=50, blank=True, default="", db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.ascendancy or self.class_name or '?'} {self.content_hash[:12]}"
+
+
+class DecodedBuildKey(models.Model):
+    """
+    Price key ("u:<unique>", "g:<gem>", see parsing/price_keys.py) referenced by a decoded build.
+    """
+    build = models.ForeignKey(DecodedBuild, on_delete=models.CASCADE, related_name="keys")
+    key = models.CharField(max_length=120, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["build", "key"], name="decoded_build_key_unique")
+        ]
+
+
+class PobCode(models.Model):
+    """
+    A PoB code already decoded: sha256 of the decoder version and normalized code -> its decoded build.
+    Different codes of the same build (re-exports) share one DecodedBuild.
+    """
+    code_hash = models.CharField(max_length=64, unique=True)
+    build = models.ForeignKey(DecodedBuild, on_delete=models.CASCADE, related_name="codes")
@@ -0,0 +1,90 @@
+# -----------------------
+# Price keys
+# -----------------------
+# What a decoded build needs to be priced, shared by the decoder (stored builds are indexed by
+# price key) and the pricer. It depends on neither of them.
+#
+# A priced element of a build depends on the prices stored under one key:
+# "u:<unique name>" (every poe.ninja line of the unique) or "g:<normalized gem name>" (every level / quality).
+UNIQUE_KEY_PREFIX = "u:"
+GEM_KEY_PREFIX = "g:"
+
+# Item subtypes whose 5L/6L versions have their own poe.ninja price
+LINKABLE_TYPES = ["Body Armour", "Bow", "Staff", "War staff", "2H Sword", "2H Axe", "2H Mace"]
+# PoB rarities priced from poe.ninja unique lines ("RELIC" being the foil version of a unique)
+UNIQUE_RARITIES = ["UNIQUE", "RELIC"]
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize gem names for comparison (lowercase, remove ' support').
+    """
+    return name.lower().replace(" support", "").strip()
+
+def unique_key(name: str) -> str:
+    return UNIQUE_KEY_PREFIX + name
+
+def gem_key(name: str) -> str:
+    return GEM_KEY_PREFIX + normalize_name(name)
+
+
+# -----------------------
+# Unique items
+# -----------------------
+def priced_links(item: dict):
+    """
+    5 or 6 when the item is a linkable unique with a 5L/6L (PoB JSON already contains 5/6 link info), else None.
+    """
+    links = item.get("5/6Link") if item.get("subType") in LINKABLE_TYPES else None
+    return links if links in [5, 6] else None
+
+def item_variant(item: dict):
+    """
+    Name of the selected variant of a PoB item ("" when it has no variant), None when it cannot be told.
+    """
+    variants = [p["values"] for p in item.get("properties") or [] if p.get("name") == "Variant"]
+    if not variants:
+        return ""
+    selected = next((p["values"] for p in item["properties"] if p.get("name") == "Selected Variant"), "")
+    if selected.isdigit() and 1 <= int(selected) <= len(variants):
+        return variants[int(selected) - 1]
+    return None
+
+def unique_lookup(item: dict):
+    """
+    What identifies the poe.ninja line of a unique PoB item: {"name", "baseType", "variant", "links", "relic"},
+    or None for items that are not priced as uniques.
+    """
+    rarity = (item.get("rarity") or "").upper()
+    if rarity not in UNIQUE_RARITIES or not item.get("name"):
+        return None
+    return {"name": item["name"], "baseType": item.get("itemBase"), "variant": item_variant(item),
+            "links": priced_links(item), "relic": rarity == "RELIC"}
+
+
+# -----------------------
+# Build price lines
+# -----------------------
+def price_lines(pob_json: dict) -> list:
+    """
+    Priced elements of a decoded build, as JSON-serializable lines (chaos price not set yet):
+    {"key", "name", "baseType", "variant", "links", "relic"} for unique items (see unique_lookup()),
+    {"key", "nameSpec", "level", "quality"} for gems.
+    """
+    lines = []
+    for item in pob_json.get("items", []):
+        lookup = unique_lookup(item)
+        if lookup is not None:
+            lines.append({"key": unique_key(lookup["name"]), **lookup})
+    for skill_slot in pob_json.get("skills", []):
+        for gem in skill_slot.get("gems", []):
+            if gem.get("nameSpec"):
+                lines.append({"key": gem_key(gem["nameSpec"]), "nameSpec": gem["nameSpec"],
+                              "level": int(gem.get("level", 1)), "quality": int(gem.get("quality", 0))})
+    return lines
+
+def price_keys(pob_json: dict) -> list:
+    """
+    Sorted price keys a decoded build depends on.
+    """
+    return sorted({line["key"] for line in price_lines(pob_json)})
@@ -0,0 +1,104 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from parsing.decoder.bulk_decoder import decode_pob_bulk, shared_decode_pool
+from parsing.decoder.pob_decoder import decode_pob_to_json
+from parsing.pricer.poeninja_pricer import apply_prices
+
+# Threads decoding PoB codes of a batch
+BATCH_DECODE_WORKERS = int(os.getenv("POE_BATCH_DECODE_WORKERS", "4"))
+# Maximum number of decoded builds waiting to be priced, per decode thread
+BATCH_WINDOW_PER_WORKER = 4
+# Batches of at least this many codes are decoded over the shared process pool (see decode_pob_bulk()),
+# smaller ones on threads (inter-process round trips would cost more than they save)
+BATCH_PROCESS_THRESHOLD = int(os.getenv("POE_BATCH_PROCESS_THRESHOLD", "64"))
+# Processes of the decode pool shared by every batch of the server process, started on first use
+BATCH_DECODE_PROCESSES = int(os.getenv("POE_BATCH_DECODE_PROCESSES", "0")) or min(4, os.cpu_count() or 1)
+# Maximum number of PoB codes in one batch request
+BATCH_MAX_CODES = int(os.getenv("POE_BATCH_MAX_CODES", "500"))
+
+
+# -----------------------
+# Batch decoding
+# -----------------------
+def decode_pob_threaded(pob_strings: list, workers: int = BATCH_DECODE_WORKERS):
+    """
+    Decode PoB codes on a thread pool with a bounded look-ahead.
+    Yields (index, decoded build or {"error": message}) in input order.
+    """
+    workers = max(1, workers)
+    window = workers * BATCH_WINDOW_PER_WORKER
+    codes = iter(enumerate(pob_strings))
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def fill():
+            while len(pending) < window:
+                try:
+                    index, pob_string = next(codes)
+                except StopIteration:
+                    return
+                pending.append((index, pool.submit(decode_pob_to_json, pob_string)))
+
+        fill()
+        while pending:
+            index, future = pending.popleft()
+            fill()
+            try:
+                data = future.result()
+            except Exception as e:
+                data = {"error": str(e)}
+            yield index, data
+
+def batch_processes(count: int) -> int:
+    """
+    Decoding processes used for a batch of `count` codes (1: decoded on threads).
+    """
+    return BATCH_DECODE_PROCESSES if count >= BATCH_PROCESS_THRESHOLD else 1
+
+
+# -----------------------
+# Batch pricing
+# -----------------------
+def price_pob_batch(pob_strings: list, prices, workers: int = BATCH_DECODE_WORKERS, apply=apply_prices,
+                    processes: int = None):
+    """
+    Price many PoB codes with the same resolved prices (see resolve_prices()),
+    applied by `apply(pob_json, prices)` (apply_prices() by default).
+    Codes are decoded over the process pool shared by every batch, keeping up to `processes` workers busy
+    (chosen from the batch size when None, see batch_processes()), or with one process on `workers` threads.
+    Results are yielded as soon as they are ready, in input order:
+    {"index": position in pob_strings, "data": priced build or {"error": message}}.
+    """
+    processes = batch_processes(len(pob_strings)) if processes is None else processes
+    if processes > 1:
+        decoded = decode_pob_bulk(pob_strings, processes=processes, pool=shared_decode_pool(BATCH_DECODE_PROCESSES))
+    else:
+        decoded = decode_pob_threaded(pob_strings, workers)
+
+    for index, data in decoded:
+        if "error" not in data:
+            try:
+                data = apply(data, prices)
+            except Exception as e:
+                data = {"error": str(e)}
+        yield {"index": index, "data": data}
+
+async def aprice_pob_batch(pob_strings: list, prices, workers: int = BATCH_DECODE_WORKERS, apply=apply_prices,
+                           processes: int = None):
+    """
+    Async version of price_pob_batch(): every result is produced on a worker thread,
+    so an ASGI response streams each line as soon as it is ready without blocking the event loop.
+    """
+    results = price_pob_batch(pob_strings, prices, workers, apply, processes)
+    try:
+        while True:
+            result = await asyncio.to_thread(next, results, None)
+            if result is None:
+                return
+            yield result
+    finally:
+        # Client gone or batch done: stop the decode pool off the event loop
+        await asyncio.to_thread(results.close)
@@ -0,0 +1,391 @@
+import math
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+from parsing.pricer.gem_index import GemRecord, gem_record
+from parsing.pricer.unique_index import UniqueRecord, find_unique_record, index_unique_records, unique_record
+
+# -----------------------
+# Compact snapshot format
+# -----------------------
+# Binary, little-endian league snapshot read in place through a read-only mmap:
+# every worker process maps the same file, so the OS keeps one shared copy of the
+# price data in its page cache and loading a snapshot parses nothing.
+#
+#   header   : magic, version, flags, fetchedAt, divine, then (offset, count) of each section
+#   sections : 8-byte aligned arrays, in SECTIONS order
+#
+# Names (unique names and base types, gem names, variants, currencies, league) are interned in one
+# table sorted by UTF-8 bytes, and every other section refers to them by index.
+MAGIC = b"POEPRICE"
+FORMAT_VERSION = 2
+NO_ID = 0xFFFFFFFF  # Missing name index (gem or unique without variant, unique without base type)
+
+# Parts of the snapshot that were available when it was written
+HAS_UNIQUES, HAS_GEMS, HAS_DIVINE, HAS_CURRENCY = 1, 2, 4, 8
+
+# (section name, array typecode), "s" being raw bytes
+SECTIONS = [
+    ("league", "s"),
+    ("name_offsets", "I"),      # n + 1 offsets into name_blob
+    ("name_blob", "s"),
+    # Unique lines, sorted by (name index, poe.ninja position)
+    ("unique_names", "I"),
+    ("unique_bases", "I"),
+    ("unique_variants", "I"),
+    ("unique_links", "B"),
+    ("unique_relics", "B"),
+    ("unique_positions", "I"),
+    ("unique_chaos", "d"),
+    # Gems, sorted by (normalized name index, level, quality, poe.ninja position)
+    ("gem_keys", "I"),          # normalized name
+    ("gem_names", "I"),         # name as listed by poe.ninja
+    ("gem_variants", "I"),
+    ("gem_levels", "h"),
+    ("gem_qualities", "h"),
+    ("gem_corrupted", "B"),
+    ("gem_positions", "I"),
+    ("gem_chaos", "d"),
+    ("variant_rows", "I"),      # gem rows with a variant, sorted by (variant index, level, quality, position)
+    # Currency rates, sorted by name index
+    ("currency_names", "I"),
+    ("currency_chaos", "d"),
+]
+HEADER = struct.Struct("<8sIIdd")
+SECTION_ENTRY = struct.Struct("<QQ")
+ALIGNMENT = 8
+
+
+def to_float(value) -> float:
+    return float("nan") if value is None else float(value)
+
+def to_price(value: float):
+    return None if math.isnan(value) else value
+
+
+# -----------------------
+# Write
+# -----------------------
+def encode_compact_snapshot(snapshot: dict) -> bytes:
+    """
+    Encode a league snapshot {"league", "fetchedAt", "uniques", "gems", "divine", "currency"}
+    into the compact format. Missing (None) parts stay missing when read back.
+    """
+    uniques = snapshot.get("uniques")
+    gems = snapshot.get("gems")
+    divine = snapshot.get("divine")
+    currency = snapshot.get("currency")
+    flags = ((HAS_UNIQUES if uniques is not None else 0) | (HAS_GEMS if gems is not None else 0)
+             | (HAS_DIVINE if divine is not None else 0) | (HAS_CURRENCY if currency is not None else 0))
+
+    unique_rows = [(*unique_record(line), position) for position, line in enumerate(uniques or [])]
+    gem_rows = []
+    for position, line in enumerate(gems or []):
+        g = gem_record(line)
+        gem_rows.append((g.key, g.name, g.variant.lower(), g.level, g.quality, g.corrupted, position, g.chaos))
+    currency = {name: chaos for name, chaos in (currency or {}).items() if chaos is not None}
+
+    # Interned names, sorted by UTF-8 bytes so they can be searched directly in the mapped file
+    names = set(currency)
+    for name, base_type, variant, *_ in unique_rows:
+        names.update(value for value in (name, base_type, variant) if value)
+    for key, name, variant, *_ in gem_rows:
+        names.update((key, name, variant) if variant else (key, name))
+    encoded = sorted(name.encode("utf-8") for name in names)
+    ids = {name.decode("utf-8"): i for i, name in enumerate(encoded)}
+    offsets = [0]
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+
+    unique_rows.sort(key=lambda r: (ids[r[0]], r[6]))
+    gem_rows.sort(key=lambda r: (ids[r[0]], r[3], r[4], r[6]))
+    variant_rows = sorted(
+        (i for i, r in enumerate(gem_rows) if r[2]),
+        key=lambda i: (ids[gem_rows[i][2]], gem_rows[i][3], gem_rows[i][4], gem_rows[i][6]),
+    )
+    currency_names = sorted(currency, key=ids.__getitem__)
+
+    values = {
+        "league": (snapshot.get("league") or "").encode("utf-8"),
+        "name_offsets": offsets,
+        "name_blob": b"".join(encoded),
+        "unique_names": [ids[r[0]] for r in unique_rows],
+        "unique_bases": [ids[r[1]] if r[1] else NO_ID for r in unique_rows],
+        "unique_variants": [ids[r[2]] if r[2] else NO_ID for r in unique_rows],
+        "unique_links": [r[3] for r in unique_rows],
+        "unique_relics": [int(r[4]) for r in unique_rows],
+        "unique_positions": [r[6] for r in unique_rows],
+        "unique_chaos": [to_float(r[5]) for r in unique_rows],
+        "gem_keys": [ids[r[0]] for r in gem_rows],
+        "gem_names": [ids[r[1]] for r in gem_rows],
+        "gem_variants": [ids[r[2]] if r[2] else NO_ID for r in gem_rows],
+        "gem_levels": [r[3] for r in gem_rows],
+        "gem_qualities": [r[4] for r in gem_rows],
+        "gem_corrupted": [int(r[5]) for r in gem_rows],
+        "gem_positions": [r[6] for r in gem_rows],
+        "gem_chaos": [to_float(r[7]) for r in gem_rows],
+        "variant_rows": variant_rows,
+        "currency_names": [ids[n] for n in currency_names],
+        "currency_chaos": [float(currency[n]) for n in currency_names],
+    }
+
+    header_size = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    entries, chunks = [], []
+    offset = header_size
+    for name, typecode in SECTIONS:
+        value = values[name]
+        data = value if typecode == "s" else struct.pack(f"<{len(value)}{typecode}", *value)
+        padding = -offset % ALIGNMENT
+        chunks.append(b"\0" * padding + data)
+        offset += padding
+        entries.append(SECTION_ENTRY.pack(offset, len(value)))
+        offset += len(data)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, float(snapshot.get("fetchedAt") or 0), to_float(divine))
+    return header + b"".join(entries) + b"".join(chunks)
+
+
+# -----------------------
+# Read
+# -----------------------
+class CompactUniqueIndex:
+    """
+    Unique price index over the unique columns of a compact snapshot, with the lookups of
+    UniquePriceIndex (same results). The lookup table of a unique is built from its rows
+    the first time it is priced in this process. Matched lines are returned as UniqueRecords.
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._names = snapshot.section("unique_names")
+        self._bases = snapshot.section("unique_bases")
+        self._variants = snapshot.section("unique_variants")
+        self._links = snapshot.section("unique_links")
+        self._relics = snapshot.section("unique_relics")
+        self._positions = snapshot.section("unique_positions")
+        self._chaos = snapshot.section("unique_chaos")
+        # Lookup table of the uniques already priced in this process (names in the snapshot only,
+        # so it is bounded by the snapshot: names of user-supplied builds that it lacks are not kept)
+        self._tables = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def line(self, row: int) -> UniqueRecord:
+        name = self._snapshot.name
+        base_id, variant_id = self._bases[row], self._variants[row]
+        return UniqueRecord(
+            name(self._names[row]),
+            name(base_id) if base_id != NO_ID else "",
+            name(variant_id) if variant_id != NO_ID else "",
+            self._links[row],
+            bool(self._relics[row]),
+            to_price(self._chaos[row]),
+        )
+
+    def _table(self, name: str) -> dict:
+        table = self._tables.get(name)
+        if table is None:
+            name_id = self._snapshot.name_id(name)
+            if name_id is None:
+                return {}
+            start = bisect_left(self._names, name_id)
+            rows = range(start, bisect_left(self._names, name_id + 1, start))
+            table = self._tables[name] = index_unique_records(self.line(row) for row in rows)
+        return table
+
+    def find(self, name: str, base_type: str = None, variant: str = None, links: int = 0, relic: bool = False):
+        """
+        Same as UniquePriceIndex.find().
+        """
+        return find_unique_record(self._table(name), name, base_type, variant, links, relic)
+
+    def unique_lines(self) -> list:
+        """
+        Every unique record, in poe.ninja order.
+        """
+        return [self.line(row) for row in sorted(range(len(self)), key=self._positions.__getitem__)]
+
+
+class CompactGemIndex:
+    """
+    Gem price index over the gem columns of a compact snapshot, with the lookups of
+    GemPriceIndex (same results: the first poe.ninja line wins on ties).
+    Matched lines are returned as GemRecords.
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._keys = snapshot.section("gem_keys")
+        self._names = snapshot.section("gem_names")
+        self._variants = snapshot.section("gem_variants")
+        self._levels = snapshot.section("gem_levels")
+        self._qualities = snapshot.section("gem_qualities")
+        self._corrupted = snapshot.section("gem_corrupted")
+        self._positions = snapshot.section("gem_positions")
+        self._chaos = snapshot.section("gem_chaos")
+        self._variant_rows = snapshot.section("variant_rows")
+        # Distinct variants, decoded once (a few dozen strings)
+        self.variants = {}
+        for row in self._variant_rows:
+            variant_id = self._variants[row]
+            self.variants.setdefault(snapshot.name(variant_id), variant_id)
+        # Row range of the normalized names already looked up in this process (names in the snapshot only)
+        self._ranges = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def line(self, row: int) -> GemRecord:
+        variant_id = self._variants[row]
+        return GemRecord(
+            self._snapshot.name(self._keys[row]),
+            self._snapshot.name(self._names[row]),
+            self._snapshot.name(variant_id) if variant_id != NO_ID else "",
+            self._levels[row],
+            self._qualities[row],
+            bool(self._corrupted[row]),
+            to_price(self._chaos[row]),
+        )
+
+    def _name_range(self, name_lower: str) -> tuple:
+        name_range = self._ranges.get(name_lower)
+        if name_range is None:
+            name_id = self._snapshot.name_id(name_lower)
+            if name_id is None:
+                return (0, 0)
+            start = bisect_left(self._keys, name_id)
+            name_range = self._ranges[name_lower] = (start, bisect_left(self._keys, name_id + 1, start))
+        return name_range
+
+    def _find_by_name(self, name_lower: str, level: int, quality: int):
+        start, end = self._name_range(name_lower)
+        row = bisect_left(range(start, end), (level, quality),
+                          key=lambda r: (self._levels[r], self._qualities[r])) + start
+        if row < end and self._levels[row] == level and self._qualities[row] == quality:
+            return row
+        return None
+
+    def _find_by_variant(self, variant: str, level: int, quality: int):
+        variant_id = self.variants[variant]
+        rows = self._variant_rows
+        target = (variant_id, level, quality)
+        i = bisect_left(range(len(rows)), target,
+                        key=lambda i: (self._variants[rows[i]], self._levels[rows[i]], self._qualities[rows[i]]))
+        if i < len(rows):
+            row = rows[i]
+            if (self._variants[row], self._levels[row], self._qualities[row]) == target:
+                return row
+        return None
+
+    def find(self, name_lower: str, level: int, quality: int, matching_variants: list):
+        """
+        Same as GemPriceIndex.find().
+        """
+        best = self._find_by_name(name_lower, level, quality)
+        for variant in matching_variants:
+            candidate = self._find_by_variant(variant, level, quality)
+            if candidate is not None and (best is None or self._positions[candidate] < self._positions[best]):
+                best = candidate
+        return self.line(best) if best is not None else None
+
+    def variants_in(self, name_lower: str) -> list:
+        """
+        Same as GemPriceIndex.variants_in().
+        """
+        return [variant for variant in self.variants if variant in name_lower]
+
+    def first(self, name_lower: str):
+        """
+        First poe.ninja line of a normalized gem name (name-only fallback), or None.
+        """
+        start, end = self._name_range(name_lower)
+        if start == end:
+            return None
+        return self.line(min(range(start, end), key=self._positions.__getitem__))
+
+    def gem_lines(self) -> list:
+        """
+        Every gem record, in poe.ninja order.
+        """
+        return [self.line(row) for row in sorted(range(len(self)), key=self._positions.__getitem__)]
+
+
+class CompactSnapshot:
+    """
+    Read-only view of a compact snapshot file (see encode_compact_snapshot()).
+    The file is memory-mapped, so lookups read the shared pages directly.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, self.flags, self.fetched_at, divine = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a compact price snapshot (or unsupported version)")
+        self._sections = {}
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, count = SECTION_ENTRY.unpack_from(view, HEADER.size + i * SECTION_ENTRY.size)
+            size = count * (1 if typecode == "s" else struct.calcsize(typecode))
+            section = view[offset:offset + size]
+            self._sections[name] = section if typecode == "s" else section.cast(typecode)
+        self.league = bytes(self._sections["league"]).decode("utf-8")
+        self.divine = to_price(divine) if self.flags & HAS_DIVINE else None
+        self._name_offsets = self._sections["name_offsets"]
+        self._name_blob = self._sections["name_blob"]
+        self._name_count = len(self._name_offsets) - 1
+        self.uniques = CompactUniqueIndex(self) if self.flags & HAS_UNIQUES else None
+        self.gems = CompactGemIndex(self) if self.flags & HAS_GEMS else None
+
+    @classmethod
+    def open(cls, path: str) -> "CompactSnapshot":
+        """
+        Map a snapshot file read-only. On Windows, where a mapped file cannot be
+        replaced by the next publication, the file is read in memory instead.
+        """
+        with open(path, "rb") as f:
+            if os.name == "nt":
+                return cls(f.read())
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def section(self, name: str):
+        return self._sections[name]
+
+    def name(self, name_id: int) -> str:
+        return bytes(self._name_blob[self._name_offsets[name_id]:self._name_offsets[name_id + 1]]).decode("utf-8")
+
+    def name_id(self, name: str):
+        """
+        Index of a name in the interned names table, or None.
+        """
+        encoded = name.encode("utf-8")
+        offsets, blob = self._name_offsets, self._name_blob
+        i = bisect_left(range(self._name_count), encoded, key=lambda i: blob[offsets[i]:offsets[i + 1]].tobytes())
+        if i < self._name_count and blob[offsets[i]:offsets[i + 1]] == encoded:
+            return i
+        return None
+
+    @property
+    def currency(self):
+        """
+        Currency name -> chaos equivalent, or None if the currency part was missing.
+        """
+        if not self.flags & HAS_CURRENCY:
+            return None
+        names, chaos = self._sections["currency_names"], self._sections["currency_chaos"]
+        return {self.name(name_id): chaos[i] for i, name_id in enumerate(names)}
+
+    def to_snapshot(self) -> dict:
+        """
+        Decode the whole file back into a snapshot dict (uniques as UniqueRecords, gems as GemRecords).
+        """
+        return {
+            "league": self.league,
+            "fetchedAt": self.fetched_at,
+            "uniques": self.uniques.unique_lines() if self.uniques is not None else None,
+            "gems": self.gems.gem_lines() if self.gems is not None else None,
+            "divine": self.divine,
+            "currency": self.currency,
+        }
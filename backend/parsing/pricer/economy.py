@@ -0,0 +1,84 @@
+import os
+import re
+
+from parsing.http_client import client
+from parsing.metrics import incr
+from parsing.pricer import poeninja_pricer
+from parsing.pricer.price_cache import price_cache
+from parsing.pricer.snapshot_store import published_leagues
+
+# -----------------------
+# Economy configuration
+# -----------------------
+# Leagues list of the official trade API
+TRADE_LEAGUES_URL = os.getenv("POE_TRADE_LEAGUES_URL", "https://www.pathofexile.com/api/trade/data/leagues")
+# Seconds browsers and proxies may reuse an /api/economy response
+ECONOMY_MAX_AGE = int(os.getenv("POE_ECONOMY_MAX_AGE", "300"))
+
+# The trade API rejects requests without a User-Agent describing the client
+TRADE_HEADERS = {"User-Agent": "poe-build-pricer"}
+# Cache key of the leagues list in the price snapshot cache (not a league name)
+LEAGUES_CACHE_KEY = "*"
+# Permanent leagues, skipped when looking for the current challenge league
+PERMANENT_LEAGUE = re.compile("Standard|Hardcore", re.IGNORECASE)
+
+
+# -----------------------
+# Leagues
+# -----------------------
+def fetch_leagues() -> list:
+    """
+    Fetch the ids of the active leagues from the trade API.
+    """
+    data = client.get(TRADE_LEAGUES_URL, headers=TRADE_HEADERS).json()
+    return [league.get("id") if isinstance(league, dict) else league for league in data.get("result", [])]
+
+def get_leagues() -> list:
+    """
+    Active leagues, served from the price snapshot cache (so from the same TTLs as prices).
+    In snapshots-only mode, or when the trade API fails, the leagues with a published snapshot.
+    """
+    if not poeninja_pricer.PRICE_SNAPSHOTS_ONLY:
+        try:
+            return price_cache.get(LEAGUES_CACHE_KEY, "leagues", fetch_leagues)
+        except Exception as e:
+            print(f"Error fetching leagues: {e}")
+    return published_leagues() or ["Standard"]
+
+def current_league(leagues: list) -> str:
+    """
+    First challenge league of the list (not Standard nor Hardcore), Standard otherwise.
+    """
+    return next((league for league in leagues if not PERMANENT_LEAGUE.search(league)), "Standard")
+
+
+# -----------------------
+# Economy snapshot
+# -----------------------
+def get_economy(league: str = None) -> dict:
+    """
+    Leagues and currency rates of a league (the current league by default), from the cached price snapshots:
+    {"league", "leagues", "chaosPerDivine", "divinePerChaos", "currency": {name: chaos value}, "fetchedAt"}.
+    A league without any price is marked empty like in get_league_prices(), so unknown
+    league names do not reach poe.ninja on every request.
+    """
+    leagues = get_leagues()
+    league = league or current_league(leagues)
+    poeninja_pricer.sync_from_store(league)
+    if price_cache.is_empty(league):
+        # Unknown league (or poe.ninja down) seen recently: not fetched again until the mark expires
+        incr("empty_league_hits")
+        currency = {}
+    else:
+        currency = poeninja_pricer.get_currency_rates(league)
+        if not currency and not poeninja_pricer.has_cached_prices(league):
+            price_cache.mark_empty(league)
+    chaos_per_divine = currency.get("Divine Orb")
+    return {
+        "league": league,
+        "leagues": leagues,
+        "chaosPerDivine": chaos_per_divine,
+        "divinePerChaos": 1 / chaos_per_divine if chaos_per_divine else None,
+        "currency": currency,
+        "fetchedAt": price_cache.fetched_at(league, "currency"),
+    }
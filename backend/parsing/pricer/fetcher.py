@@ -0,0 +1,148 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from parsing.http_client import client
+from parsing.metrics import incr, stage
+
+# -----------------------
+# poe.ninja configuration
+# -----------------------
+# Base URL of the price source, can point to a local stand-in (see benchmarks/ninja_standin.py)
+POE_NINJA_API_URL = os.getenv("POE_NINJA_API_URL", "https://poe.ninja/api/data").rstrip("/")
+# Timeout (in seconds) applied to each category request
+POE_NINJA_TIMEOUT = float(os.getenv("POE_NINJA_TIMEOUT", "10"))
+
+# Categories served by "currencyoverview", every other category goes through "itemoverview"
+CURRENCY_OVERVIEW_TYPES = {"Currency", "Fragment"}
+
+# Pooled session of the shared HTTP client (retries, backoff and per-host limits in parsing/http_client.py)
+session = client.session
+
+
+# Returned instead of a payload when poe.ninja answers a conditional request with 304
+NOT_MODIFIED = object()
+
+
+class FetchResult:
+    """
+    Result of a multi-category fetch.
+    - payloads: category -> decoded JSON for every category that was downloaded
+    - errors: category -> error message for every category that failed
+    - validators: category -> (ETag, Last-Modified) of each downloaded payload
+    - not_modified: categories unchanged since the validators given to the fetch (304)
+    """
+    __slots__ = ("payloads", "errors", "validators", "not_modified")
+
+    def __init__(self):
+        self.payloads = {}
+        self.errors = {}
+        self.validators = {}
+        self.not_modified = set()
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+# -----------------------
+# Fetch
+# -----------------------
+def category_url(league: str, category: str) -> str:
+    """
+    Build the poe.ninja overview URL of a category.
+    """
+    overview = "currencyoverview" if category in CURRENCY_OVERVIEW_TYPES else "itemoverview"
+    return f"{POE_NINJA_API_URL}/{overview}?league={league}&type={category}"
+
+def fetch_category(league: str, category: str, timeout: float = None) -> dict:
+    """
+    Download one poe.ninja category through the shared HTTP client (retried on
+    transient failures). Raises on network or HTTP errors.
+    """
+    return client.get(category_url(league, category), timeout=timeout or POE_NINJA_TIMEOUT).json()
+
+def fetch_category_if_modified(league: str, category: str, timeout: float = None, validator: tuple = None) -> tuple:
+    """
+    Download one poe.ninja category unless it did not change since `validator`,
+    the (ETag, Last-Modified) of the payload held by the caller.
+    Returns (payload, or NOT_MODIFIED on a 304, (ETag, Last-Modified) of the answer).
+    """
+    headers = {}
+    if validator:
+        etag, last_modified = validator
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    # Headers are only sent with a validator, plain downloads stay plain
+    options = {"headers": headers} if headers else {}
+    response = client.get(category_url(league, category), timeout=timeout or POE_NINJA_TIMEOUT, **options)
+    if response.status_code == 304:
+        return NOT_MODIFIED, validator
+    return response.json(), (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+def collect_outcome(result: FetchResult, category: str, outcome) -> None:
+    """
+    Add the outcome of fetch_category_if_modified() (or the exception it raised) to a fetch result.
+    """
+    if isinstance(outcome, BaseException):
+        result.errors[category] = str(outcome)
+        return
+    payload, validator = outcome
+    if payload is NOT_MODIFIED:
+        result.not_modified.add(category)
+    else:
+        result.payloads[category] = payload
+    if validator and any(validator):
+        result.validators[category] = validator
+
+def count_fetches(result: FetchResult, categories: list) -> None:
+    incr("fetches", len(categories))
+    incr("fetch_errors", len(result.errors))
+    incr("fetches_not_modified", len(result.not_modified))
+
+def fetch_categories(league: str, categories: list, timeout: float = None, validators: dict = None) -> FetchResult:
+    """
+    Download several poe.ninja categories of a league in parallel.
+    A failing category does not abort the others: it is reported in `errors`.
+    Categories with a validator in `validators` (category -> (ETag, Last-Modified))
+    are requested conditionally, and listed in `not_modified` when unchanged.
+    """
+    result = FetchResult()
+    if not categories:
+        return result
+    validators = validators or {}
+
+    with stage("fetch"), ThreadPoolExecutor(max_workers=len(categories)) as pool:
+        futures = {
+            cat: pool.submit(fetch_category_if_modified, league, cat, timeout, validators.get(cat))
+            for cat in categories
+        }
+        for cat, future in futures.items():
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = e
+            collect_outcome(result, cat, outcome)
+    count_fetches(result, categories)
+    return result
+
+async def afetch_categories(league: str, categories: list, timeout: float = None, validators: dict = None) -> FetchResult:
+    """
+    Async version of fetch_categories(): the requests run concurrently on worker
+    threads over the shared session, so the event loop keeps serving other
+    requests while poe.ninja answers.
+    """
+    result = FetchResult()
+    validators = validators or {}
+    with stage("fetch"):
+        outcomes = await asyncio.gather(
+            *(asyncio.to_thread(fetch_category_if_modified, league, cat, timeout, validators.get(cat))
+              for cat in categories),
+            return_exceptions=True,
+        )
+    for cat, outcome in zip(categories, outcomes):
+        collect_outcome(result, cat, outcome)
+    count_fetches(result, categories)
+    return result
@@ -0,0 +1,113 @@
+import sys
+from typing import NamedTuple
+
+from parsing.price_keys import normalize_name
+
+
+# -----------------------
+# Gem records
+# -----------------------
+class GemRecord(NamedTuple):
+    """
+    The fields of a poe.ninja SkillGem line used to price gems. The rest of the
+    line (icons, sparklines, listing counts...) is dropped right after download.
+    """
+    key: str          # normalized name
+    name: str
+    variant: str      # "" when the line has no variant
+    level: int
+    quality: int
+    corrupted: bool
+    chaos: float      # None when poe.ninja has no value
+
+def gem_record(line) -> GemRecord:
+    """
+    Project a poe.ninja SkillGem line (dict) on a GemRecord. Records are returned as-is.
+    Names repeat across the levels and qualities of a gem, so they are interned.
+    """
+    if isinstance(line, GemRecord):
+        return line
+    name = line.get("name") or line.get("baseType") or ""
+    return GemRecord(
+        sys.intern(normalize_name(name)),
+        sys.intern(name),
+        sys.intern(line.get("variant") or ""),
+        int(line.get("gemLevel", 0)),
+        int(line.get("gemQuality", 0)),
+        bool(line.get("corrupted", False)),
+        line.get("chaosValue"),
+    )
+
+def slim_gem_lines(lines: list) -> list:
+    """
+    Project a poe.ninja SkillGem "lines" list on GemRecords.
+    """
+    return [gem_record(line) for line in lines]
+
+
+# -----------------------
+# Gem price index
+# -----------------------
+class GemPriceIndex:
+    """
+    Lookup tables built once from a poe.ninja SkillGem list (GemRecords, raw lines are projected):
+    - by_name: normalized name -> {(level, quality): record}
+    - by_variant: lowercase variant -> {(level, quality): record}
+    - first_by_name: normalized name -> first record with this name (name-only fallback)
+    Every table keeps the first record of the poe.ninja list for a given key,
+    which is the record a linear scan of the list would have returned.
+    """
+    __slots__ = ("lines", "by_name", "by_variant", "first_by_name", "_positions")
+
+    def __init__(self, gems_list: list):
+        self.lines = slim_gem_lines(gems_list)
+        self.by_name = {}
+        self.by_variant = {}
+        self.first_by_name = {}
+        # id(record) -> position in the list, to break ties between a name match and a variant match
+        self._positions = {}
+
+        for position, g in enumerate(self.lines):
+            self._positions[id(g)] = position
+            key = (g.level, g.quality)
+
+            self.by_name.setdefault(g.key, {}).setdefault(key, g)
+            self.first_by_name.setdefault(g.key, g)
+
+            if g.variant:
+                self.by_variant.setdefault(g.variant.lower(), {}).setdefault(key, g)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def find(self, name_lower: str, level: int, quality: int, matching_variants: list):
+        """
+        Return the first record matching the gem name (or one of its matching variants)
+        at the given level and quality, or None.
+        """
+        key = (level, quality)
+        best = self.by_name.get(name_lower, {}).get(key)
+        for variant in matching_variants:
+            candidate = self.by_variant[variant].get(key)
+            if candidate is not None and (best is None or self._positions[id(candidate)] < self._positions[id(best)]):
+                best = candidate
+        return best
+
+    def first(self, name_lower: str):
+        """
+        First record of a normalized gem name (name-only fallback), or None.
+        """
+        return self.first_by_name.get(name_lower)
+
+    def variants_in(self, name_lower: str) -> list:
+        """
+        Variants contained in a normalized gem name (matched the same way as the gem name itself).
+        """
+        return [variant for variant in self.by_variant if variant in name_lower]
+
+
+def build_gem_index(gems_list: list) -> GemPriceIndex:
+    """
+    Build the gem price index of a poe.ninja SkillGem list (raw lines or GemRecords).
+    """
+    return GemPriceIndex(gems_list)
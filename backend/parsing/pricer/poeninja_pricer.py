@@ -1,104 +1,429 @@
+import asyncio
 import os
 import json
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from parsing.decoder.pob_decoder import decode_pob
+from parsing.metrics import incr, stage
+from parsing.price_keys import unique_lookup
+from parsing.pricer.fetcher import afetch_categories, fetch_categories
+from parsing.pricer.gem_index import GemPriceIndex, build_gem_index, normalize_name, slim_gem_lines
+from parsing.pricer.price_cache import RevalidationStore, SingleFlight, price_cache
+from parsing.pricer.snapshot_store import load_compact_snapshot, load_snapshot_if_changed
+from parsing.pricer.unique_index import UniquePriceIndex, build_unique_index, unique_record
+
+# When enabled, requests never call poe.ninja: prices only come from the snapshots
+# published by the "refresh_prices" worker
+PRICE_SNAPSHOTS_ONLY = os.getenv("POE_PRICE_SNAPSHOTS_ONLY", "false").lower() in ("1", "true", "yes")
+
+# -----------------------
+# poe.ninja categories
+# -----------------------
+UNIQUE_CATEGORIES = [
+    "UniqueArmour", "UniqueWeapon", "UniqueAccessory",
+    "UniqueFlask", "UniqueJewel"
+]
+GEM_CATEGORY = "SkillGem"
+CURRENCY_CATEGORY = "Currency"
+
+LEAGUE_CATEGORIES = UNIQUE_CATEGORIES + [GEM_CATEGORY, CURRENCY_CATEGORY]
+# Price snapshot cache categories needed to price a build
+PRICE_CATEGORIES = ("uniques", "gems", "divine")
+
+# Whole-league fetches in progress (async path), shared by concurrent requests for the same league
+league_fetches = SingleFlight()
+# Validators and parsed values of the downloaded categories, to revalidate them with conditional requests
+category_store = RevalidationStore()
+
+def report_fetch_errors(result) -> None:
+    """
+    Print the categories that could not be fetched (partial failure of a multi-category fetch).
+    """
+    for cat, error in result.errors.items():
+        print(f"Error fetching {cat}: {error}")
 
 # -----------------------
 # Fetch prices from poe.ninja (with 5/6 link support)
 # -----------------------
-def fetch_unique_prices(league: str = "Standard") -> dict:
-    """
-    Fetch unique item prices from poe.ninja for a given league (here Standard).
-    Query several poe.ninja "itemoverview" categories.
-    For "UniqueArmour" and "UniqueWeapon", poe.ninja includes a `links` field
-    on each entry (5 or 6) when that listing refers specifically to a 5L/6L item.
-    """
-    categories = [
-        "UniqueArmour", "UniqueWeapon", "UniqueAccessory",
-        "UniqueFlask", "UniqueJewel"
-    ]
-    prices = {}
-    for cat in categories:
-        url = f"https://poe.ninja/api/data/itemoverview?league={league}&type={cat}"
-        try:
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            for line in data.get("lines", []):
-                name = line.get("name")
-                chaos = line.get("chaosValue")
-                if not name or chaos is None:
-                    continue
-
-                # Always store the base (non-link-specific) price under the plain name
-                prices[name] = chaos
-
-                # If the item is a linkable armour/weapon, store 5/6 link prices
-                if cat in ["UniqueArmour", "UniqueWeapon"]:
-                    links = line.get("links")
-                    if links in [5, 6]:
-                        # Store price keyed by "Item Name (5L)" or "Item Name (6L)"
-                        prices[f"{name} ({links}L)"] = chaos
-
-        except Exception as e:
-            print(f"Error fetching {cat}: {e}")
-    return prices
+def parse_unique_prices(payloads: dict) -> list:
+    """
+    Build the unique records (UniqueRecord) of poe.ninja "itemoverview" payloads (category -> JSON).
+    Every priced line is kept with its base type, variant, relic flag and links
+    (poe.ninja sets `links` to 5 or 6 on the UniqueArmour / UniqueWeapon lines
+    listing a 5L/6L item), so lines of the same unique no longer overwrite each other.
+    """
+    records = []
+    for cat in UNIQUE_CATEGORIES:
+        data = payloads.get(cat)
+        if not data:
+            continue
+        for line in data.get("lines", []):
+            if line.get("name") and line.get("chaosValue") is not None:
+                records.append(unique_record(line))
+    return records
+
+def merge_unique_prices(*category_prices) -> list:
+    """
+    Merge the unique records parsed per category (in UNIQUE_CATEGORIES order, missing categories as None).
+    """
+    records = []
+    for values in category_prices:
+        records.extend(values or [])
+    return records
+
+def unique_prices_of(league: str, values: dict) -> list:
+    """
+    Unique records of a league from parsed category values (see category_values()).
+    The same list is returned as long as no unique category changed.
+    """
+    return category_store.derive(league, "uniques", tuple(values.get(cat) for cat in UNIQUE_CATEGORIES),
+                                 merge_unique_prices)
+
+def fetch_unique_prices(league: str = "Standard") -> list:
+    """
+    Fetch unique item prices from poe.ninja for a given league (here Standard), as UniqueRecords.
+    The unique categories are queried in parallel, a failing category is reported
+    and the prices of the other categories are still returned.
+    """
+    return unique_prices_of(league, fetch_category_values(league, UNIQUE_CATEGORIES))
+
+def unique_index_of(league: str, uniques: list) -> UniquePriceIndex:
+    """
+    Unique price index of a league, only rebuilt when its unique records changed.
+    """
+    return category_store.derive(league, "unique_index", (uniques,), build_unique_index)
+
+def fetch_unique_index(league: str = "Standard") -> UniquePriceIndex:
+    """
+    Fetch the uniques of a league from poe.ninja and index them (unchanged uniques keep their index).
+    """
+    return unique_index_of(league, fetch_unique_prices(league))
+
 # -----------------------
 # Fetch gems
 # -----------------------
 def fetch_gems_with_levels(league: str = "Standard") -> list:
     """
-    Fetch all gems (including levels and quality variants) from poe.ninja.
+    Fetch all gems (including levels and quality variants) from poe.ninja,
+    as GemRecords holding only the fields used by the gem matcher.
     """
+    return fetch_category_values(league, [GEM_CATEGORY]).get(GEM_CATEGORY) or []
 
-    url = f"https://poe.ninja/api/data/itemoverview?league={league}&type=SkillGem"
-    try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        return r.json().get("lines", [])
-    except Exception as e:
-        print(f"Error fetching SkillGem: {e}")
-        return []
+def gem_index_of(league: str, gems: list) -> GemPriceIndex:
+    """
+    Gem price index of a league, only rebuilt when its gem list changed.
+    """
+    return category_store.derive(league, "gem_index", (gems,), build_gem_index)
+
+def fetch_gem_index(league: str = "Standard") -> GemPriceIndex:
+    """
+    Fetch the gems of a league from poe.ninja and index them (unchanged gems keep their index).
+    """
+    return gem_index_of(league, fetch_gems_with_levels(league))
 
 # -----------------------
 # Chaos to divine rate
 # -----------------------
+def parse_currency_rates(data: dict) -> dict:
+    """
+    Read every currency value (in chaos) from a poe.ninja "currencyoverview" payload.
+    """
+    return {
+        line["currencyTypeName"]: line.get("chaosEquivalent")
+        for line in (data or {}).get("lines", [])
+        if line.get("currencyTypeName")
+    }
+
+def fetch_currency_rates(league: str = "Standard") -> dict:
+    """
+    Fetch the value (in chaos) of every currency of a league.
+    """
+    return fetch_category_values(league, [CURRENCY_CATEGORY]).get(CURRENCY_CATEGORY) or {}
+
+def parse_chaos_to_divine_rate(data: dict) -> float:
+    """
+    Read the divine orb value (in chaos) from a poe.ninja "currencyoverview" payload.
+    """
+    for line in (data or {}).get("lines", []):
+        if line.get("currencyTypeName") == "Divine Orb":
+            return line.get("chaosEquivalent")
+    return None
+
 def fetch_chaos_to_divine_rate(league: str = "Standard") -> float:
     """
     Fetch the conversion rate from chaos to divine orbs.
     """
-    url = f"https://poe.ninja/api/data/currencyoverview?league={league}&type=Currency"
-    try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        for line in data.get("lines", []):
-            if line.get("currencyTypeName") == "Divine Orb":
-                return line.get("chaosEquivalent")
-    except Exception as e:
-        print(f"Error fetching chaos/divine rate: {e}")
-    return None
+    return fetch_currency_rates(league).get("Divine Orb")
+
+# -----------------------
+# Conditional downloads
+# -----------------------
+def parse_category(category: str, payload: dict):
+    """
+    Parse the payload of one category into the value kept between downloads:
+    unique records, gem records or currency rates.
+    """
+    if category in UNIQUE_CATEGORIES:
+        return parse_unique_prices({category: payload})
+    if category == GEM_CATEGORY:
+        return slim_gem_lines((payload or {}).get("lines", []))
+    return parse_currency_rates(payload)
+
+def category_values(league: str, result) -> dict:
+    """
+    Parsed value of every category of a fetch result (see parse_category()).
+    Downloaded payloads are parsed and kept with their validators, categories
+    answered 304 reuse the value parsed at their last download.
+    """
+    values = {}
+    for cat, payload in result.payloads.items():
+        values[cat] = parse_category(cat, payload)
+        category_store.put(league, cat, result.validators.get(cat), values[cat])
+    for cat in result.not_modified:
+        values[cat] = category_store.value(league, cat)
+    return values
+
+def fetch_category_values(league: str, categories: list) -> dict:
+    """
+    Fetch categories of a league (conditionally when they were downloaded before) and return their parsed values.
+    """
+    result = fetch_categories(league, categories, validators=category_store.validators(league, categories))
+    report_fetch_errors(result)
+    return category_values(league, result)
+
+# -----------------------
+# Full league snapshot
+# -----------------------
+def build_league_snapshot(league: str, result) -> dict:
+    """
+    Build a league snapshot {"league", "fetchedAt", "uniques", "gems", "divine", "currency"}
+    from a multi-category fetch result. A part is None when one of its categories failed.
+    Parts whose categories were not modified are the objects of the previous snapshot.
+    """
+    values = category_values(league, result)
+    snapshot = {
+        "league": league,
+        "fetchedAt": time.time(),
+        "uniques": None,
+        "gems": None,
+        "divine": None,
+        "currency": None,
+    }
+    if all(values.get(cat) is not None for cat in UNIQUE_CATEGORIES):
+        snapshot["uniques"] = unique_prices_of(league, values)
+    if values.get(GEM_CATEGORY) is not None:
+        snapshot["gems"] = values[GEM_CATEGORY]
+    if values.get(CURRENCY_CATEGORY) is not None:
+        snapshot["currency"] = values[CURRENCY_CATEGORY]
+        snapshot["divine"] = snapshot["currency"].get("Divine Orb")
+    return snapshot
+
+def fetch_league_snapshot(league: str = "Standard") -> tuple:
+    """
+    Fetch every category needed to price a build for a league, all in parallel.
+    Categories downloaded before are revalidated (ETag / Last-Modified) instead of downloaded again.
+    Returns (snapshot, errors), errors being category -> message.
+    """
+    result = fetch_categories(league, LEAGUE_CATEGORIES, validators=category_store.validators(league, LEAGUE_CATEGORIES))
+    return build_league_snapshot(league, result), result.errors
+
+async def afetch_league_snapshot(league: str = "Standard") -> tuple:
+    """
+    Async version of fetch_league_snapshot().
+    """
+    result = await afetch_categories(league, LEAGUE_CATEGORIES,
+                                     validators=category_store.validators(league, LEAGUE_CATEGORIES))
+    return build_league_snapshot(league, result), result.errors
 
 # -----------------------
-# Helper
+# Cached snapshots
 # -----------------------
-def normalize_name(name: str) -> str:
+def load_category(league: str, category: str, fetch):
+    """
+    Loader of a cached category: the published snapshot in snapshots-only mode, poe.ninja otherwise.
+    """
+    if PRICE_SNAPSHOTS_ONLY:
+        snapshot = load_compact_snapshot(league)
+        return getattr(snapshot, category) if snapshot is not None else None
+    return fetch(league)
+
+def get_unique_index(league: str = "Standard") -> UniquePriceIndex:
+    """
+    Unique price index for a league, served from the price snapshot cache.
+    The index is built once when the unique snapshot is fetched.
+    """
+    return price_cache.get(
+        league, "uniques", lambda: load_category(league, "uniques", fetch_unique_index) or build_unique_index([])
+    )
+
+def get_gem_index(league: str = "Standard") -> GemPriceIndex:
+    """
+    Gem price index for a league, served from the price snapshot cache.
+    The index is built once when the gem snapshot is fetched.
+    """
+    return price_cache.get(
+        league, "gems", lambda: load_category(league, "gems", fetch_gem_index) or build_gem_index([])
+    )
+
+def get_chaos_to_divine_rate(league: str = "Standard") -> float:
+    """
+    Chaos to divine rate for a league, served from the price snapshot cache.
+    """
+    return price_cache.get(league, "divine", lambda: load_category(league, "divine", fetch_chaos_to_divine_rate))
+
+def get_currency_rates(league: str = "Standard") -> dict:
+    """
+    Currency name -> chaos value for a league, served from the price snapshot cache.
+    """
+    return price_cache.get(league, "currency", lambda: load_category(league, "currency", fetch_currency_rates)) or {}
+
+def cache_league_snapshot(league: str, snapshot: dict) -> None:
+    """
+    Put the parts of a league snapshot into the price snapshot cache.
+    """
+    fetched_at = snapshot.get("fetchedAt")
+    price_cache.put(league, "uniques", unique_index_of(league, snapshot.get("uniques") or []), fetched_at)
+    price_cache.put(league, "gems", gem_index_of(league, snapshot.get("gems") or []), fetched_at)
+    price_cache.put(league, "divine", snapshot.get("divine"), fetched_at)
+    price_cache.put(league, "currency", snapshot.get("currency"), fetched_at)
+
+def cache_compact_snapshot(league: str, snapshot) -> None:
+    """
+    Put the parts of a mapped compact snapshot into the price snapshot cache.
+    Lookups then read the shared mapped file instead of per-process dicts.
+    """
+    price_cache.put(league, "uniques", snapshot.uniques, snapshot.fetched_at)
+    price_cache.put(league, "gems", snapshot.gems, snapshot.fetched_at)
+    price_cache.put(league, "divine", snapshot.divine, snapshot.fetched_at)
+    price_cache.put(league, "currency", snapshot.currency, snapshot.fetched_at)
+
+def sync_from_store(league: str) -> None:
+    """
+    Load the snapshot published by the refresh worker into the cache when it changed.
+    """
+    snapshot = load_snapshot_if_changed(league)
+    if snapshot is not None:
+        cache_compact_snapshot(league, snapshot)
+
+def get_league_prices(league: str = "Standard") -> tuple:
+    """
+    Return (unique price index, gem price index, chaos to divine rate) for a league.
+    A newly published worker snapshot is picked up first. Snapshots missing
+    from the cache are then fetched in parallel, so a cold league costs the
+    time of the slowest poe.ninja category.
+    A league that had no price at all is not fetched again while it is marked
+    empty (see PriceSnapshotCache.mark_empty()): it resolves to empty prices.
+    """
+    sync_from_store(league)
+    if price_cache.is_empty(league):
+        incr("empty_league_hits")
+        return empty_league_prices()
+    getters = {
+        "uniques": get_unique_index,
+        "gems": get_gem_index,
+        "divine": get_chaos_to_divine_rate,
+    }
+    cold = [category for category in getters if not price_cache.is_servable(league, category)]
+    values = {}
+    if len(cold) > 1:
+        with ThreadPoolExecutor(max_workers=len(cold)) as pool:
+            # Run with the request context so fetches are counted in its metrics
+            futures = {category: pool.submit(copy_context().run, getters[category], league) for category in cold}
+            values = {category: future.result() for category, future in futures.items()}
+    for category, getter in getters.items():
+        if category not in values:
+            values[category] = getter(league)
+    prices = values["uniques"], values["gems"], values["divine"]
+    if not has_prices(prices):
+        price_cache.mark_empty(league)
+    return prices
+
+def empty_league_prices() -> tuple:
     """
-    Normalize gem names for comparison (lowercase, remove ' support').
+    Prices of a league without any price (see has_prices()).
     """
-    return name.lower().replace(" support", "").strip()
+    return build_unique_index([]), build_gem_index([]), None
+
+async def afetch_and_cache_league(league: str) -> None:
+    """
+    Fetch every category of a cold league and cache the parts that succeeded.
+    """
+    if not is_league_cold(league):
+        # Cached by a fetch that finished while this request was waiting
+        return
+    snapshot, errors = await afetch_league_snapshot(league)
+    for cat, error in errors.items():
+        print(f"Error fetching {cat}: {error}")
+    cache_league_snapshot(league, snapshot)
+    if not has_cached_prices(league):
+        # Nothing to price with: the blocking fallback must not fetch the league again
+        price_cache.mark_empty(league)
+
+def is_league_cold(league: str) -> bool:
+    """
+    True when one of the snapshots needed to price the league must be loaded before it can be served:
+    not cached, or expired past its stale period.
+    """
+    return not all(price_cache.is_servable(league, category) for category in PRICE_CATEGORIES)
+
+def has_cached_prices(league: str) -> bool:
+    """
+    True when some of the snapshots needed to price the league can be served from the cache.
+    """
+    return any(price_cache.is_servable(league, category) for category in PRICE_CATEGORIES)
+
+async def aget_league_prices(league: str = "Standard") -> tuple:
+    """
+    Async version of get_league_prices(): a cold league is fetched with the async
+    client, so waiting for poe.ninja does not hold a worker thread. Concurrent
+    requests for the same cold league share one fetch.
+    """
+    sync_from_store(league)
+    if price_cache.is_empty(league):
+        incr("empty_league_hits")
+        return empty_league_prices()
+    if not PRICE_SNAPSHOTS_ONLY and is_league_cold(league):
+        await league_fetches.ado(league, lambda: afetch_and_cache_league(league))
+    if is_league_cold(league):
+        # Parts that failed (or snapshots-only mode) fall back to the blocking loaders, off the event loop
+        return await asyncio.to_thread(get_league_prices, league)
+    return get_league_prices(league)
+
+def invalidate_prices(league: str = None) -> None:
+    """
+    Drop the cached snapshots of a league (or of every league) so the next request refetches them.
+    """
+    price_cache.invalidate(league)
 
 # -----------------------
 # GEM PRICE FINDER
 # -----------------------
-def find_gem_price(gem, gems_list, chaos_to_div):
+def gem_price_result(g, level, quality, fallback_used: bool, chaos_to_div) -> dict:
+    """
+    Format a matched gem record as the price fields added to a PoB gem.
+    """
+    chaos = g.chaos
+    return {
+        "priceChaos": chaos,
+        "priceDivine": round(chaos / chaos_to_div, 2) if chaos and chaos_to_div else None,
+        "matchedLevel": level,
+        "matchedQuality": quality,
+        "fallbackUsed": fallback_used
+    }
+
+def find_gem_price(gem, gems, chaos_to_div):
     """
     Attempt to find the price of a gem using fallback logic.
     - Tries exact level and quality first.
     - Then tries fallback levels depending on gem type.
     - Fallback qualities: prioritizes original quality, then 23, 20, 0.
     - Returns a dict with chaos/divine prices, matched level/quality, and whether a fallback was used.
+    `gems` is a gem index (GemPriceIndex or CompactGemIndex), or a raw poe.ninja gem list indexed on the fly.
     """
+    if isinstance(gems, list):
+        gems = build_gem_index(gems)
+
     gem_name = gem.get("nameSpec")
     gem_level = int(gem.get("level", 1))
     gem_quality = int(gem.get("quality", 0))
@@ -116,34 +441,18 @@ def find_gem_price(gem, gems_list, chaos_to_div):
     fallback_qualities = [gem_quality, 23, 20, 0] if not (gem_quality == 0 and gem_level > 1) else [0]
 
     # Search for exact match or fallback
+    matching_variants = gems.variants_in(name_lower)
     for lvl in fallback_levels:
         for qual in fallback_qualities:
-            for g in gems_list:
-                g_name = normalize_name(g.get("name") or g.get("baseType", ""))
-                if g_name != name_lower:
-                    variant = g.get("variant", "")
-                    if variant.lower() not in name_lower:
-                        continue
-                if int(g.get("gemLevel", 0)) == lvl and int(g.get("gemQuality", 0)) == qual:
-                    return {
-                        "priceChaos": g.get("chaosValue"),
-                        "priceDivine": round(g.get("chaosValue") / chaos_to_div, 2) if g.get("chaosValue") else None,
-                        "matchedLevel": lvl,
-                        "matchedQuality": qual,
-                        "fallbackUsed": False if lvl == gem_level and qual == gem_quality else True
-                    }
+            g = gems.find(name_lower, lvl, qual, matching_variants)
+            if g is not None:
+                fallback_used = False if lvl == gem_level and qual == gem_quality else True
+                return gem_price_result(g, lvl, qual, fallback_used, chaos_to_div)
 
     # Last fallback: match by name only
-    for g in gems_list:
-        g_name = normalize_name(g.get("name") or g.get("baseType", ""))
-        if g_name == name_lower:
-            return {
-                "priceChaos": g.get("chaosValue"),
-                "priceDivine": round(g.get("chaosValue") / chaos_to_div, 2) if g.get("chaosValue") else None,
-                "matchedLevel": g.get("gemLevel"),
-                "matchedQuality": g.get("gemQuality"),
-                "fallbackUsed": True
-            }
+    g = gems.first(name_lower)
+    if g is not None:
+        return gem_price_result(g, g.level, g.quality, True, chaos_to_div)
 
     # If no match found, return None for all prices
     return {"priceChaos": None, "priceDivine": None, "matchedLevel": None, "matchedQuality": None, "fallbackUsed": True}
@@ -151,67 +460,201 @@ def find_gem_price(gem, gems_list, chaos_to_div):
 # -----------------------
 # Add prices to PoB JSON
 # -----------------------
-def add_prices_to_json(pob_json: dict, league: str = "Standard", debug: bool = False) -> dict:
+def resolve_prices(league: str = "Standard", as_of=None) -> tuple:
+    """
+    Return (unique price index, gem price index, chaos to divine rate) used to price builds:
+    current prices of the league, or its stored price history at `as_of` (datetime).
+    """
+    with stage("prices"):
+        if as_of is not None:
+            # Imported here: price history needs the Django models, the live pricer does not
+            from parsing.pricer.price_history import get_history_prices
+            return get_history_prices(league, as_of)
+        return get_league_prices(league)
+
+def add_prices_to_json(pob_json: dict, league: str = "Standard", debug: bool = False, as_of=None) -> dict:
     """
     Add chaos and divine prices to PoB JSON.
-    - Fetches unique item prices.
-    - Fetches gem prices with level and quality.
+    - Gets unique item prices (cached per league).
+    - Gets gem prices with level and quality (cached per league).
     - Updates items and gems with prices and fallback info.
+    With `as_of` (datetime), prices come from the stored price history instead of current prices.
+    """
+    return apply_prices(pob_json, resolve_prices(league, as_of), debug)
+
+def unique_chaos_price(lookup: dict, unique_index):
+    """
+    Chaos price of a unique (see unique_lookup()): its exact poe.ninja line first, then the
+    fallbacks of the index (unlinked price, regular price, other base types and variants).
+    Only "name" is required, so price lines stored with just "name" / "links" still resolve.
     """
-    prices_dict = fetch_unique_prices(league)
-    gems_list = fetch_gems_with_levels(league)
-    chaos_to_div = fetch_chaos_to_divine_rate(league)
+    record = unique_index.find(lookup["name"], lookup.get("baseType"), lookup.get("variant"),
+                               lookup.get("links") or 0, bool(lookup.get("relic")))
+    return record.chaos if record is not None else None
 
-    linkable_types = ["Body Armour", "Bow", "Staff", "War staff", "2H Sword", "2H Axe", "2H Mace"]
+def unique_item_price(item: dict, unique_index, chaos_to_div) -> tuple:
+    """
+    (chaos price, divine price) of a PoB item, (None, None) for non-unique or unpriced items.
+    """
+    lookup = unique_lookup(item)
+    if lookup is None:
+        return None, None
+    chaos_price = unique_chaos_price(lookup, unique_index)
+    divine_price = round(chaos_price / chaos_to_div, 2) if chaos_price is not None and chaos_to_div else None
+    return chaos_price, divine_price
+
+def apply_prices(pob_json: dict, prices: tuple, debug: bool = False) -> dict:
+    """
+    Add chaos and divine prices to PoB JSON from already resolved
+    (unique price index, gem price index, chaos to divine rate), see resolve_prices().
+    Lets several builds share the same prices without resolving them again.
+    """
+    unique_index, gem_index, chaos_to_div = prices
 
     # Items
-    for item in pob_json.get("items", []):
-        rarity = item.get("rarity", "").upper()
-        name = item.get("name")
-        chaos_price = None
-        divine_price = None
-
-        # Determine link count if applicable
-        links = None
-        if item.get("subType") in linkable_types:
-            links = item.get("5/6Link")  # PoB JSON already contains 5/6 link info
-
-        # Lookup price
-        if rarity == "UNIQUE":
-            # If the item is linkable, try to find the price for 5L/6L first
-            if links in [5, 6]:
-                chaos_price = prices_dict.get(f"{name} ({links}L)")
-            # If no 5L/6L price found, try the base price
-            if chaos_price is None:
-                chaos_price = prices_dict.get(name)
-            # If no price found, set to None
-            if chaos_price is not None and chaos_to_div:
-                divine_price = round(chaos_price / chaos_to_div, 2)
-
-        item["priceChaos"] = chaos_price
-        item["priceDivine"] = divine_price
+    with stage("uniques"):
+        for item in pob_json.get("items", []):
+            item["priceChaos"], item["priceDivine"] = unique_item_price(item, unique_index, chaos_to_div)
 
     # Gems
-    for skill_slot in pob_json.get("skills", []):
-        for gem in skill_slot.get("gems", []):
-            prices = find_gem_price(gem, gems_list, chaos_to_div)
-            gem["priceChaos"] = prices["priceChaos"]
-            gem["priceDivine"] = prices["priceDivine"]
-            gem["matchedLevel"] = prices["matchedLevel"]
-            gem["matchedQuality"] = prices["matchedQuality"]
-            gem["fallbackUsed"] = prices["fallbackUsed"]
-            if debug:
+    with stage("gems"):
+        for skill_slot in pob_json.get("skills", []):
+            for gem in skill_slot.get("gems", []):
+                prices = find_gem_price(gem, gem_index, chaos_to_div)
+                gem["priceChaos"] = prices["priceChaos"]
+                gem["priceDivine"] = prices["priceDivine"]
+                gem["matchedLevel"] = prices["matchedLevel"]
+                gem["matchedQuality"] = prices["matchedQuality"]
+                gem["fallbackUsed"] = prices["fallbackUsed"]
                 if prices["priceChaos"] is None:
-                    print(f"[WARNING] GEM not found: {gem['nameSpec']} L{gem['level']} Q{gem['quality']}")
-                else:
-                    print(
-                        f"[DEBUG] GEM: {gem['nameSpec']} "
-                        f"(L{gem['level']} Q{gem['quality']}) → "
-                        f"Chaos: {prices['priceChaos']}, Divine: {prices['priceDivine']} "
-                        f"(matched L{prices['matchedLevel']} Q{prices['matchedQuality']}, "
-                        f"fallbackUsed={prices['fallbackUsed']})"
-                    )
+                    incr("gems_unpriced")
+                elif prices["fallbackUsed"]:
+                    incr("gem_fallbacks")
+                if debug:
+                    if prices["priceChaos"] is None:
+                        print(f"[WARNING] GEM not found: {gem['nameSpec']} L{gem['level']} Q{gem['quality']}")
+                    else:
+                        print(
+                            f"[DEBUG] GEM: {gem['nameSpec']} "
+                            f"(L{gem['level']} Q{gem['quality']}) → "
+                            f"Chaos: {prices['priceChaos']}, Divine: {prices['priceDivine']} "
+                            f"(matched L{prices['matchedLevel']} Q{prices['matchedQuality']}, "
+                            f"fallbackUsed={prices['fallbackUsed']})"
+                        )
+
+    return pob_json
+
+# -----------------------
+# Multi-league pricing
+# -----------------------
+# Most leagues priced by one request
+MAX_LEAGUES_PER_REQUEST = int(os.getenv("POE_MAX_LEAGUES_PER_REQUEST", "8"))
+
+def normalize_leagues(leagues: list) -> list:
+    """
+    League names without blanks and duplicates (order kept). Raises ValueError past MAX_LEAGUES_PER_REQUEST.
+    """
+    names = list(dict.fromkeys(league.strip() for league in leagues if league and league.strip()))
+    if not names:
+        raise ValueError("No league to price")
+    if len(names) > MAX_LEAGUES_PER_REQUEST:
+        raise ValueError(f"Too many leagues ({len(names)}, limit is {MAX_LEAGUES_PER_REQUEST})")
+    return names
+
+def has_prices(prices: tuple) -> bool:
+    """
+    False when no part of the resolved prices of a league is available (unknown league, poe.ninja down...).
+    """
+    uniques, gem_index, chaos_to_div = prices
+    return bool(uniques) or bool(gem_index) or chaos_to_div is not None
+
+def resolve_league_prices(leagues: list, as_of=None) -> tuple:
+    """
+    Resolve the prices of several leagues (see resolve_prices()): current prices in parallel,
+    price history one league after the other in the calling thread, so ORM queries stay on a
+    thread whose database connection Django manages.
+    Returns (league -> prices, league -> error message): a league that cannot be
+    priced (unknown league, no history at `as_of`...) does not fail the others.
+    """
+    if as_of is not None:
+        return collect_league_prices(leagues, (capture(resolve_prices, league, as_of) for league in leagues))
+    with ThreadPoolExecutor(max_workers=len(leagues)) as pool:
+        futures = [pool.submit(copy_context().run, capture, resolve_prices, league) for league in leagues]
+        return collect_league_prices(leagues, (future.result() for future in futures))
+
+def capture(function, *args):
+    """
+    function(*args), or the exception it raised.
+    """
+    try:
+        return function(*args)
+    except Exception as e:
+        return e
+
+def collect_league_prices(leagues: list, outcomes) -> tuple:
+    """
+    (league -> prices, league -> error message) from the prices (or exception) resolved for each league.
+    """
+    prices_by_league, errors = {}, {}
+    for league, outcome in zip(leagues, outcomes):
+        if isinstance(outcome, Exception):
+            errors[league] = str(outcome)
+        elif has_prices(outcome):
+            prices_by_league[league] = outcome
+        else:
+            errors[league] = f"No prices available for league {league}"
+    return prices_by_league, errors
+
+async def aresolve_league_prices(leagues: list) -> tuple:
+    """
+    Async version of resolve_league_prices() for current prices: cold leagues are fetched concurrently.
+    """
+    with stage("prices"):
+        outcomes = await asyncio.gather(*(aget_league_prices(league) for league in leagues), return_exceptions=True)
+    return collect_league_prices(leagues, outcomes)
+
+def apply_league_prices(pob_json: dict, prices_by_league: dict, errors: dict = None) -> dict:
+    """
+    Add the prices of several leagues to PoB JSON in one pass over the build:
+    - every item and gem gets "pricesByLeague": {league: same price fields as apply_prices()}
+    - the first league also fills the usual price fields, as apply_prices() would
+    - "leagues" lists the priced leagues, "totalsByLeague" the chaos/divine total of each one
+      and "leagueErrors" the leagues that could not be priced
+    """
+    leagues = list(prices_by_league)
+    totals = {league: 0.0 for league in leagues}
+
+    with stage("uniques"):
+        for item in pob_json.get("items", []):
+            by_league = {}
+            for league, (unique_index, _, chaos_to_div) in prices_by_league.items():
+                chaos, divine = unique_item_price(item, unique_index, chaos_to_div)
+                by_league[league] = {"priceChaos": chaos, "priceDivine": divine}
+                totals[league] += chaos or 0
+            item["pricesByLeague"] = by_league
+            if leagues:
+                item.update(by_league[leagues[0]])
+
+    with stage("gems"):
+        for skill_slot in pob_json.get("skills", []):
+            for gem in skill_slot.get("gems", []):
+                by_league = {}
+                for league, (_, gem_index, chaos_to_div) in prices_by_league.items():
+                    by_league[league] = find_gem_price(gem, gem_index, chaos_to_div)
+                    totals[league] += by_league[league]["priceChaos"] or 0
+                gem["pricesByLeague"] = by_league
+                if leagues:
+                    gem.update(by_league[leagues[0]])
 
+    pob_json["leagues"] = leagues
+    pob_json["totalsByLeague"] = {
+        league: {
+            "priceChaos": round(total, 2),
+            "priceDivine": round(total / prices_by_league[league][2], 2) if prices_by_league[league][2] else None,
+        }
+        for league, total in totals.items()
+    }
+    pob_json["leagueErrors"] = dict(errors or {})
     return pob_json
 
 
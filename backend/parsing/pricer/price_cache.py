@@ -0,0 +1,328 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from parsing.metrics import incr
+
+# -----------------------
+# Cache configuration
+# -----------------------
+# Seconds during which a snapshot is served as-is
+PRICE_CACHE_TTL = int(os.getenv("POE_PRICE_CACHE_TTL", "900"))
+# Extra seconds during which an expired snapshot is still served while it is refreshed in background
+PRICE_CACHE_STALE_TTL = int(os.getenv("POE_PRICE_CACHE_STALE_TTL", "3600"))
+# Seconds during which a league that had no price at all (unknown league, poe.ninja down) is not fetched again
+EMPTY_LEAGUE_TTL = int(os.getenv("POE_EMPTY_LEAGUE_TTL", "60"))
+
+
+class CacheEntry:
+    """
+    One cached price snapshot for a (league, category) pair.
+    """
+    __slots__ = ("value", "stored_at", "fetched_at", "refreshing")
+
+    def __init__(self, value, stored_at: float, fetched_at: float):
+        self.value = value
+        self.stored_at = stored_at  # monotonic clock, used for TTL checks
+        self.fetched_at = fetched_at  # wall clock, used for reporting
+        self.refreshing = False
+
+
+# -----------------------
+# Single-flight loads
+# -----------------------
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the load,
+    callers arriving while it is in progress wait for its result (or its exception)
+    instead of starting the same load again. Works across threads and event loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future of the load in progress
+
+    def _join(self, key) -> tuple:
+        """
+        Return (future, True if the caller must run the load).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key, future: Future, result=None, error: BaseException = None) -> None:
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, load):
+        """
+        Run `load()` once for all the threads asking for `key` at the same time.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            incr("coalesced_loads")
+            return future.result()
+        try:
+            result = load()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key, load):
+        """
+        Async version of do(): `load` is a coroutine function, waiting callers do not block the event loop.
+        The load runs in its own task: a caller cancelled while waiting (client gone), the leader
+        included, does not cancel the load nor the other callers waiting for it.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            incr("coalesced_loads")
+            return await asyncio.shield(asyncio.wrap_future(future))
+        task = asyncio.ensure_future(load())
+        task.add_done_callback(lambda done: self._finish_task(key, future, done))
+        return await asyncio.shield(task)
+
+    def _finish_task(self, key, future: Future, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self._finish(key, future, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._finish(key, future, error=task.exception())
+        else:
+            self._finish(key, future, task.result())
+
+
+# -----------------------
+# Price snapshot cache
+# -----------------------
+class PriceSnapshotCache:
+    """
+    In-memory price snapshots keyed by (league, category).
+    - Fresh entries (younger than `ttl`) are returned directly.
+    - Stale entries (younger than `ttl + stale_ttl`) are returned directly while a
+      background thread reloads them (stale-while-revalidate).
+    - Missing or too old entries are loaded synchronously, once for all the
+      requests missing the same entry at the same time (single-flight).
+    Empty loader results (failed fetch) are never stored, so a poe.ninja outage
+    does not get pinned in the cache for a whole TTL. A league without any price
+    is only marked empty for `empty_ttl` (see mark_empty()).
+    """
+
+    def __init__(self, ttl: int = PRICE_CACHE_TTL, stale_ttl: int = PRICE_CACHE_STALE_TTL,
+                 empty_ttl: int = EMPTY_LEAGUE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.empty_ttl = empty_ttl
+        self._entries = {}
+        self._empty = {}  # league -> monotonic time it was marked empty
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def get(self, league: str, category: str, loader):
+        """
+        Return the snapshot of `category` for `league`, calling `loader()` when it must be (re)loaded.
+        """
+        key = (league, category)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.stored_at
+                if age < self.ttl:
+                    incr("price_cache_hits")
+                    return entry.value
+                if age < self.ttl + self.stale_ttl:
+                    incr("price_cache_stale_hits")
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry.value
+
+        incr("price_cache_misses")
+        return self._flights.do(key, lambda: self._load(key, loader))
+
+    def _load(self, key: tuple, loader):
+        """
+        Synchronous load of a missing entry (run by one caller at a time per key).
+        An entry stored by a load that finished just before is used as-is.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at < self.ttl:
+                return entry.value
+        value = loader()
+        self.put(key[0], key[1], value)
+        return value
+
+    def _refresh(self, key: tuple, loader) -> None:
+        """
+        Background reload of a stale entry. Keeps the stale value if the reload fails.
+        """
+        try:
+            value = loader()
+        except Exception as e:
+            print(f"Error refreshing {key[1]} prices for {key[0]}: {e}")
+            value = None
+        if value:
+            self.put(key[0], key[1], value)
+        else:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def put(self, league: str, category: str, value, fetched_at: float = None) -> None:
+        """
+        Store a snapshot and bump the league version. Empty values are ignored.
+        `fetched_at` is when the prices were downloaded (now by default).
+        Storing the very object already cached (prices revalidated as unchanged)
+        only renews the entry: the league version, hence the priced builds cached for it, is kept.
+        """
+        if not value:
+            return
+        with self._lock:
+            entry = self._entries.get((league, category))
+            if entry is not None and entry.value is value:
+                entry.stored_at = time.monotonic()
+                entry.refreshing = False
+                return
+            self._entries[(league, category)] = CacheEntry(value, time.monotonic(), fetched_at or time.time())
+            self._versions[league] = self._versions.get(league, 0) + 1
+            self._empty.pop(league, None)
+
+    def invalidate(self, league: str = None, category: str = None) -> None:
+        """
+        Drop cached snapshots. With no argument everything is dropped,
+        otherwise only entries matching the given league and/or category.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if (league is None or key[0] == league) and (category is None or key[1] == category):
+                    del self._entries[key]
+                    self._versions[key[0]] = self._versions.get(key[0], 0) + 1
+            if league is None:
+                self._empty.clear()
+            else:
+                self._empty.pop(league, None)
+
+    def mark_empty(self, league: str) -> None:
+        """
+        Remember that a league came back without any price, so it is not fetched
+        again for `empty_ttl` seconds. Storing a snapshot of the league clears the mark.
+        """
+        with self._lock:
+            self._empty[league] = time.monotonic()
+
+    def is_empty(self, league: str) -> bool:
+        """
+        True while a league is marked empty (see mark_empty()).
+        """
+        with self._lock:
+            marked_at = self._empty.get(league)
+            if marked_at is None:
+                return False
+            if time.monotonic() - marked_at < self.empty_ttl:
+                return True
+            del self._empty[league]
+            return False
+
+    def version(self, league: str) -> int:
+        """
+        Counter incremented every time a snapshot of the league is stored or invalidated.
+        """
+        with self._lock:
+            return self._versions.get(league, 0)
+
+    def is_servable(self, league: str, category: str) -> bool:
+        """
+        True when get() can answer without a synchronous load: the entry is cached,
+        fresh or stale (younger than `ttl + stale_ttl`).
+        """
+        with self._lock:
+            entry = self._entries.get((league, category))
+            return entry is not None and time.monotonic() - entry.stored_at < self.ttl + self.stale_ttl
+
+    def fetched_at(self, league: str, category: str):
+        """
+        Wall-clock timestamp of the cached snapshot, or None if it is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get((league, category))
+            return entry.fetched_at if entry is not None else None
+
+
+# Shared cache used by the pricer
+price_cache = PriceSnapshotCache()
+
+
+# -----------------------
+# Conditional revalidation
+# -----------------------
+class RevalidationStore:
+    """
+    Validators (ETag, Last-Modified) and parsed value of the last payload downloaded
+    for each (league, poe.ninja category). They are sent back as a conditional request,
+    and on a 304 the parsed value is reused instead of downloading and parsing the payload again.
+    Values built from several categories (merged unique records, unique and gem indexes) are memoized
+    by derive() until one of their inputs changes.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (league, category) -> (validator, parsed value)
+        self._derived = {}  # (league, name) -> (input values, derived value)
+        self._lock = threading.Lock()
+
+    def validators(self, league: str, categories: list) -> dict:
+        """
+        category -> validator, for the categories of the league having a stored payload.
+        """
+        with self._lock:
+            return {
+                cat: self._entries[(league, cat)][0]
+                for cat in categories if (league, cat) in self._entries
+            }
+
+    def put(self, league: str, category: str, validator: tuple, value) -> None:
+        """
+        Keep the parsed value of a downloaded payload. Payloads without validator cannot be revalidated and are not kept.
+        """
+        if validator is None:
+            return
+        with self._lock:
+            self._entries[(league, category)] = (validator, value)
+
+    def value(self, league: str, category: str):
+        with self._lock:
+            entry = self._entries.get((league, category))
+            return entry[1] if entry is not None else None
+
+    def derive(self, league: str, name: str, inputs: tuple, build):
+        """
+        Return build(*inputs), reusing the previous result of `name` when every input is the same object as before.
+        """
+        key = (league, name)
+        with self._lock:
+            memo = self._derived.get(key)
+        if memo is not None and len(memo[0]) == len(inputs) and all(a is b for a, b in zip(memo[0], inputs)):
+            return memo[1]
+        value = build(*inputs)
+        with self._lock:
+            self._derived[key] = (inputs, value)
+        return value
+
+    def clear(self, league: str = None) -> None:
+        with self._lock:
+            for store in (self._entries, self._derived):
+                for key in list(store):
+                    if league is None or key[0] == league:
+                        del store[key]
@@ -0,0 +1,186 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from django.db import transaction
+
+from parsing.models import League, PriceSnapshot, UniquePrice, GemPrice, CurrencyRate
+from parsing.pricer.gem_index import GemRecord, build_gem_index, gem_record, normalize_name
+from parsing.pricer.price_cache import SingleFlight
+from parsing.pricer.unique_index import UniqueRecord, build_unique_index, unique_record
+
+# Rows inserted per bulk_create query
+BULK_BATCH_SIZE = 1000
+# History snapshots kept in memory as price indexes (least recently used ones are dropped)
+HISTORY_CACHE_SIZE = int(os.getenv("POE_HISTORY_CACHE_SIZE", "8"))
+
+
+# -----------------------
+# Snapshot -> rows
+# -----------------------
+def unique_price_rows(uniques: list) -> list:
+    """
+    Turn unique records (or raw poe.ninja unique lines) into (name, base type, variant, links, relic, chaos) rows,
+    links being None for prices that are not link specific.
+    """
+    rows = []
+    for u in map(unique_record, uniques or []):
+        if not u.name or u.chaos is None:
+            continue
+        rows.append((u.name, u.base_type, u.variant, u.links or None, u.relic, u.chaos))
+    return rows
+
+def gem_price_rows(gems: list) -> list:
+    """
+    Turn gem records (or raw poe.ninja gem lines) into (name, variant, level, quality, corrupted, chaos) rows.
+    """
+    rows = []
+    for g in map(gem_record, gems or []):
+        if not g.name or g.chaos is None:
+            continue
+        rows.append((g.name, g.variant, g.level, g.quality, g.corrupted, g.chaos))
+    return rows
+
+def currency_rate_rows(snapshot: dict) -> list:
+    """
+    Turn the currency table of a snapshot into (currency, chaos) rows.
+    Snapshots without currency table only give their divine rate.
+    """
+    currency = snapshot.get("currency")
+    if currency is None:
+        currency = {"Divine Orb": snapshot.get("divine")}
+    return [(name, chaos) for name, chaos in currency.items() if name and chaos is not None]
+
+
+# -----------------------
+# Ingest
+# -----------------------
+def ingest_snapshot(snapshot: dict, batch_size: int = BULK_BATCH_SIZE) -> PriceSnapshot:
+    """
+    Store a league snapshot ({"league", "fetchedAt", "uniques", "gems", "divine", "currency"})
+    as time-stamped rows, inserted in bulk batches inside one transaction.
+    """
+    fetched_at = datetime.fromtimestamp(snapshot["fetchedAt"], tz=timezone.utc)
+    with transaction.atomic():
+        league, _ = League.objects.get_or_create(name=snapshot["league"])
+        price_snapshot = PriceSnapshot.objects.create(league=league, fetched_at=fetched_at)
+
+        UniquePrice.objects.bulk_create(
+            [UniquePrice(snapshot=price_snapshot, name=name, base_type=base_type, variant=variant,
+                         links=links, relic=relic, chaos_value=chaos)
+             for name, base_type, variant, links, relic, chaos in unique_price_rows(snapshot.get("uniques"))],
+            batch_size=batch_size,
+        )
+        GemPrice.objects.bulk_create(
+            [GemPrice(snapshot=price_snapshot, name=name, variant=variant, gem_level=level,
+                      gem_quality=quality, corrupted=corrupted, chaos_value=chaos)
+             for name, variant, level, quality, corrupted, chaos in gem_price_rows(snapshot.get("gems"))],
+            batch_size=batch_size,
+        )
+        CurrencyRate.objects.bulk_create(
+            [CurrencyRate(snapshot=price_snapshot, currency=currency, chaos_equivalent=chaos)
+             for currency, chaos in currency_rate_rows(snapshot)],
+            batch_size=batch_size,
+        )
+    return price_snapshot
+
+
+# -----------------------
+# Query
+# -----------------------
+def snapshot_as_of(league: str, as_of: datetime):
+    """
+    Latest snapshot of a league fetched at or before `as_of`, or None.
+    """
+    return (
+        PriceSnapshot.objects
+        .filter(league__name=league, fetched_at__lte=as_of)
+        .order_by("-fetched_at")
+        .first()
+    )
+
+def load_history_snapshot(price_snapshot: PriceSnapshot) -> dict:
+    """
+    Rebuild a snapshot dict (same layout as the published snapshots) from stored rows.
+    """
+    uniques = [
+        UniqueRecord(name, base_type, variant, links or 0, relic, chaos)
+        for name, base_type, variant, links, relic, chaos in price_snapshot.unique_prices.order_by("id").values_list(
+            "name", "base_type", "variant", "links", "relic", "chaos_value").iterator()
+    ]
+
+    gems = [
+        GemRecord(normalize_name(name), name, variant, level, quality, corrupted, chaos)
+        for name, variant, level, quality, corrupted, chaos in price_snapshot.gem_prices.order_by("id").values_list(
+            "name", "variant", "gem_level", "gem_quality", "corrupted", "chaos_value").iterator()
+    ]
+
+    currency = dict(price_snapshot.currency_rates.order_by("id").values_list("currency", "chaos_equivalent"))
+    return {
+        "league": price_snapshot.league.name,
+        "fetchedAt": price_snapshot.fetched_at.timestamp(),
+        "uniques": uniques,
+        "gems": gems,
+        "divine": currency.get("Divine Orb"),
+        "currency": currency,
+    }
+
+class HistoryPriceCache:
+    """
+    Small LRU cache of the prices of stored snapshots, keyed by snapshot id.
+    Stored snapshots never change: entries are never refreshed, only evicted, and
+    loads run in the calling thread (once for concurrent requests of the same snapshot).
+    """
+
+    def __init__(self, max_size: int = HISTORY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # snapshot id -> prices
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def get(self, snapshot_id: int, loader):
+        with self._lock:
+            if snapshot_id in self._entries:
+                self._entries.move_to_end(snapshot_id)
+                return self._entries[snapshot_id]
+        return self._flights.do(snapshot_id, lambda: self._load(snapshot_id, loader))
+
+    def _load(self, snapshot_id: int, loader):
+        value = loader()
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[snapshot_id] = value
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared cache of history prices
+history_price_cache = HistoryPriceCache()
+
+
+def get_history_prices(league: str, as_of: datetime) -> tuple:
+    """
+    Return (unique price index, gem price index, chaos to divine rate) of a league as of a past date
+    (naive dates are taken as UTC). Loaded snapshots are kept in history_price_cache.
+    Raises ValueError when no snapshot exists before that date.
+    """
+    if as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+    price_snapshot = snapshot_as_of(league, as_of)
+    if price_snapshot is None:
+        raise ValueError(f"No price history for league {league} before {as_of:%Y-%m-%d %H:%M}")
+
+    def load():
+        snapshot = load_history_snapshot(price_snapshot)
+        return build_unique_index(snapshot["uniques"]), build_gem_index(snapshot["gems"]), snapshot["divine"]
+
+    return history_price_cache.get(price_snapshot.pk, load)
@@ -0,0 +1,98 @@
+from parsing.price_keys import GEM_KEY_PREFIX, UNIQUE_KEY_PREFIX, price_lines, unique_key
+from parsing.pricer.gem_index import gem_record
+from parsing.pricer.poeninja_pricer import find_gem_price, unique_chaos_price
+from parsing.pricer.unique_index import unique_record
+
+# -----------------------
+# Build price lines
+# -----------------------
+# Price lines are extracted by parsing/price_keys.py, shared with the decoded build store
+def line_price(line: dict, prices: tuple):
+    """
+    Chaos price of a price line with resolved (unique price index, gem price index, chaos to divine rate).
+    """
+    unique_index, gem_index, _ = prices
+    if line["key"].startswith(UNIQUE_KEY_PREFIX):
+        return unique_chaos_price(line, unique_index)
+    return find_gem_price(line, gem_index, None)["priceChaos"]
+
+def price_build_lines(pob_json: dict, prices: tuple) -> tuple:
+    """
+    (price lines with their "chaos" price, total chaos price) of a decoded build.
+    """
+    lines = price_lines(pob_json)
+    for line in lines:
+        line["chaos"] = line_price(line, prices)
+    return lines, lines_total(lines)
+
+def lines_total(lines: list) -> float:
+    return round(sum(line["chaos"] for line in lines if line.get("chaos")), 2)
+
+def reprice_lines(lines: list, keys: set, prices: tuple) -> bool:
+    """
+    Re-price in place the lines depending on one of `keys`. Returns True when a price changed.
+    """
+    changed = False
+    for line in lines:
+        if line["key"] in keys:
+            chaos = line_price(line, prices)
+            if chaos != line.get("chaos"):
+                line["chaos"] = chaos
+                changed = True
+    return changed
+
+
+# -----------------------
+# Snapshot diff
+# -----------------------
+def uniques_by_name(uniques) -> dict:
+    """
+    unique name -> tuple of its records, in list order.
+    """
+    grouped = {}
+    for u in map(unique_record, uniques or []):
+        grouped.setdefault(u.name, []).append(u)
+    return {name: tuple(records) for name, records in grouped.items()}
+
+def gems_by_key(gems) -> dict:
+    """
+    normalized gem name -> tuple of its records, in list order.
+    """
+    grouped = {}
+    for g in map(gem_record, gems or []):
+        grouped.setdefault(g.key, []).append(g)
+    return {key: tuple(records) for key, records in grouped.items()}
+
+def changed_price_keys(old: dict, new: dict) -> tuple:
+    """
+    Price keys whose prices differ between two league snapshots ({"uniques", "gems", ...}),
+    and the lowercase gem variants of the changed gem records (a gem name containing
+    a variant is priced with that variant's records, see GemPriceIndex.find()).
+    Cost grows with the size of the price lists, not with the number of stored builds.
+    """
+    keys, variants = set(), set()
+    if old.get("uniques") is not new.get("uniques"):
+        old_uniques, new_uniques = uniques_by_name(old.get("uniques")), uniques_by_name(new.get("uniques"))
+        for name in old_uniques.keys() | new_uniques.keys():
+            if old_uniques.get(name) != new_uniques.get(name):
+                keys.add(unique_key(name))
+
+    if old.get("gems") is not new.get("gems"):
+        old_gems, new_gems = gems_by_key(old.get("gems")), gems_by_key(new.get("gems"))
+        for key in old_gems.keys() | new_gems.keys():
+            if old_gems.get(key) != new_gems.get(key):
+                keys.add(GEM_KEY_PREFIX + key)
+                records = old_gems.get(key, ()) + new_gems.get(key, ())
+                variants.update(g.variant.lower() for g in records if g.variant)
+    return keys, variants
+
+def affected_keys(keys: set, variants: set, indexed_keys) -> set:
+    """
+    Changed keys, plus the indexed gem keys whose name contains a changed variant.
+    """
+    if not variants:
+        return set(keys)
+    return set(keys) | {
+        key for key in indexed_keys
+        if key.startswith(GEM_KEY_PREFIX) and any(v in key[len(GEM_KEY_PREFIX):] for v in variants)
+    }
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from parsing.decoder.pob_decoder import decode_pob_to_json, normalize_pob_string
+from parsing.metrics import incr, stage
+from asgiref.sync import sync_to_async
+
+from parsing.pricer.poeninja_pricer import (
+    add_prices_to_json,
+    aget_league_prices,
+    apply_league_prices,
+    apply_prices,
+    aresolve_league_prices,
+    get_league_prices,
+    normalize_leagues,
+    resolve_league_prices,
+)
+from parsing.pricer.price_cache import price_cache
+
+# Maximum number of priced builds kept in memory
+RESULT_CACHE_SIZE = int(os.getenv("POE_PRICE_RESULT_CACHE_SIZE", "256"))
+# When enabled, decoded builds are stored in the database and codes seen before are never decoded again
+STORE_DECODED_BUILDS = os.getenv("POE_STORE_DECODED_BUILDS", "false").lower() in ("1", "true", "yes")
+
+
+# -----------------------
+# LRU cache of priced builds
+# -----------------------
+class PricedBuildCache:
+    """
+    LRU cache of priced builds, keyed by build_cache_key().
+    Entries are tagged with a scope (the league) and its snapshot version: as soon
+    as a newer version is seen for a scope, every entry of the older one is dropped.
+    Cached results are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (scope, version, result)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _evict_older_versions(self, scope: str, version) -> None:
+        # Caller holds the lock
+        if self._versions.get(scope) == version:
+            return
+        self._versions[scope] = version
+        for key in [k for k, (sc, v, _) in self._entries.items() if sc == scope and v != version]:
+            del self._entries[key]
+
+    def get(self, key: str, scope: str, version):
+        with self._lock:
+            self._evict_older_versions(scope, version)
+            entry = self._entries.get(key)
+            if entry is None:
+                incr("result_cache_misses")
+                return None
+            self._entries.move_to_end(key)
+            incr("result_cache_hits")
+            return entry[2]
+
+    def put(self, key: str, scope: str, version, result: dict) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._evict_older_versions(scope, version)
+            self._entries[key] = (scope, version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared cache used by the price endpoint
+priced_build_cache = PricedBuildCache()
+
+
+# -----------------------
+# Keys
+# -----------------------
+def build_cache_key(pob_string: str, scope: str, version) -> str:
+    """
+    Hash of the normalized PoB string, league (scope) and price snapshot version.
+    """
+    raw = "\n".join([normalize_pob_string(pob_string), scope, str(version)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------
+# Cached pricing pipeline
+# -----------------------
+def decode_build(pob_string: str) -> dict:
+    """
+    Decoded build of a PoB code: from the decoded build store when STORE_DECODED_BUILDS is enabled,
+    decoded directly otherwise.
+    """
+    if STORE_DECODED_BUILDS:
+        # Imported here: the store needs the Django models, the decoder does not
+        from parsing.decoder.build_store import load_or_decode
+        return load_or_decode(pob_string)
+    return decode_pob_to_json(pob_string)
+
+def price_pob_cached(pob_string: str, league: str = "Standard", as_of=None) -> dict:
+    """
+    Decode and price a PoB code, reusing the result of a previous identical request
+    as long as the price snapshot of the league did not change.
+    With `as_of`, results are cached per history date instead of per snapshot version.
+    """
+    if as_of is None:
+        # Load (or refresh) the league snapshot first so the version matches the prices used
+        with stage("prices"):
+            get_league_prices(league)
+        scope, version = league, price_cache.version(league)
+    else:
+        # History snapshots never change: one scope per date, never evicted by live refreshes
+        scope, version = f"{league}@{as_of.isoformat()}", 0
+
+    key = build_cache_key(pob_string, scope, version)
+    cached = priced_build_cache.get(key, scope, version)
+    if cached is not None:
+        return cached
+
+    parsed_data = decode_build(pob_string)
+    priced_data = add_prices_to_json(parsed_data, league=league, as_of=as_of)
+
+    priced_build_cache.put(key, scope, version, priced_data)
+    return priced_data
+
+async def adecode_build(pob_string: str) -> dict:
+    """
+    Async version of decode_build(): the decoded build store goes through the (synchronous) ORM
+    with sync_to_async, plain decodes run on a worker thread.
+    """
+    if STORE_DECODED_BUILDS:
+        return await sync_to_async(decode_build)(pob_string)
+    return await asyncio.to_thread(decode_pob_to_json, pob_string)
+
+async def aprice_pob_cached(pob_string: str, league: str = "Standard", as_of=None) -> dict:
+    """
+    Async version of price_pob_cached(). Current prices are resolved with the async
+    pricer and decoding runs on a worker thread, so the event loop is never blocked.
+    """
+    if as_of is not None:
+        # Price history goes through the (synchronous) ORM
+        return await sync_to_async(price_pob_cached)(pob_string, league=league, as_of=as_of)
+
+    with stage("prices"):
+        prices = await aget_league_prices(league)
+    version = price_cache.version(league)
+    key = build_cache_key(pob_string, league, version)
+    cached = priced_build_cache.get(key, league, version)
+    if cached is not None:
+        return cached
+
+    parsed_data = await adecode_build(pob_string)
+    priced_data = await asyncio.to_thread(apply_prices, parsed_data, prices)
+    priced_build_cache.put(key, league, version, priced_data)
+    return priced_data
+
+async def aprice_pob_leagues(pob_string: str, leagues: list, as_of=None) -> dict:
+    """
+    Decode a PoB code once and price it for several leagues (see apply_league_prices()).
+    Decoding runs on a worker thread while the prices of every league are resolved concurrently.
+    """
+    leagues = normalize_leagues(leagues)
+    if as_of is not None:
+        # Price history goes through the (synchronous) ORM
+        resolving = sync_to_async(resolve_league_prices)(leagues, as_of)
+    else:
+        resolving = aresolve_league_prices(leagues)
+    parsed_data, (prices_by_league, errors) = await asyncio.gather(adecode_build(pob_string), resolving)
+    return await asyncio.to_thread(apply_league_prices, parsed_data, prices_by_league, errors)
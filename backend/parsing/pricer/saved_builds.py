@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+
+from parsing.decoder.build_store import load_or_decode
+from parsing.models import BuildPriceKey, League, SavedBuild
+from parsing.pricer.gem_index import build_gem_index
+from parsing.pricer.poeninja_pricer import resolve_prices
+from parsing.pricer.repricer import (
+    affected_keys,
+    changed_price_keys,
+    lines_total,
+    price_build_lines,
+    reprice_lines,
+    GEM_KEY_PREFIX,
+)
+from parsing.pricer.unique_index import build_unique_index
+
+# Saved builds loaded and updated (and price keys looked up) per query when re-pricing
+REPRICE_BATCH_SIZE = 500
+
+
+def divine_total(total_chaos: float, chaos_to_div):
+    return round(total_chaos / chaos_to_div, 2) if chaos_to_div else None
+
+
+# -----------------------
+# Save
+# -----------------------
+def save_build(pob_code: str, league: str = "Standard", name: str = "", prices: tuple = None) -> SavedBuild:
+    """
+    Decode (or read from the decoded build store), price and store a build with its price keys
+    (reverse index used by reprice_saved_builds()).
+    `prices` are resolved prices of the league (see resolve_prices()), resolved here when not given.
+    """
+    prices = prices or resolve_prices(league)
+    lines, total_chaos = price_build_lines(load_or_decode(pob_code), prices)
+    with transaction.atomic():
+        league_row, _ = League.objects.get_or_create(name=league)
+        build = SavedBuild.objects.create(
+            league=league_row, name=name, pob_code=pob_code, lines=lines, total_chaos=total_chaos,
+            total_divine=divine_total(total_chaos, prices[2]), priced_at=datetime.now(timezone.utc),
+        )
+        BuildPriceKey.objects.bulk_create(
+            [BuildPriceKey(build=build, league=league_row, key=key) for key in {line["key"] for line in lines}]
+        )
+    return build
+
+
+# -----------------------
+# Incremental re-pricing
+# -----------------------
+def builds_with_keys(index, keys: set, batch_size: int = REPRICE_BATCH_SIZE) -> list:
+    """
+    Sorted ids of the builds of a BuildPriceKey queryset referencing one of `keys`,
+    queried `batch_size` keys at a time (a price refresh can change thousands of keys).
+    """
+    keys = sorted(keys)
+    build_ids = set()
+    for start in range(0, len(keys), batch_size):
+        build_ids.update(index.filter(key__in=keys[start:start + batch_size]).values_list("build_id", flat=True))
+    return sorted(build_ids)
+
+def reprice_saved_builds(league: str, old_snapshot: dict, new_snapshot: dict,
+                         batch_size: int = REPRICE_BATCH_SIZE) -> int:
+    """
+    Bring the saved builds of a league up to date after its prices went from `old_snapshot`
+    to `new_snapshot` (snapshot dicts). Only the builds referencing a changed price key are
+    loaded, and only their lines depending on a changed key are re-priced; a new divine rate
+    updates every divine total in one query. Without `old_snapshot`, every build is re-priced.
+    Returns the number of builds whose chaos total changed.
+    """
+    league_row = League.objects.filter(name=league).first()
+    if league_row is None:
+        return 0
+    chaos_to_div = new_snapshot.get("divine")
+    prices = (build_unique_index(new_snapshot.get("uniques") or []), build_gem_index(new_snapshot.get("gems") or []),
+              chaos_to_div)
+
+    index = BuildPriceKey.objects.filter(league=league_row)
+    if old_snapshot is None:
+        keys = set(index.values_list("key", flat=True).distinct())
+    else:
+        keys, variants = changed_price_keys(old_snapshot, new_snapshot)
+        if variants:
+            indexed_gem_keys = index.filter(key__startswith=GEM_KEY_PREFIX).values_list("key", flat=True).distinct()
+            keys = affected_keys(keys, variants, indexed_gem_keys)
+
+    updated = 0
+    if keys:
+        build_ids = builds_with_keys(index, keys, batch_size)
+        now = datetime.now(timezone.utc)
+        for start in range(0, len(build_ids), batch_size):
+            changed = []
+            for build in SavedBuild.objects.filter(pk__in=build_ids[start:start + batch_size]).only("lines"):
+                if reprice_lines(build.lines, keys, prices):
+                    build.total_chaos = lines_total(build.lines)
+                    build.total_divine = divine_total(build.total_chaos, chaos_to_div)
+                    build.priced_at = now
+                    changed.append(build)
+            SavedBuild.objects.bulk_update(changed, ["lines", "total_chaos", "total_divine", "priced_at"])
+            updated += len(changed)
+
+    if old_snapshot is None or old_snapshot.get("divine") != chaos_to_div:
+        builds = SavedBuild.objects.filter(league=league_row)
+        if chaos_to_div:
+            builds.update(total_divine=Round(F("total_chaos") / chaos_to_div, 2))
+        else:
+            builds.update(total_divine=None)
+    return updated
@@ -0,0 +1,102 @@
+import os
+import threading
+from urllib.parse import quote, unquote
+
+from parsing.pricer.compact_snapshot import CompactSnapshot, encode_compact_snapshot
+
+# -----------------------
+# Store configuration
+# -----------------------
+# Folder shared by the refresh worker (writer) and the API processes (readers)
+SNAPSHOT_DIR = os.getenv(
+    "POE_PRICE_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "price_snapshots")
+)
+
+# league -> file stamp of the last snapshot returned by load_snapshot_if_changed
+_seen_stamps = {}
+_seen_lock = threading.Lock()
+
+
+# -----------------------
+# Paths
+# -----------------------
+def snapshot_path(league: str, directory: str = None) -> str:
+    """
+    Path of the snapshot file of a league (league names are URL-quoted to be file-system safe).
+    """
+    return os.path.join(directory or SNAPSHOT_DIR, f"{quote(league, safe='')}.prices")
+
+def snapshot_stamp(league: str, directory: str = None):
+    """
+    (mtime_ns, size) of the snapshot file of a league, or None if it was never published.
+    """
+    try:
+        stat = os.stat(snapshot_path(league, directory))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def published_leagues(directory: str = None) -> list:
+    """
+    Leagues having a published snapshot, sorted by name.
+    """
+    try:
+        names = os.listdir(directory or SNAPSHOT_DIR)
+    except OSError:
+        return []
+    return sorted(unquote(name[:-len(".prices")]) for name in names if name.endswith(".prices"))
+
+
+# -----------------------
+# Publish / load
+# -----------------------
+def publish_snapshot(league: str, snapshot: dict, directory: str = None) -> str:
+    """
+    Write the snapshot of a league atomically: the file is written next to its
+    final path then renamed over it, so readers only ever see complete snapshots.
+    Snapshot layout: {"league", "fetchedAt", "uniques", "gems", "divine", "currency"},
+    stored in the compact format of compact_snapshot.py.
+    """
+    path = snapshot_path(league, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_compact_snapshot(snapshot))
+    os.replace(tmp_path, path)
+    return path
+
+def load_compact_snapshot(league: str, directory: str = None):
+    """
+    Map the published snapshot of a league (CompactSnapshot), or None if there is none.
+    """
+    try:
+        return CompactSnapshot.open(snapshot_path(league, directory))
+    except (OSError, ValueError):
+        return None
+
+def load_snapshot(league: str, directory: str = None):
+    """
+    Read the published snapshot of a league as a snapshot dict, or None if there is none.
+    """
+    snapshot = load_compact_snapshot(league, directory)
+    return snapshot.to_snapshot() if snapshot is not None else None
+
+def load_snapshot_if_changed(league: str, directory: str = None):
+    """
+    Map the published snapshot of a league (CompactSnapshot) only if it changed since
+    the last call (in this process). Returns None when unchanged or missing.
+    """
+    stamp = snapshot_stamp(league, directory)
+    if stamp is None:
+        return None
+    key = (directory or SNAPSHOT_DIR, league)
+    with _seen_lock:
+        if _seen_stamps.get(key) == stamp:
+            return None
+        _seen_stamps[key] = stamp
+    snapshot = load_compact_snapshot(league, directory)
+    if snapshot is None:
+        with _seen_lock:
+            _seen_stamps.pop(key, None)
+    return snapshot
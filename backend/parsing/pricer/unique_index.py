@@ -0,0 +1,123 @@
+import sys
+from typing import NamedTuple
+
+# poe.ninja "itemClass" of relic (foil) uniques
+RELIC_ITEM_CLASS = 9
+# Link counts having their own poe.ninja price
+PRICED_LINKS = (5, 6)
+
+
+# -----------------------
+# Unique records
+# -----------------------
+class UniqueRecord(NamedTuple):
+    """
+    The fields of a poe.ninja unique line used to price items. Every line of a unique
+    (variants, base types, 5L/6L, relic) is kept as its own record.
+    """
+    name: str
+    base_type: str    # "" when unknown
+    variant: str      # "" when the line has no variant
+    links: int        # 5 or 6 for a link specific price, 0 otherwise
+    relic: bool
+    chaos: float      # None when poe.ninja has no value
+
+def unique_record(line) -> UniqueRecord:
+    """
+    Project a poe.ninja unique line (dict) on a UniqueRecord. Records are returned as-is.
+    """
+    if isinstance(line, UniqueRecord):
+        return line
+    links = line.get("links")
+    return UniqueRecord(
+        sys.intern(line.get("name") or ""),
+        sys.intern(line.get("baseType") or ""),
+        sys.intern(line.get("variant") or ""),
+        links if links in PRICED_LINKS else 0,
+        line.get("itemClass") == RELIC_ITEM_CLASS,
+        line.get("chaosValue"),
+    )
+
+def slim_unique_lines(lines: list) -> list:
+    """
+    Project a list of poe.ninja unique lines on UniqueRecords.
+    """
+    return [unique_record(line) for line in lines]
+
+
+# -----------------------
+# Lookup tables
+# -----------------------
+# Table keys are (name, base type, lowercase variant, links, relic), None standing for
+# "any" base type / variant. Every record is stored under its exact key and its 3 wildcard
+# keys, the first record of the poe.ninja list winning a key (as for gems).
+def table_keys(record: UniqueRecord) -> list:
+    variant = record.variant.lower()
+    return [(record.name, base_type, v, record.links, record.relic)
+            for base_type in (record.base_type, None) for v in (variant, None)]
+
+def index_unique_records(records) -> dict:
+    """
+    Lookup table of unique records (see table_keys()).
+    """
+    table = {}
+    for record in records:
+        for key in table_keys(record):
+            table.setdefault(key, record)
+    return table
+
+def lookup_keys(name: str, base_type: str = None, variant: str = None, links: int = 0, relic: bool = False):
+    """
+    Table keys tried to price an item, most specific first:
+    same base type and variant, then any base type, then any variant, then both;
+    for each, the item links then its unlinked price, then the regular (non relic) prices.
+    `base_type` / `variant` None when unknown ("" variant: the item has none).
+    """
+    variant = variant.lower() if variant is not None else None
+    identities = dict.fromkeys(((base_type or None, variant), (None, variant), (base_type or None, None), (None, None)))
+    prices = dict.fromkeys(((links, relic), (0, relic), (links, False), (0, False)))
+    for b, v in identities:
+        for l, r in prices:
+            yield name, b, v, l, r
+
+def find_unique_record(table: dict, name: str, base_type: str = None, variant: str = None,
+                       links: int = 0, relic: bool = False):
+    """
+    Record pricing an item in a lookup table (see lookup_keys()), or None.
+    """
+    for key in lookup_keys(name, base_type, variant, links, relic):
+        record = table.get(key)
+        if record is not None:
+            return record
+    return None
+
+
+# -----------------------
+# Unique price index
+# -----------------------
+class UniquePriceIndex:
+    """
+    Lookup table built once from a poe.ninja unique list (UniqueRecords, raw lines are projected).
+    Every lookup is a few dict reads whatever the number of lines of the unique.
+    """
+    __slots__ = ("lines", "table")
+
+    def __init__(self, unique_lines: list):
+        self.lines = slim_unique_lines(unique_lines)
+        self.table = index_unique_records(self.lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def find(self, name: str, base_type: str = None, variant: str = None, links: int = 0, relic: bool = False):
+        """
+        Record pricing an item (see lookup_keys() for the fallback order), or None.
+        """
+        return find_unique_record(self.table, name, base_type, variant, links, relic)
+
+
+def build_unique_index(unique_lines: list) -> UniquePriceIndex:
+    """
+    Build the unique price index of a poe.ninja unique list (raw lines or UniqueRecords).
+    """
+    return UniquePriceIndex(unique_lines)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import django
+import pytest
+from django.conf import settings
+
+# Models are imported by some tested modules: without project settings, run on an in-memory SQLite database
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=["parsing"],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        USE_TZ=True,
+    )
+django.setup()
+
+from django.core.management import call_command
+from django.db import transaction
+
+
+# -----------------------
+# Fake poe.ninja
+# -----------------------
+class FakeNinjaResponse:
+    """
+    Response of the fake poe.ninja session.
+    """
+
+    def __init__(self, payload: dict, status_code: int = 200, headers: dict = None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeNinja:
+    """
+    Stand-in for the pooled poe.ninja session: `lines(url)` gives the lines of the requested
+    category (an exception it raises fails the request). Every request is recorded with its
+    headers and thread. With `etag`, payloads carry it and requests sending it back get a 304.
+    """
+
+    def __init__(self, lines, delay: float = 0, etag: str = None):
+        self.lines = lines
+        self.delay = delay
+        self.etag = etag
+        self.urls = []
+        self.headers = []
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None, headers=None):
+        with self._lock:
+            self.urls.append(url)
+            self.headers.append(headers)
+            self.threads.append(threading.current_thread().name)
+        if self.delay:
+            time.sleep(self.delay)
+        payload = {"lines": self.lines(url)}
+        if self.etag is None:
+            return FakeNinjaResponse(payload)
+        unchanged = headers is not None and headers.get("If-None-Match") == self.etag
+        return FakeNinjaResponse(payload, 304 if unchanged else 200, {"ETag": self.etag})
+
+
+@pytest.fixture
+def fake_ninja(monkeypatch):
+    """
+    fake_ninja(lines, delay=0, etag=None): serve poe.ninja requests from a FakeNinja and return it.
+    """
+    def install(lines, **options) -> FakeNinja:
+        ninja = FakeNinja(lines, **options)
+        monkeypatch.setattr("parsing.pricer.fetcher.session.get", ninja.get)
+        return ninja
+    return install
+
+
+# -----------------------
+# Database
+# -----------------------
+@pytest.fixture
+def db():
+    """Migrated in-memory database, rolled back after each test."""
+    if settings.DATABASES["default"]["NAME"] != ":memory:":
+        pytest.skip("Database tests only run on their in-memory database")
+    # Imported here: history snapshots loaded by database tests are cached by snapshot id
+    from parsing.pricer.price_history import history_price_cache
+    call_command("migrate", "parsing", verbosity=0)
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+    history_price_cache.clear()
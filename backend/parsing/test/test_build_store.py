@@ -0,0 +1,138 @@
+import base64
+import json
+import zlib
+
+from django.core.management import call_command
+
+from ..decoder import build_store
+from ..decoder.build_store import (
+    code_hash,
+    load_decoded_builds,
+    load_or_decode,
+    pack_build,
+    store_decoded_builds,
+    unpack_build,
+    upsert_decoded_builds,
+)
+from ..models import DecodedBuild, DecodedBuildKey, PobCode
+from ..price_keys import price_keys
+
+BUILD_XML = """<PathOfBuilding>
+<Build className="Witch" ascendClassName="Necromancer"/>
+<Skills><Skill slot="Helmet"><Gem nameSpec="Arc" level="20" quality="0"/></Skill></Skills>
+<Items><Item id="1">Rarity: UNIQUE
+Kaom's Heart
+Glorious Plate</Item><Slot name="Body Armour" itemId="1"/></Items>
+</PathOfBuilding>"""
+
+
+def encode(xml: str) -> str:
+    return base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+
+CODE = encode(BUILD_XML)
+# Same build exported again: another code, same decoded content
+REEXPORTED_CODE = encode(BUILD_XML.replace("<Build ", "<Build  "))
+OTHER_CODE = encode(BUILD_XML.replace("Necromancer", "Elementalist"))
+
+
+def count_decodes(monkeypatch) -> list:
+    """Record the codes decoded by the build store (bulk and single decodes)."""
+    decoded = []
+    bulk, single = build_store.decode_pob_bulk, build_store.decode_pob_to_json
+
+    def decode_pob_bulk(codes, **options):
+        codes = list(codes)
+        decoded.extend(codes)
+        return bulk(codes, **options)
+
+    def decode_pob_to_json(code):
+        decoded.append(code)
+        return single(code)
+
+    monkeypatch.setattr(build_store, "decode_pob_bulk", decode_pob_bulk)
+    monkeypatch.setattr(build_store, "decode_pob_to_json", decode_pob_to_json)
+    return decoded
+
+
+# -------------------
+# Hashes and blobs
+# -------------------
+def test_code_hash_ignores_whitespace_and_padding():
+    variant = " " + CODE[:10] + "\n" + CODE[10:].rstrip("=") + "\r\n"
+    assert code_hash(variant) == code_hash(CODE)
+    assert code_hash(OTHER_CODE) != code_hash(CODE)
+
+def test_code_hash_depends_on_decoder_version(monkeypatch):
+    current = code_hash(CODE)
+    monkeypatch.setattr(build_store, "DECODER_VERSION", build_store.DECODER_VERSION + 1)
+    assert code_hash(CODE) != current
+
+def test_pack_build_is_canonical():
+    content_hash, blob, raw_size = pack_build({"class": "Witch", "items": [1, 2]})
+    assert pack_build({"items": [1, 2], "class": "Witch"})[0] == content_hash
+    assert unpack_build(blob) == {"class": "Witch", "items": [1, 2]}
+    assert raw_size == len(json.dumps({"class": "Witch", "items": [1, 2]}, separators=(",", ":")))
+
+
+# -------------------
+# Store
+# -------------------
+def test_upsert_decoded_builds_stores_each_content_once(db):
+    data = build_store.decode_pob_to_json(CODE)
+    upsert_decoded_builds({code_hash(CODE): data, code_hash(REEXPORTED_CODE): data})
+    # Storing again (e.g. a concurrent import) leaves the rows as they are
+    upsert_decoded_builds({code_hash(CODE): data})
+
+    build = DecodedBuild.objects.get()
+    assert (build.class_name, build.ascendancy) == ("Witch", "Necromancer")
+    assert PobCode.objects.filter(build=build).count() == 2
+    keys = sorted(DecodedBuildKey.objects.values_list("key", flat=True))
+    assert keys == price_keys(data) == ["g:arc", "u:Kaom's Heart"]
+    assert load_decoded_builds([code_hash(CODE), code_hash(OTHER_CODE)]) == {code_hash(CODE): data}
+
+def test_store_decoded_builds_decodes_only_new_codes(db, monkeypatch):
+    decoded = count_decodes(monkeypatch)
+
+    first = store_decoded_builds([CODE, "not a pob code", CODE, OTHER_CODE])
+    assert decoded == [CODE, "not a pob code", OTHER_CODE]
+    assert first[0] == first[2] and first[0]["ascendClass"] == "Necromancer"
+    assert "error" in first[1]
+    assert first[3]["ascendClass"] == "Elementalist"
+
+    # Stored codes are read back, invalid ones are decoded again
+    second = store_decoded_builds([OTHER_CODE, CODE, "not a pob code"])
+    assert decoded[3:] == ["not a pob code"]
+    assert second[:2] == [first[3], first[0]]
+    assert PobCode.objects.count() == 2
+
+def test_load_or_decode_reads_stored_build(db, monkeypatch):
+    decoded = count_decodes(monkeypatch)
+    data = load_or_decode(CODE)
+    assert load_or_decode(" " + CODE + "\n") == data
+    assert decoded == [CODE]
+
+def test_new_decoder_version_decodes_stored_builds_again(db, monkeypatch):
+    decoded = count_decodes(monkeypatch)
+    load_or_decode(CODE)
+    store_decoded_builds([CODE])
+    assert len(decoded) == 1
+
+    monkeypatch.setattr(build_store, "DECODER_VERSION", build_store.DECODER_VERSION + 1)
+    load_or_decode(CODE)
+    assert len(decoded) == 2
+    store_decoded_builds([OTHER_CODE, CODE])
+    assert decoded[2:] == [OTHER_CODE]
+
+def test_decode_pobs_command_stores_builds(db, tmp_path):
+    codes = tmp_path / "codes.txt"
+    codes.write_text(f"{CODE}\n\n{REEXPORTED_CODE}\nnot a pob code\n", encoding="utf-8")
+    output = tmp_path / "builds.jsonl"
+
+    call_command("decode_pobs", str(codes), "--store", "--processes", "1", "--output", str(output))
+
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["data"] == lines[1]["data"]
+    assert "error" in lines[2]["data"]
+    assert DecodedBuild.objects.count() == 1
+    assert PobCode.objects.count() == 2
@@ -0,0 +1,38 @@
+import base64
+import zlib
+from ..decoder.bulk_decoder import decode_pob_bulk, iter_chunks
+
+
+def encode(xml: str) -> str:
+    return base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+
+CODES = [encode(f"<PathOfBuilding><Build className='Class{i}'/></PathOfBuilding>") for i in range(10)]
+CODES[3] = "not a pob code"
+
+
+# -------------------
+# Tests
+# -------------------
+def test_iter_chunks_keeps_indexes():
+    chunks = list(iter_chunks(iter("abcde"), 2))
+    assert chunks == [[(0, "a"), (1, "b")], [(2, "c"), (3, "d")], [(4, "e")]]
+
+
+def test_decode_pob_bulk_in_process():
+    results = list(decode_pob_bulk(CODES, processes=1, chunk_size=4))
+    assert [index for index, _ in results] == list(range(10))
+    assert results[0][1]["class"] == "Class0"
+    assert "error" in results[3][1]
+
+
+def test_decode_pob_bulk_process_pool_keeps_order():
+    results = list(decode_pob_bulk(iter(CODES), processes=2, chunk_size=3))
+    assert [index for index, _ in results] == list(range(10))
+    assert results[9][1]["class"] == "Class9"
+    assert "error" in results[3][1]
+
+
+def test_decode_pob_bulk_unordered_yields_every_build():
+    results = dict(decode_pob_bulk(CODES, processes=2, chunk_size=2, ordered=False))
+    assert sorted(results) == list(range(10))
+    assert results[5]["class"] == "Class5"
@@ -0,0 +1,103 @@
+import pytest
+from ..pricer.compact_snapshot import CompactSnapshot, encode_compact_snapshot
+from ..pricer.gem_index import build_gem_index
+from ..pricer.poeninja_pricer import find_gem_price
+from ..pricer.unique_index import build_unique_index, slim_unique_lines
+
+GEMS = [
+    {"name": "Fireball", "gemLevel": 20, "gemQuality": 20, "chaosValue": 5, "corrupted": False},
+    {"name": "Fireball", "gemLevel": 20, "gemQuality": 20, "chaosValue": 9, "corrupted": True},
+    {"name": "Fireball", "gemLevel": 1, "gemQuality": 0, "chaosValue": 1},
+    {"name": "Awakened Added Fire Damage Support", "gemLevel": 5, "gemQuality": 20, "chaosValue": 40},
+    {"name": "Phantasmal Fireball", "variant": "1/20", "gemLevel": 1, "gemQuality": 20, "chaosValue": 3},
+    {"name": "Enlighten Support", "gemLevel": 3, "gemQuality": 0, "chaosValue": None},
+]
+UNIQUES = [
+    {"name": "Tabula Rasa", "baseType": "Simple Robe", "chaosValue": 10.0},
+    {"name": "Kaom's Heart", "baseType": "Glorious Plate", "chaosValue": 2.0},
+    {"name": "Kaom's Heart", "baseType": "Glorious Plate", "links": 6, "chaosValue": 30.0},
+    {"name": "Kaom's Heart", "baseType": "Glorious Plate", "itemClass": 9, "chaosValue": 80.0},
+    {"name": "Grand Spectrum", "baseType": "Viridian Jewel", "chaosValue": 4.0},
+    {"name": "Grand Spectrum", "baseType": "Crimson Jewel", "chaosValue": 6.0},
+    {"name": "Precursor's Emblem", "baseType": "Topaz Ring", "variant": "Power", "chaosValue": 3.0},
+    {"name": "Precursor's Emblem", "baseType": "Topaz Ring", "variant": "Endurance", "chaosValue": 1.0},
+    {"name": "Mjölner", "baseType": "Gavel", "chaosValue": 7.0},
+]
+SNAPSHOT = {
+    "league": "Settlers",
+    "fetchedAt": 1700000000.5,
+    "uniques": UNIQUES,
+    "gems": GEMS,
+    "divine": 200.0,
+    "currency": {"Divine Orb": 200.0, "Exalted Orb": 15.5},
+}
+
+
+@pytest.fixture
+def compact():
+    return CompactSnapshot(encode_compact_snapshot(SNAPSHOT))
+
+
+def test_round_trip(compact):
+    decoded = compact.to_snapshot()
+    assert decoded["league"] == "Settlers"
+    assert decoded["fetchedAt"] == 1700000000.5
+    assert decoded["uniques"] == slim_unique_lines(UNIQUES)
+    assert decoded["divine"] == 200.0
+    assert decoded["currency"] == SNAPSHOT["currency"]
+    assert [(g.name, g.level, g.chaos) for g in decoded["gems"]] == \
+        [(g["name"], g["gemLevel"], g["chaosValue"]) for g in GEMS]
+
+@pytest.mark.parametrize("item", [
+    ("Mjölner", "Gavel", "", 0, False),
+    ("Kaom's Heart", "Glorious Plate", "", 6, False),
+    ("Kaom's Heart", "Glorious Plate", "", 5, False),
+    ("Kaom's Heart", "Glorious Plate", "", 6, True),
+    ("Tabula Rasa", None, None, 6, True),
+    ("Grand Spectrum", "Crimson Jewel", "", 0, False),
+    ("Precursor's Emblem", "Topaz Ring", "endurance", 0, False),
+    ("Precursor's Emblem", "Topaz Ring", "Current", 0, False),
+    ("Unknown", None, None, 0, False),
+])
+def test_unique_prices_match_the_dict_index(compact, item):
+    assert compact.uniques.find(*item) == build_unique_index(UNIQUES).find(*item)
+
+def test_unique_lookups(compact):
+    assert compact.uniques.find("Kaom's Heart", "Glorious Plate", "", 6, False).chaos == 30.0
+    assert compact.uniques.find("Kaom's Heart", "Glorious Plate", "", 5, False).chaos == 2.0
+    assert compact.uniques.find("Kaom's Heart", "Glorious Plate", "", 0, True).chaos == 80.0
+    assert compact.uniques.find("Grand Spectrum", "Crimson Jewel").chaos == 6.0
+    assert compact.uniques.find("Unknown") is None
+    assert len(compact.uniques) == len(UNIQUES)
+
+def test_missing_parts_stay_missing():
+    compact = CompactSnapshot(encode_compact_snapshot({"league": "Standard", "uniques": None, "gems": [], "divine": None}))
+    assert compact.uniques is None
+    assert compact.divine is None
+    assert compact.currency is None
+    assert len(compact.gems) == 0
+
+@pytest.mark.parametrize("gem", [
+    {"nameSpec": "Fireball", "level": 20, "quality": 20},
+    {"nameSpec": "Fireball", "level": 7, "quality": 0},
+    {"nameSpec": "Awakened Added Fire Damage", "level": 5, "quality": 20},
+    {"nameSpec": "Phantasmal Fireball 1/20", "level": 1, "quality": 20},
+    {"nameSpec": "Enlighten", "level": 3, "quality": 0},
+    {"nameSpec": "Unknown Gem", "level": 1, "quality": 0},
+])
+def test_gem_prices_match_the_dict_index(compact, gem):
+    assert find_gem_price(gem, compact.gems, 200.0) == find_gem_price(gem, build_gem_index(GEMS), 200.0)
+
+def test_lookup_caches_keep_only_snapshot_names(compact):
+    for i in range(100):
+        assert compact.uniques.find(f"Unknown {i}") is None
+        assert find_gem_price({"nameSpec": f"Unknown Gem {i}", "level": 1, "quality": 0}, compact.gems, 200.0)["priceChaos"] is None
+    compact.uniques.find("Kaom's Heart")
+    find_gem_price({"nameSpec": "Fireball", "level": 20, "quality": 20}, compact.gems, 200.0)
+
+    assert list(compact.uniques._tables) == ["Kaom's Heart"]
+    assert list(compact.gems._ranges) == ["fireball"]
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        CompactSnapshot(b"{}" + b"\0" * 200)
@@ -0,0 +1,74 @@
+import pytest
+from ..pricer import economy, poeninja_pricer
+from ..pricer.snapshot_store import publish_snapshot, published_leagues
+
+SNAPSHOT = {
+    "league": "Settlers",
+    "fetchedAt": 1700000000.0,
+    "uniques": [{"name": "Headhunter", "baseType": "Leather Belt", "chaosValue": 5000.0}],
+    "gems": [],
+    "divine": 200.0,
+    "currency": {"Divine Orb": 200.0, "Exalted Orb": 15.0},
+}
+
+
+# -------------------
+# Fixtures
+# -------------------
+@pytest.fixture(autouse=True)
+def snapshot_store(tmp_path, monkeypatch):
+    """Snapshots-only mode over an empty snapshot store."""
+    monkeypatch.setattr("parsing.pricer.snapshot_store.SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(poeninja_pricer, "PRICE_SNAPSHOTS_ONLY", True)
+    poeninja_pricer.invalidate_prices()
+    yield
+    poeninja_pricer.invalidate_prices()
+
+
+# -------------------
+# Tests
+# -------------------
+def test_current_league_skips_permanent_leagues():
+    assert economy.current_league(["Standard", "Hardcore", "Settlers", "Hardcore Settlers"]) == "Settlers"
+    assert economy.current_league(["Standard", "Hardcore"]) == "Standard"
+
+
+def test_published_leagues_lists_snapshots():
+    publish_snapshot("Hardcore Settlers", SNAPSHOT)
+    publish_snapshot("Settlers", SNAPSHOT)
+    assert published_leagues() == ["Hardcore Settlers", "Settlers"]
+
+
+def test_get_economy_reads_published_snapshot():
+    publish_snapshot("Settlers", SNAPSHOT)
+
+    data = economy.get_economy()
+
+    assert data["league"] == "Settlers"
+    assert data["leagues"] == ["Settlers"]
+    assert data["chaosPerDivine"] == 200.0
+    assert data["divinePerChaos"] == 0.005
+    assert data["currency"] == {"Divine Orb": 200.0, "Exalted Orb": 15.0}
+    # Timestamp of the snapshot, not of the cache load
+    assert data["fetchedAt"] == 1700000000.0
+
+
+def test_get_leagues_falls_back_to_published_snapshots(monkeypatch):
+    monkeypatch.setattr(poeninja_pricer, "PRICE_SNAPSHOTS_ONLY", False)
+    def failing_fetch():
+        raise ConnectionError("trade API down")
+    monkeypatch.setattr(economy, "fetch_leagues", failing_fetch)
+    publish_snapshot("Settlers", SNAPSHOT)
+    assert economy.get_leagues() == ["Settlers"]
+
+
+def test_get_economy_does_not_refetch_unknown_league(monkeypatch, fake_ninja):
+    monkeypatch.setattr(poeninja_pricer, "PRICE_SNAPSHOTS_ONLY", False)
+    monkeypatch.setattr(economy, "fetch_leagues", lambda: ["Settlers"])
+    ninja = fake_ninja(lambda url: [])
+
+    for _ in range(5):
+        data = economy.get_economy("Bogus")
+        assert data["currency"] == {}
+        assert data["chaosPerDivine"] is None
+    assert len(ninja.urls) == 1
@@ -0,0 +1,85 @@
+import pytest
+import requests
+from .. import http_client
+from ..http_client import HttpClient, RateLimitedError, retry_after_seconds
+
+
+# -------------------
+# Helpers
+# -------------------
+def make_response(status: int, headers: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = b"{}"
+    response.url = "https://poe.ninja/api/data"
+    return response
+
+def scripted_client(monkeypatch, outcomes: list) -> tuple:
+    """
+    Client whose session answers with `outcomes` in order (responses, or exceptions to raise).
+    Returns (client, calls, sleeps).
+    """
+    client = HttpClient(max_retries=2, backoff_base=0.1, backoff_max=1)
+    calls, sleeps = [], []
+
+    def fake_get(url, timeout=None, **kwargs):
+        calls.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    return client, calls, sleeps
+
+
+# -------------------
+# Tests
+# -------------------
+def test_retry_after_seconds():
+    assert retry_after_seconds(make_response(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after_seconds(make_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(make_response(429)) is None
+
+def test_default_timeout_and_success(monkeypatch):
+    client, calls, sleeps = scripted_client(monkeypatch, [make_response(200)])
+    assert client.get("https://poe.ninja/api/data").status_code == 200
+    assert calls == [client.timeout]
+    assert sleeps == []
+
+def test_retries_with_jittered_backoff(monkeypatch):
+    client, calls, sleeps = scripted_client(
+        monkeypatch, [requests.ConnectionError("reset"), make_response(503), make_response(200)]
+    )
+    assert client.get("https://poe.ninja/api/data").status_code == 200
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.1 and 0 <= sleeps[1] <= 0.2
+
+def test_client_errors_are_not_retried(monkeypatch):
+    client, calls, _ = scripted_client(monkeypatch, [make_response(404), make_response(200)])
+    with pytest.raises(requests.HTTPError):
+        client.get("https://poe.ninja/api/data")
+    assert len(calls) == 1
+
+def test_gives_up_after_max_retries(monkeypatch):
+    client, calls, _ = scripted_client(monkeypatch, [requests.Timeout("slow")] * 3)
+    with pytest.raises(requests.Timeout):
+        client.get("https://poe.ninja/api/data")
+    assert len(calls) == 3
+
+def test_retry_after_is_respected(monkeypatch):
+    client, calls, sleeps = scripted_client(monkeypatch, [make_response(429, {"Retry-After": "2"}), make_response(200)])
+    assert client.get("https://poe.ninja/api/data").status_code == 200
+    assert len(sleeps) == 1 and 1.5 < sleeps[0] <= 2
+
+def test_long_retry_after_fails_fast(monkeypatch):
+    client, calls, _ = scripted_client(monkeypatch, [make_response(429, {"Retry-After": "600"})])
+    with pytest.raises(RateLimitedError):
+        client.get("https://poe.ninja/api/data")
+    # The host is not called again while it is rate limited
+    with pytest.raises(RateLimitedError):
+        client.get("https://poe.ninja/api/data/other")
+    assert len(calls) == 1
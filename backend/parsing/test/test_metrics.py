@@ -0,0 +1,49 @@
+import base64
+import zlib
+import pytest
+from .. import metrics
+from ..decoder.pob_decoder import decode_pob_to_json
+from ..metrics import NO_STAGE, MetricsRegistry, incr, stage, track_request
+
+XML = "<PathOfBuilding><Build className='Witch'/><Items/><Skills/></PathOfBuilding>"
+POB_CODE = base64.urlsafe_b64encode(zlib.compress(XML.encode("utf-8"))).decode("utf-8")
+
+
+# -------------------
+# Fixtures
+# -------------------
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.setattr(metrics, "registry", MetricsRegistry())
+
+
+# -------------------
+# Tests
+# -------------------
+def test_nothing_recorded_outside_a_request():
+    assert stage("xml") is NO_STAGE
+    incr("fetches")
+    assert metrics.registry.snapshot()["requests"] == 0
+
+def test_decoder_stages_and_counters_are_recorded():
+    with track_request() as request_metrics:
+        decode_pob_to_json(POB_CODE)
+        incr("fetches", 2)
+    assert {"inflate", "xml", "items", "skills", "slots"} <= set(request_metrics.stages)
+    assert request_metrics.counters == {"fetches": 2}
+
+    header = request_metrics.server_timing()
+    assert "xml;dur=" in header and "total;dur=" in header and 'fetches;desc="2"' in header
+
+    totals = metrics.registry.snapshot()
+    assert totals["requests"] == 1
+    assert totals["stages"]["xml"]["count"] == 1
+    assert totals["counters"] == {"fetches": 2}
+
+def test_disabled_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    with track_request() as request_metrics:
+        assert request_metrics is None
+        assert stage("xml") is NO_STAGE
+        incr("fetches")
+    assert metrics.registry.snapshot()["requests"] == 0
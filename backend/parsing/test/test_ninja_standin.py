@@ -0,0 +1,85 @@
+import json
+import pytest
+from benchmarks import ninja_standin
+from ..http_client import client
+from ..pricer import fetcher
+from ..pricer.fetcher import fetch_categories
+
+PAYLOAD = {"lines": [{"name": "Tabula Rasa", "chaosValue": 10}]}
+
+
+# -------------------
+# Fixtures
+# -------------------
+@pytest.fixture
+def fixtures_dir(tmp_path):
+    ninja_dir = tmp_path / "ninja"
+    ninja_dir.mkdir()
+    (ninja_dir / "UniqueArmour.json").write_text(json.dumps(PAYLOAD), encoding="utf-8")
+    return str(tmp_path)
+
+def start_standin(monkeypatch, fixtures_dir, **options):
+    server = ninja_standin.start_in_thread(fixtures_dir=fixtures_dir, seed=1, **options)
+    monkeypatch.setattr(fetcher, "POE_NINJA_API_URL", ninja_standin.base_url(server))
+    monkeypatch.setattr(client, "backoff_base", 0)
+    return server
+
+
+# -------------------
+# Tests
+# -------------------
+def test_fetcher_uses_configured_base_url(monkeypatch, fixtures_dir):
+    server = start_standin(monkeypatch, fixtures_dir)
+    try:
+        result = fetch_categories("Standard", ["UniqueArmour", "UniqueWeapon"])
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result.payloads == {"UniqueArmour": PAYLOAD}
+    assert "UniqueWeapon" in result.errors
+    assert server.state.stats["served"] == 1
+    assert server.state.stats["not_found"] == 1
+
+def test_injected_errors_are_retried(monkeypatch, fixtures_dir):
+    server = start_standin(monkeypatch, fixtures_dir, error_rate=1)
+    try:
+        result = fetch_categories("Standard", ["UniqueArmour"])
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "503" in result.errors["UniqueArmour"]
+    assert server.state.stats["errors"] == 1 + client.max_retries
+
+def test_transient_error_recovers(monkeypatch, fixtures_dir):
+    # With seed 1, the first draw is under 0.2 and the next ones are not
+    server = start_standin(monkeypatch, fixtures_dir, error_rate=0.2)
+    try:
+        result = fetch_categories("Standard", ["UniqueArmour"])
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result.payloads == {"UniqueArmour": PAYLOAD}
+    assert server.state.stats["errors"] == 1
+
+def test_stalled_request_times_out(monkeypatch, fixtures_dir):
+    server = start_standin(monkeypatch, fixtures_dir, stall_rate=1, stall_s=1)
+    try:
+        result = fetch_categories("Standard", ["UniqueArmour"], timeout=0.1)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "UniqueArmour" in result.errors
+    assert not result.payloads
+
+def test_unchanged_category_is_revalidated(monkeypatch, fixtures_dir):
+    server = start_standin(monkeypatch, fixtures_dir)
+    try:
+        first = fetch_categories("Standard", ["UniqueArmour"])
+        second = fetch_categories("Standard", ["UniqueArmour"], validators=first.validators)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert first.validators["UniqueArmour"][0]
+    assert second.not_modified == {"UniqueArmour"}
+    assert not second.payloads
+    assert server.state.stats["not_modified"] == 1
@@ -1,17 +1,24 @@
 import base64
+import json
 import zlib
 import pytest
 import xml.etree.ElementTree as ET
 from ..decoder.pob_decoder import (
     decode_pob_code,
     get_item_type_and_subtype,
+    build_base_type_index,
+    load_base_type_index,
     contains_any_in_fields,
     parse_items,
     parse_skills,
     resolve_slot_name_for_item,
     rebuild_sockets,
     pob_xml_to_json,
+    parse_pob_xml,
     decode_pob,
+    decode_pob_to_json,
+    iter_pob_xml_chunks,
+    normalize_pob_string,
 )
 
 # -------------------
@@ -60,6 +67,23 @@ def test_decode_pob_code_roundtrip():
     encoded = base64.urlsafe_b64encode(compressed).decode("utf-8")
     assert decode_pob_code(encoded) == xml
 
+def test_iter_pob_xml_chunks_rejects_oversize_xml():
+    xml = "<PathOfBuilding>" + " " * 100_000 + "</PathOfBuilding>"
+    encoded = base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+    with pytest.raises(ValueError, match="too large"):
+        list(iter_pob_xml_chunks(encoded, max_size=50_000))
+    assert b"".join(iter_pob_xml_chunks(encoded)) == xml.encode("utf-8")
+
+def test_iter_pob_xml_chunks_rejects_truncated_code():
+    compressed = zlib.compress(b"<PathOfBuilding></PathOfBuilding>" * 10)
+    encoded = base64.urlsafe_b64encode(compressed[:-8]).decode("utf-8")
+    with pytest.raises(ValueError, match="Incomplete"):
+        list(iter_pob_xml_chunks(encoded))
+
+def test_decode_pob_to_json_streams_decompressed_chunks(simple_xml):
+    encoded = base64.urlsafe_b64encode(zlib.compress(simple_xml.encode("utf-8"))).decode("utf-8")
+    assert decode_pob_to_json(encoded) == pob_xml_to_json(simple_xml)
+
 def test_get_item_type_and_subtype(fake_mapping):
     t, st = get_item_type_and_subtype("Simple Base", fake_mapping)
     assert t == "Armour"
@@ -69,6 +93,22 @@ def test_get_item_type_and_subtype_not_found(fake_mapping):
     t, st = get_item_type_and_subtype("Unknown Base", fake_mapping)
     assert t is None and st is None
 
+def test_get_item_type_and_subtype_default_index():
+    assert get_item_type_and_subtype("Sinner Tricorne") == ("Armour", "Helmet")
+
+def test_build_base_type_index(fake_mapping):
+    index = build_base_type_index(fake_mapping)
+    assert index == {"Simple Base": ("Armour", "Helmet"), "Fake Sword": ("Weapon", "1H Sword")}
+
+def test_load_base_type_index_uses_marshal_cache(tmp_path, fake_mapping):
+    json_path = tmp_path / "item_types.json"
+    json_path.write_text(json.dumps(fake_mapping), encoding="utf-8")
+    index = load_base_type_index(str(json_path))
+    assert index["Fake Sword"] == ("Weapon", "1H Sword")
+    assert list((tmp_path / "__pycache__").glob("item_types.*.marshal"))
+    # Second load comes from the cache and gives the same index
+    assert load_base_type_index(str(json_path)) == index
+
 def test_contains_any_in_fields_true():
     gem = {"skillId": "vaal_fireball", "variantId": "", "nameSpec": ""}
     assert contains_any_in_fields(gem, ["vaal"])
@@ -123,6 +163,40 @@ def test_pob_xml_to_json(simple_xml):
     assert len(data["items"]) == 1
     assert "linksBySlot" in data
 
+REAL_ORDER_XML = """<PathOfBuilding>
+<Build className="Witch" ascendClassName="Necromancer"><PlayerStat stat="Life" value="1"/></Build>
+<Import/>
+<Calcs><Input name="a" number="1"/><Section collapsed="false" id="b"/></Calcs>
+<Skills><Skill slot="Weapon 1"><Gem nameSpec="Fireball" level="1" quality="0"/><Gem nameSpec="Empower" level="4" quality="0"/></Skill>
+<Skill slot="Helmet"><Gem nameSpec="Arc" level="20" quality="0"/></Skill></Skills>
+<Tree><Spec><URL>x</URL><Sockets><Socket nodeId="1" itemId="0"/><Socket nodeId="2" itemId="0"/></Sockets></Spec></Tree>
+<Notes>notes</Notes>
+<TreeView/>
+<Items><Item id="1">Rarity: UNIQUE
+Kaom's Heart
+Glorious Plate</Item><Item id="2">Rarity: RARE
+Test Ring
+Gold Ring</Item><Slot name="Body Armour" itemId="1"/></Items>
+<Config><Input name="c" boolean="true"/></Config>
+</PathOfBuilding>"""
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(REAL_ORDER_XML)])
+def test_parse_pob_xml_keeps_only_used_sections(chunk_size):
+    # Dropped sections before, between and after the kept ones, in PoB export order
+    chunks = [REAL_ORDER_XML[i:i + chunk_size] for i in range(0, len(REAL_ORDER_XML), chunk_size)]
+    root = parse_pob_xml(chunks)
+    assert [child.tag for child in root] == ["Build", "Skills", "Items"]
+    assert len(root.findall("./Items/Item")) == 2
+    assert len(root.findall("./Skills/Skill/Gem")) == 3
+    data = pob_xml_to_json(chunks)
+    assert len(data["items"]) == len(parse_items(ET.fromstring(REAL_ORDER_XML))) == 2
+    assert sum(len(skill["gems"]) for skill in data["skills"]) == 3
+
+def test_pob_xml_to_json_from_byte_chunks(simple_xml):
+    raw = simple_xml.encode("utf-8")
+    chunks = [raw[i:i + 7] for i in range(0, len(raw), 7)]
+    assert pob_xml_to_json(chunks) == pob_xml_to_json(simple_xml)
+
 def test_decode_pob_full_roundtrip():
     xml = "<PathOfBuilding><Build className='Witch'/></PathOfBuilding>"
     compressed = zlib.compress(xml.encode("utf-8"))
@@ -130,4 +204,16 @@ def test_decode_pob_full_roundtrip():
     data = decode_pob(encoded)
     assert "class" in data or "error" not in data
 
-
+def test_normalize_pob_string_ignores_whitespace_and_padding():
+    xml = "<PathOfBuilding><Build className='Witch'/></PathOfBuilding>"
+    encoded = base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+    variant = " " + encoded[:10] + "\n" + encoded[10:].rstrip("=") + "\r\n"
+    assert normalize_pob_string(variant) == normalize_pob_string(encoded)
+    assert decode_pob_to_json(variant) == decode_pob_to_json(encoded)
+
+def test_benchmark_corpus_decodes_every_item_and_gem():
+    # Imported here: the corpus generator is only needed by this test
+    from benchmarks.corpus import check_decoded_counts, generated_counts, make_pob_codes
+    codes = make_pob_codes(count=3, seed=7)
+    assert all(items and gems for items, gems in map(generated_counts, codes))
+    assert check_decoded_counts(codes) == []
@@ -1,22 +1,32 @@
 # parsing/test/test_pob_pricer.py
+import asyncio
+import base64
 import sys
+import time
 import os
+import zlib
 import pytest
 from unittest.mock import patch
+from pydantic import ValidationError
 
 # Ensure 'parsing' folder is in the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from pricer import poeninja_pricer
+from api.schemas import PobBatchPriceRequest
+from parsing.decoder.bulk_decoder import shared_decode_pool
+from parsing.price_keys import item_variant
+from parsing.pricer.batch_pricer import BATCH_MAX_CODES, aprice_pob_batch, price_pob_batch
+from parsing.pricer.snapshot_store import publish_snapshot
 
 # -----------------------
 # Mock data
 # -----------------------
-MOCK_UNIQUE_ITEMS = {
-    "The Brass Dome": 132.0,  # base price
-    "The Brass Dome (5L)": 900.0,  # 5-link price
-    "The Brass Dome (6L)": 1148.84  # 6-link price
-}
+MOCK_UNIQUE_ITEMS = [
+    {"name": "The Brass Dome", "baseType": "Gladiator Plate", "chaosValue": 132.0},  # base price
+    {"name": "The Brass Dome", "baseType": "Gladiator Plate", "links": 5, "chaosValue": 900.0},  # 5-link price
+    {"name": "The Brass Dome", "baseType": "Gladiator Plate", "links": 6, "chaosValue": 1148.84},  # 6-link price
+]
 
 MOCK_GEMS_LIST = [
     {"name": "Support Gem", "gemLevel": 1, "gemQuality": 0, "chaosValue": 1.0},
@@ -45,6 +55,20 @@ MOCK_POB_JSON = {
 }
 
 
+# -----------------------
+# Fixtures
+# -----------------------
+@pytest.fixture(autouse=True)
+def clear_price_cache(tmp_path, monkeypatch):
+    """Each test starts without cached price snapshots and with an empty snapshot store."""
+    monkeypatch.setattr("parsing.pricer.snapshot_store.SNAPSHOT_DIR", str(tmp_path))
+    poeninja_pricer.invalidate_prices()
+    poeninja_pricer.category_store.clear()
+    yield
+    poeninja_pricer.invalidate_prices()
+    poeninja_pricer.category_store.clear()
+
+
 # -----------------------
 # Tests
 # -----------------------
@@ -68,6 +92,34 @@ def test_find_gem_price_fallback():
     assert result["fallbackUsed"] is True
 
 
+def test_find_gem_price_with_index_quality_fallback():
+    gems_list = [
+        {"name": "Fireball", "gemLevel": 20, "gemQuality": 20, "chaosValue": 3.0, "variant": "20/20"},
+        {"name": "Fireball", "gemLevel": 21, "gemQuality": 20, "chaosValue": 10.0, "variant": "21/20c"},
+        {"name": "Fireball", "gemLevel": 21, "gemQuality": 20, "chaosValue": 99.0, "variant": "21/20c"},
+    ]
+    index = poeninja_pricer.build_gem_index(gems_list)
+    gem = {"nameSpec": "Fireball", "level": 21, "quality": 23}
+    result = poeninja_pricer.find_gem_price(gem, index, MOCK_CHAOS_TO_DIV)
+    # No 21/23 line: falls back to 21/20, first line of the list wins
+    assert result["priceChaos"] == 10.0
+    assert result["matchedLevel"] == 21
+    assert result["matchedQuality"] == 20
+    assert result["fallbackUsed"] is True
+
+
+def test_find_gem_price_name_only_fallback():
+    index = poeninja_pricer.build_gem_index([{"name": "Fireball", "gemLevel": 16, "gemQuality": 5, "chaosValue": 1.0}])
+    result = poeninja_pricer.find_gem_price({"nameSpec": "Fireball", "level": 3, "quality": 0}, index, MOCK_CHAOS_TO_DIV)
+    assert result["matchedLevel"] == 16
+    assert result["fallbackUsed"] is True
+
+
+def test_find_gem_price_not_found():
+    result = poeninja_pricer.find_gem_price({"nameSpec": "Unknown", "level": 1, "quality": 0}, MOCK_GEMS_LIST, MOCK_CHAOS_TO_DIV)
+    assert result["priceChaos"] is None
+
+
 def test_add_prices_to_json_links():
     with patch.object(poeninja_pricer, "fetch_unique_prices", return_value=MOCK_UNIQUE_ITEMS), \
             patch.object(poeninja_pricer, "fetch_gems_with_levels", return_value=MOCK_GEMS_LIST), \
@@ -85,53 +137,306 @@ def test_add_prices_to_json_links():
         assert gems[1]["priceChaos"] == 50.0
 
 
-# Optional: test that fetch functions call requests
-def test_fetch_unique_prices_calls_requests(monkeypatch):
-    called = {}
+def test_add_prices_to_json_uses_cached_snapshots():
+    with patch.object(poeninja_pricer, "fetch_unique_prices", return_value=MOCK_UNIQUE_ITEMS) as uniques, \
+            patch.object(poeninja_pricer, "fetch_gems_with_levels", return_value=MOCK_GEMS_LIST) as gems, \
+            patch.object(poeninja_pricer, "fetch_chaos_to_divine_rate", return_value=MOCK_CHAOS_TO_DIV) as rate:
+        poeninja_pricer.add_prices_to_json(MOCK_POB_JSON, league="Standard")
+        poeninja_pricer.add_prices_to_json(MOCK_POB_JSON, league="Standard")
+
+        # Second call is served from memory
+        assert uniques.call_count == 1
+        assert gems.call_count == 1
+        assert rate.call_count == 1
 
-    def fake_get(url, timeout=10):
-        called["yes"] = url
 
-        class Response:
-            def raise_for_status(self): pass
+def test_get_league_prices_reads_published_snapshot():
+    publish_snapshot("Standard", {
+        "league": "Standard",
+        "fetchedAt": 0,
+        "uniques": MOCK_UNIQUE_ITEMS,
+        "gems": MOCK_GEMS_LIST,
+        "divine": MOCK_CHAOS_TO_DIV,
+    })
+    with patch.object(poeninja_pricer, "fetch_unique_prices") as uniques:
+        prices, gem_index, rate = poeninja_pricer.get_league_prices("Standard")
+        assert not uniques.called
+    assert len(prices) == len(MOCK_UNIQUE_ITEMS)
+    assert prices.find("The Brass Dome", links=6).chaos == 1148.84
+    assert len(gem_index) == len(MOCK_GEMS_LIST)
+    assert rate == MOCK_CHAOS_TO_DIV
 
-            def json(self): return {"lines": []}
 
-        return Response()
+DIVINE_LINES = [{"currencyTypeName": "Divine Orb", "chaosEquivalent": 200}]
+SUPPORT_GEM_LINES = [{"name": "Support Gem", "gemLevel": 1, "gemQuality": 0, "chaosValue": 1.0}]
 
-    monkeypatch.setattr("requests.get", fake_get)
-    poeninja_pricer.fetch_unique_prices("Standard")
-    assert called
+def league_lines(url):
+    """poe.ninja lines of a league priced at 200 chaos per divine with one gem."""
+    return DIVINE_LINES if "Currency" in url else SUPPORT_GEM_LINES
 
+def no_lines(url):
+    return []
 
-def test_fetch_gems_with_levels_calls_requests(monkeypatch):
-    called = {}
 
-    def fake_get(url, timeout=10):
-        called["yes"] = url
+def test_fetch_league_snapshot_reports_failed_parts(fake_ninja):
+    def lines(url):
+        if "SkillGem" in url:
+            raise ConnectionError("down")
+        return DIVINE_LINES
 
-        class Response:
-            def raise_for_status(self): pass
+    fake_ninja(lines)
+    snapshot, errors = poeninja_pricer.fetch_league_snapshot("Standard")
+    assert list(errors) == ["SkillGem"]
+    assert snapshot["gems"] is None
+    assert snapshot["divine"] == 200
 
-            def json(self): return {"lines": []}
 
-        return Response()
+def test_aget_league_prices_fetches_cold_league(fake_ninja):
+    ninja = fake_ninja(league_lines)
+    uniques, gem_index, rate = asyncio.run(poeninja_pricer.aget_league_prices("Standard"))
+    assert len(ninja.urls) == 7
+    assert rate == 200
+    assert len(gem_index) == 1
 
-    monkeypatch.setattr("requests.get", fake_get)
-    poeninja_pricer.fetch_gems_with_levels("Standard")
-    assert called
+    # Second call is served from memory
+    asyncio.run(poeninja_pricer.aget_league_prices("Standard"))
+    assert len(ninja.urls) == 7
+
+
+def test_concurrent_cold_requests_share_one_fetch(fake_ninja):
+    ninja = fake_ninja(league_lines, delay=0.05)
+
+    async def burst():
+        return await asyncio.gather(*(poeninja_pricer.aget_league_prices("Standard") for _ in range(10)))
+
+    results = asyncio.run(burst())
+    assert len(ninja.urls) == 7
+    assert all(rate == 200 for _, _, rate in results)
+
+
+def test_aget_league_prices_refetches_expired_league_off_the_event_loop(fake_ninja, monkeypatch):
+    ninja = fake_ninja(league_lines)
+    monkeypatch.setattr(poeninja_pricer.price_cache, "ttl", 0.05)
+    monkeypatch.setattr(poeninja_pricer.price_cache, "stale_ttl", 0)
+    asyncio.run(poeninja_pricer.aget_league_prices("Standard"))
+    time.sleep(0.1)
+    fetched = len(ninja.urls)
 
+    # Past ttl + stale_ttl the league is cold again: it is fetched without blocking the event loop
+    ninja.delay = 0.1
+
+    async def price_while_ticking():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        prices = await poeninja_pricer.aget_league_prices("Standard")
+        ticker.cancel()
+        return prices, ticks
+
+    (_, _, rate), ticks = asyncio.run(price_while_ticking())
+    assert rate == 200
+    assert len(ninja.urls) > fetched
+    assert ticks >= 5
+
+
+# Optional: test that fetch functions call the shared session
+def test_fetch_unique_prices_calls_requests(fake_ninja):
+    ninja = fake_ninja(no_lines)
+    poeninja_pricer.fetch_unique_prices("Standard")
+    assert ninja.urls
+
+
+def test_fetch_gems_with_levels_calls_requests(fake_ninja):
+    ninja = fake_ninja(no_lines)
+    poeninja_pricer.fetch_gems_with_levels("Standard")
+    assert ninja.urls
 
-def test_fetch_chaos_to_divine_rate(monkeypatch):
-    def fake_get(url, timeout=10):
-        class Response:
-            def raise_for_status(self): pass
 
-            def json(self):
-                return {"lines": [{"currencyTypeName": "Divine Orb", "chaosEquivalent": 200}]}
+def test_fetch_gems_with_levels_keeps_only_matcher_fields(fake_ninja):
+    line = {"name": "Fireball", "variant": "20/20", "gemLevel": 20, "gemQuality": 20, "chaosValue": 3.0,
+            "corrupted": True, "sparkline": {"data": [1, 2]}, "icon": "fireball.png"}
+    fake_ninja(lambda url: [line])
+    gems = poeninja_pricer.fetch_gems_with_levels("Standard")
+    assert gems == [("fireball", "Fireball", "20/20", 20, 20, True, 3.0)]
+    assert gems[0].chaos == 3.0
 
-        return Response()
 
-    monkeypatch.setattr("requests.get", fake_get)
+def test_fetch_chaos_to_divine_rate(fake_ninja):
+    fake_ninja(lambda url: DIVINE_LINES)
     rate = poeninja_pricer.fetch_chaos_to_divine_rate("Standard")
-    assert rate == 200
\ No newline at end of file
+    assert rate == 200
+
+def test_fetch_unique_prices_partial_failure(fake_ninja):
+    def lines(url):
+        if "UniqueJewel" in url:
+            raise TimeoutError("timed out")
+        if "UniqueArmour" in url:
+            return [{"name": "The Brass Dome", "chaosValue": 132.0, "links": 6}]
+        return []
+
+    fake_ninja(lines)
+    prices = poeninja_pricer.fetch_unique_prices("Standard")
+    # Failing category does not drop the others
+    assert prices == [("The Brass Dome", "", "", 6, False, 132.0)]
+
+
+def test_unchanged_categories_reuse_parsed_prices(fake_ninja):
+    def lines(url):
+        if "UniqueArmour" in url:
+            return [{"name": "The Brass Dome", "chaosValue": 132.0}]
+        if "SkillGem" in url:
+            return SUPPORT_GEM_LINES
+        return []
+
+    ninja = fake_ninja(lines, etag='"v1"')
+    uniques = poeninja_pricer.fetch_unique_prices("Standard")
+    gem_index = poeninja_pricer.fetch_gem_index("Standard")
+    # First downloads are plain requests
+    assert ninja.headers == [None] * 6
+
+    # Unchanged categories: same parsed objects, nothing parsed or indexed again
+    assert poeninja_pricer.fetch_unique_prices("Standard") is uniques
+    assert poeninja_pricer.fetch_gem_index("Standard") is gem_index
+    assert uniques == [("The Brass Dome", "", "", 0, False, 132.0)]
+    assert all(h == {"If-None-Match": '"v1"'} for h in ninja.headers[6:])
+
+
+def test_price_pob_batch_shares_prices_and_keeps_order():
+    xml = "<PathOfBuilding><Build className='Witch'/></PathOfBuilding>"
+    code = base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+    prices = (poeninja_pricer.build_unique_index(MOCK_UNIQUE_ITEMS), poeninja_pricer.build_gem_index(MOCK_GEMS_LIST),
+              MOCK_CHAOS_TO_DIV)
+
+    results = list(price_pob_batch([code, "not a pob code", code], prices, workers=2))
+
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[0]["data"]["class"] == "Witch"
+    assert "error" in results[1]["data"]
+    assert results[2]["data"]["class"] == "Witch"
+
+
+def test_price_pob_batch_over_processes_matches_threads():
+    xml = "<PathOfBuilding><Build className='Witch'/></PathOfBuilding>"
+    code = base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+    prices = (poeninja_pricer.build_unique_index(MOCK_UNIQUE_ITEMS), poeninja_pricer.build_gem_index(MOCK_GEMS_LIST),
+              MOCK_CHAOS_TO_DIV)
+    codes = [code, "not a pob code", code]
+
+    threaded = list(price_pob_batch(codes, prices, processes=1))
+    assert list(price_pob_batch(codes, prices, processes=2)) == threaded
+    assert "error" in threaded[1]["data"]
+
+    # Every batch decodes over the same pool
+    pool = shared_decode_pool(2)
+    assert list(price_pob_batch(codes, prices, processes=2)) == threaded
+    assert shared_decode_pool(2) is pool
+
+
+def test_batch_request_size_is_capped():
+    assert len(PobBatchPriceRequest(pob_strings=["code"] * BATCH_MAX_CODES).pob_strings) == BATCH_MAX_CODES
+    with pytest.raises(ValidationError):
+        PobBatchPriceRequest(pob_strings=["code"] * (BATCH_MAX_CODES + 1))
+    with pytest.raises(ValidationError):
+        PobBatchPriceRequest(pob_strings=[])
+
+
+def test_aprice_pob_batch_yields_every_result_in_order():
+    xml = "<PathOfBuilding><Build className='Witch'/></PathOfBuilding>"
+    code = base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+    prices = (poeninja_pricer.build_unique_index(MOCK_UNIQUE_ITEMS), poeninja_pricer.build_gem_index(MOCK_GEMS_LIST),
+              MOCK_CHAOS_TO_DIV)
+
+    async def collect():
+        return [result async for result in aprice_pob_batch([code, "not a pob code", code], prices, workers=2)]
+
+    results = asyncio.run(collect())
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[2]["data"]["class"] == "Witch"
+
+
+def test_apply_league_prices_prices_each_league():
+    cheap_uniques = [dict(line, chaosValue=line["chaosValue"] / 2) for line in MOCK_UNIQUE_ITEMS]
+    prices_by_league = {
+        "Standard": (poeninja_pricer.build_unique_index(MOCK_UNIQUE_ITEMS), poeninja_pricer.build_gem_index(MOCK_GEMS_LIST), MOCK_CHAOS_TO_DIV),
+        "Hardcore": (poeninja_pricer.build_unique_index(cheap_uniques), poeninja_pricer.build_gem_index(MOCK_GEMS_LIST), MOCK_CHAOS_TO_DIV),
+    }
+    pob_json = {"items": [dict(MOCK_POB_JSON["items"][0])], "skills": [{"gems": [dict(g) for g in MOCK_POB_JSON["skills"][0]["gems"]]}]}
+
+    result = poeninja_pricer.apply_league_prices(pob_json, prices_by_league, {"Nope": "No prices available for league Nope"})
+
+    item = result["items"][0]
+    # First league fills the flat fields
+    assert item["priceChaos"] == 1148.84
+    assert item["pricesByLeague"]["Hardcore"]["priceChaos"] == 574.42
+    assert result["skills"][0]["gems"][1]["pricesByLeague"]["Hardcore"]["priceChaos"] == 50.0
+    assert result["leagues"] == ["Standard", "Hardcore"]
+    assert result["totalsByLeague"]["Standard"]["priceChaos"] == pytest.approx(1148.84 + 1.0 + 50.0)
+    assert result["leagueErrors"] == {"Nope": "No prices available for league Nope"}
+
+
+def test_resolve_league_prices_reports_unknown_league(monkeypatch):
+    monkeypatch.setattr(poeninja_pricer, "PRICE_SNAPSHOTS_ONLY", True)
+    publish_snapshot("Standard", {"uniques": MOCK_UNIQUE_ITEMS, "gems": MOCK_GEMS_LIST, "divine": MOCK_CHAOS_TO_DIV})
+
+    prices_by_league, errors = poeninja_pricer.resolve_league_prices(["Standard", "Nope"])
+
+    assert list(prices_by_league) == ["Standard"]
+    assert "Nope" in errors
+
+
+def test_league_without_prices_is_not_fetched_again(fake_ninja):
+    ninja = fake_ninja(no_lines)
+    for _ in range(3):
+        _, errors = poeninja_pricer.resolve_league_prices(["NoSuchLeague"])
+        assert errors == {"NoSuchLeague": "No prices available for league NoSuchLeague"}
+        _, errors = asyncio.run(poeninja_pricer.aresolve_league_prices(["NoSuchLeague"]))
+        assert "NoSuchLeague" in errors
+    fetched = len(ninja.urls)
+    assert 0 < fetched <= 7
+
+    # The mark expires (or is dropped on invalidation) and the league is fetched again
+    poeninja_pricer.invalidate_prices("NoSuchLeague")
+    poeninja_pricer.get_league_prices("NoSuchLeague")
+    assert len(ninja.urls) > fetched
+
+
+def test_unique_item_price_uses_variant_base_and_relic():
+    index = poeninja_pricer.build_unique_index([
+        {"name": "Precursor's Emblem", "baseType": "Topaz Ring", "variant": "Power", "chaosValue": 3.0},
+        {"name": "Precursor's Emblem", "baseType": "Topaz Ring", "variant": "Endurance", "chaosValue": 1.0},
+        {"name": "Grand Spectrum", "baseType": "Viridian Jewel", "chaosValue": 4.0},
+        {"name": "Grand Spectrum", "baseType": "Crimson Jewel", "chaosValue": 6.0},
+        {"name": "The Brass Dome", "baseType": "Gladiator Plate", "itemClass": 9, "chaosValue": 700.0},
+        *MOCK_UNIQUE_ITEMS,
+    ])
+    emblem = {"name": "Precursor's Emblem", "itemBase": "Topaz Ring", "rarity": "UNIQUE", "properties": [
+        {"name": "Variant", "values": "Power"}, {"name": "Variant", "values": "Endurance"},
+        {"name": "Selected Variant", "values": "2"},
+    ]}
+    spectrum = {"name": "Grand Spectrum", "itemBase": "Crimson Jewel", "rarity": "UNIQUE"}
+    relic = dict(MOCK_POB_JSON["items"][0], rarity="RELIC", itemBase="Gladiator Plate")
+
+    assert item_variant(emblem) == "Endurance"
+    assert poeninja_pricer.unique_item_price(emblem, index, None) == (1.0, None)
+    assert poeninja_pricer.unique_item_price(spectrum, index, None) == (6.0, None)
+    # No 6L relic line: the relic unlinked price comes before the regular 6L price
+    assert poeninja_pricer.unique_item_price(relic, index, None) == (700.0, None)
+    assert poeninja_pricer.unique_item_price(MOCK_POB_JSON["items"][0], index, None) == (1148.84, None)
+    # Unknown variant: first line of the unique
+    emblem["properties"][-1]["values"] = "7"
+    assert poeninja_pricer.unique_item_price(emblem, index, None) == (3.0, None)
+
+
+def test_normalize_leagues_dedupes_and_limits():
+    assert poeninja_pricer.normalize_leagues([" Standard", "Standard", "Hardcore"]) == ["Standard", "Hardcore"]
+    with pytest.raises(ValueError):
+        poeninja_pricer.normalize_leagues([])
+    with pytest.raises(ValueError):
+        poeninja_pricer.normalize_leagues([f"L{i}" for i in range(poeninja_pricer.MAX_LEAGUES_PER_REQUEST + 1)])
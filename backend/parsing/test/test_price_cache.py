@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+import pytest
+from ..pricer.price_cache import PriceSnapshotCache, RevalidationStore, SingleFlight
+
+
+# -------------------
+# Fixtures
+# -------------------
+@pytest.fixture
+def counting_loader():
+    """Loader returning an increasing counter, to know how many times it was called."""
+    calls = {"count": 0}
+
+    def loader():
+        calls["count"] += 1
+        return {"value": calls["count"]}
+
+    loader.calls = calls
+    return loader
+
+
+# -------------------
+# Tests
+# -------------------
+def test_get_fresh_entry_is_served_from_memory(counting_loader):
+    cache = PriceSnapshotCache(ttl=60, stale_ttl=60)
+    assert cache.get("Standard", "uniques", counting_loader) == {"value": 1}
+    assert cache.get("Standard", "uniques", counting_loader) == {"value": 1}
+    assert counting_loader.calls["count"] == 1
+
+def test_get_is_keyed_by_league_and_category(counting_loader):
+    cache = PriceSnapshotCache(ttl=60, stale_ttl=60)
+    cache.get("Standard", "uniques", counting_loader)
+    cache.get("Hardcore", "uniques", counting_loader)
+    cache.get("Standard", "gems", counting_loader)
+    assert counting_loader.calls["count"] == 3
+
+def test_get_stale_entry_is_served_while_refreshing():
+    cache = PriceSnapshotCache(ttl=0, stale_ttl=60)
+    cache.put("Standard", "uniques", {"value": "old"})
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return {"value": "new"}
+
+    assert cache.get("Standard", "uniques", loader) == {"value": "old"}
+    assert refreshed.wait(timeout=5)
+
+def test_get_expired_entry_is_reloaded(counting_loader):
+    cache = PriceSnapshotCache(ttl=0, stale_ttl=0)
+    cache.get("Standard", "uniques", counting_loader)
+    assert cache.get("Standard", "uniques", counting_loader) == {"value": 2}
+
+def test_empty_values_are_not_cached():
+    cache = PriceSnapshotCache(ttl=60, stale_ttl=60)
+    cache.get("Standard", "uniques", lambda: {})
+    assert cache.get("Standard", "uniques", lambda: {"value": 1}) == {"value": 1}
+
+def test_storing_the_cached_object_keeps_the_version():
+    cache = PriceSnapshotCache(ttl=60, stale_ttl=60)
+    prices = {"value": 1}
+    cache.put("Standard", "uniques", prices, fetched_at=100.0)
+    version = cache.version("Standard")
+    cache.put("Standard", "uniques", prices)
+    assert cache.version("Standard") == version
+    assert cache.fetched_at("Standard", "uniques") == 100.0
+    cache.put("Standard", "uniques", {"value": 1})
+    assert cache.version("Standard") == version + 1
+
+def test_revalidation_store_memoizes_derived_values():
+    store = RevalidationStore()
+    gems = [1, 2]
+    store.put("Standard", "SkillGem", ('"etag"', None), gems)
+    store.put("Standard", "Currency", None, {"Divine Orb": 200})  # no validator, not kept
+    assert store.validators("Standard", ["SkillGem", "Currency"]) == {"SkillGem": ('"etag"', None)}
+
+    built = []
+    def build(values):
+        built.append(values)
+        return sum(values)
+
+    assert store.derive("Standard", "total", (store.value("Standard", "SkillGem"),), build) == 3
+    assert store.derive("Standard", "total", (store.value("Standard", "SkillGem"),), build) == 3
+    assert len(built) == 1
+    # Equal but new input: rebuilt
+    store.derive("Standard", "total", ([1, 2],), build)
+    assert len(built) == 2
+
+def test_invalidate_league(counting_loader):
+    cache = PriceSnapshotCache(ttl=60, stale_ttl=60)
+    cache.get("Standard", "uniques", counting_loader)
+    cache.get("Hardcore", "uniques", counting_loader)
+    version = cache.version("Standard")
+    cache.invalidate("Standard")
+    assert cache.version("Standard") > version
+    assert cache.fetched_at("Standard", "uniques") is None
+    assert cache.fetched_at("Hardcore", "uniques") is not None
+
+def test_concurrent_misses_share_one_load():
+    cache = PriceSnapshotCache(ttl=60, stale_ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"value": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("Standard", "uniques", loader)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 8
+
+def test_single_flight_shares_errors_then_retries():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing_load():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("down")
+
+    def call():
+        try:
+            flights.do("Standard", failing_load)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2
+    # The failed load is not remembered
+    assert flights.do("Standard", lambda: "ok") == "ok"
+
+def test_single_flight_cancelled_leader_does_not_cancel_waiters():
+    flights = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    async def scenario():
+        leader = asyncio.create_task(flights.ado("Standard", load))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flights.ado("Standard", load)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # The leader's client and one waiter's disconnect during the load
+        leader.cancel()
+        waiters[0].cancel()
+        results = await asyncio.gather(*waiters[1:])
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    assert asyncio.run(scenario()) == [{"value": 1}] * 2
+    assert len(calls) == 1
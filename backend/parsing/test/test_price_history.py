@@ -0,0 +1,139 @@
+from datetime import datetime, timezone
+
+import pytest
+from ..pricer.gem_index import gem_record
+from ..pricer.poeninja_pricer import resolve_league_prices
+from ..pricer.price_history import (
+    HistoryPriceCache,
+    currency_rate_rows,
+    gem_price_rows,
+    get_history_prices,
+    ingest_snapshot,
+    load_history_snapshot,
+    snapshot_as_of,
+    unique_price_rows,
+)
+from ..pricer.unique_index import unique_record
+
+UNIQUE_LINES = [
+    {"name": "Tabula Rasa", "baseType": "Simple Robe", "chaosValue": 10.0},
+    {"name": "Tabula Rasa", "baseType": "Simple Robe", "links": 6, "chaosValue": 12.0},
+    {"name": "Atziri's Splendour", "baseType": "Sacrificial Garb", "variant": "Armour/ES/Life", "chaosValue": 3.0},
+    {"name": "Mageblood", "baseType": "Heavy Belt", "itemClass": 9, "chaosValue": 50000.0},
+    {"name": "No Price", "baseType": "Leather Belt", "chaosValue": None},
+    {"name": "", "baseType": "Leather Belt", "chaosValue": 1.0},
+]
+
+GEM_LINES = [
+    {"name": "Empower Support", "gemLevel": 4, "gemQuality": 0, "chaosValue": 50.0},
+    {"name": "Vaal Arc", "gemLevel": 21, "gemQuality": 20, "corrupted": True, "chaosValue": 30.0},
+    {"name": "Arc", "gemLevel": 20, "gemQuality": 20, "chaosValue": None},
+]
+
+
+def snapshot(fetched_at: datetime, divine: float = 200.0, **parts) -> dict:
+    return {"league": "Standard", "fetchedAt": fetched_at.timestamp(), "uniques": UNIQUE_LINES,
+            "gems": GEM_LINES, "divine": divine, "currency": {"Divine Orb": divine, "Exalted Orb": 15.0},
+            **parts}
+
+
+# -----------------------
+# Snapshot -> rows
+# -----------------------
+def test_unique_price_rows_skip_unpriced_and_nameless_lines():
+    assert unique_price_rows(UNIQUE_LINES) == [
+        ("Tabula Rasa", "Simple Robe", "", None, False, 10.0),
+        ("Tabula Rasa", "Simple Robe", "", 6, False, 12.0),
+        ("Atziri's Splendour", "Sacrificial Garb", "Armour/ES/Life", None, False, 3.0),
+        ("Mageblood", "Heavy Belt", "", None, True, 50000.0),
+    ]
+    # Records give the same rows as the raw lines
+    assert unique_price_rows([unique_record(line) for line in UNIQUE_LINES]) == unique_price_rows(UNIQUE_LINES)
+    assert unique_price_rows(None) == []
+
+def test_gem_price_rows_skip_unpriced_lines():
+    rows = gem_price_rows(GEM_LINES)
+    assert [(name, level, quality, corrupted, chaos) for name, _, level, quality, corrupted, chaos in rows] == [
+        ("Empower Support", 4, 0, False, 50.0),
+        ("Vaal Arc", 21, 20, True, 30.0),
+    ]
+    assert gem_price_rows([gem_record(line) for line in GEM_LINES]) == rows
+    assert gem_price_rows(None) == []
+
+def test_currency_rate_rows_keep_every_currency():
+    rows = currency_rate_rows({"divine": 200.0, "currency": {"Divine Orb": 200.0, "Exalted Orb": 15.0, "Mirror": None}})
+    assert rows == [("Divine Orb", 200.0), ("Exalted Orb", 15.0)]
+
+def test_currency_rate_rows_fall_back_to_divine():
+    assert currency_rate_rows({"divine": 200.0}) == [("Divine Orb", 200.0)]
+    assert currency_rate_rows({"divine": 200.0, "currency": None}) == [("Divine Orb", 200.0)]
+    assert currency_rate_rows({"divine": None}) == []
+
+
+# -----------------------
+# Ingest and query
+# -----------------------
+def test_ingest_snapshot_stores_every_row(db):
+    price_snapshot = ingest_snapshot(snapshot(datetime(2025, 1, 1, tzinfo=timezone.utc)), batch_size=2)
+
+    assert price_snapshot.unique_prices.count() == 4
+    assert price_snapshot.gem_prices.count() == 2
+    assert dict(price_snapshot.currency_rates.values_list("currency", "chaos_equivalent")) == {
+        "Divine Orb": 200.0, "Exalted Orb": 15.0,
+    }
+
+    loaded = load_history_snapshot(price_snapshot)
+    assert loaded["divine"] == 200.0
+    assert loaded["currency"] == {"Divine Orb": 200.0, "Exalted Orb": 15.0}
+    assert unique_price_rows(loaded["uniques"]) == unique_price_rows(UNIQUE_LINES)
+    assert gem_price_rows(loaded["gems"]) == gem_price_rows(GEM_LINES)
+
+def test_ingest_snapshot_without_currency_table_keeps_divine(db):
+    price_snapshot = ingest_snapshot(snapshot(datetime(2025, 1, 1, tzinfo=timezone.utc), currency=None))
+    assert list(price_snapshot.currency_rates.values_list("currency", "chaos_equivalent")) == [("Divine Orb", 200.0)]
+
+def test_history_prices_as_of(db):
+    ingest_snapshot(snapshot(datetime(2025, 1, 1, tzinfo=timezone.utc), divine=200.0))
+    ingest_snapshot(snapshot(datetime(2025, 2, 1, tzinfo=timezone.utc), divine=250.0))
+
+    assert snapshot_as_of("Standard", datetime(2024, 12, 31, tzinfo=timezone.utc)) is None
+    assert snapshot_as_of("Standard", datetime(2025, 1, 15, tzinfo=timezone.utc)).fetched_at.month == 1
+
+    uniques, gems, divine = get_history_prices("Standard", datetime(2025, 3, 1, tzinfo=timezone.utc))
+    assert divine == 250.0
+    assert uniques.find("Tabula Rasa", links=6).chaos == 12.0
+    assert len(gems) == 2
+    assert get_history_prices("Standard", datetime(2025, 1, 15, tzinfo=timezone.utc))[2] == 200.0
+
+    with pytest.raises(ValueError, match="No price history"):
+        get_history_prices("Standard", datetime(2024, 12, 31, tzinfo=timezone.utc))
+
+def test_resolve_league_prices_as_of_queries_in_calling_thread(db):
+    # The in-memory database only exists for the connection of this thread
+    ingest_snapshot(snapshot(datetime(2025, 1, 1, tzinfo=timezone.utc)))
+
+    prices_by_league, errors = resolve_league_prices(["Standard", "Nope"], datetime(2025, 3, 1, tzinfo=timezone.utc))
+
+    assert prices_by_league["Standard"][2] == 200.0
+    assert list(errors) == ["Nope"]
+    assert "No price history" in errors["Nope"]
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+def test_history_prices_accept_naive_dates(db):
+    ingest_snapshot(snapshot(datetime(2025, 1, 1, tzinfo=timezone.utc)))
+    assert get_history_prices("Standard", datetime(2025, 1, 15))[2] == 200.0
+    with pytest.raises(ValueError, match="No price history"):
+        get_history_prices("Standard", datetime(2024, 12, 31, 23, 59))
+
+def test_history_price_cache_keeps_the_last_snapshots():
+    cache = HistoryPriceCache(max_size=2)
+    loads = []
+
+    def loader(snapshot_id):
+        return lambda: loads.append(snapshot_id) or (None, None, snapshot_id)
+
+    for snapshot_id in (1, 2, 1, 3, 2):
+        assert cache.get(snapshot_id, loader(snapshot_id))[2] == snapshot_id
+    # 1 was used again before 3 came in, so 2 was the one evicted
+    assert loads == [1, 2, 3, 2]
+    assert len(cache) == 2
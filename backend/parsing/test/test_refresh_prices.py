@@ -0,0 +1,69 @@
+import pytest
+from django.core.management import call_command
+
+from ..management.commands import refresh_prices
+from ..pricer.snapshot_store import load_snapshot
+
+
+def snapshot(league: str, divine: float = 200.0) -> dict:
+    return {"league": league, "fetchedAt": 1700000000.0, "divine": divine, "currency": {"Divine Orb": divine},
+            "uniques": [{"name": "Headhunter", "baseType": "Leather Belt", "chaosValue": 5000.0}], "gems": []}
+
+
+class StopRefresh(Exception):
+    pass
+
+
+# -------------------
+# Fixtures
+# -------------------
+@pytest.fixture(autouse=True)
+def snapshot_store(tmp_path, monkeypatch):
+    monkeypatch.setattr("parsing.pricer.snapshot_store.SNAPSHOT_DIR", str(tmp_path))
+
+def run_rounds(monkeypatch, rounds: int, *args):
+    """Run the refresh loop for `rounds` rounds."""
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == rounds:
+            raise StopRefresh()
+
+    monkeypatch.setattr(refresh_prices.time, "sleep", sleep)
+    with pytest.raises(StopRefresh):
+        call_command("refresh_prices", "--interval", "1", *args)
+
+
+# -------------------
+# Tests
+# -------------------
+def test_failing_league_does_not_stop_the_others(monkeypatch):
+    def fetch_league_snapshot(league):
+        if league == "Broken":
+            raise RuntimeError("poe.ninja is down")
+        return snapshot(league), {}
+
+    monkeypatch.setattr(refresh_prices, "fetch_league_snapshot", fetch_league_snapshot)
+    run_rounds(monkeypatch, 2, "--leagues", "Broken,Settlers")
+
+    assert load_snapshot("Settlers")["divine"] == 200.0
+    assert load_snapshot("Broken") is None
+
+def test_failed_reprice_reprices_every_build_next_time(monkeypatch):
+    divines = iter([200.0, 250.0, 300.0])
+    calls = []
+
+    def reprice_saved_builds(league, old_snapshot, new_snapshot):
+        calls.append(old_snapshot and old_snapshot["divine"])
+        if len(calls) == 1:
+            raise RuntimeError("database is down")
+        return 0
+
+    monkeypatch.setattr(refresh_prices, "fetch_league_snapshot", lambda league: (snapshot(league, next(divines)), {}))
+    monkeypatch.setattr(refresh_prices, "reprice_saved_builds", reprice_saved_builds)
+    run_rounds(monkeypatch, 3, "--leagues", "Settlers", "--reprice")
+
+    # Second round: every build (no old snapshot), third round: only the changes since the second one
+    assert calls == [None, None, 250.0]
+    assert load_snapshot("Settlers")["divine"] == 300.0
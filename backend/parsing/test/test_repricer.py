@@ -0,0 +1,87 @@
+from ..pricer.gem_index import build_gem_index, slim_gem_lines
+from ..pricer.repricer import (
+    affected_keys,
+    changed_price_keys,
+    price_build_lines,
+    price_lines,
+    reprice_lines,
+)
+from ..pricer.unique_index import build_unique_index, slim_unique_lines
+
+POB_JSON = {
+    "items": [
+        {"name": "The Brass Dome", "rarity": "UNIQUE", "subType": "Body Armour", "5/6Link": 6},
+        {"name": "Headhunter", "rarity": "UNIQUE", "subType": "Belt"},
+        {"name": "Rare Ring", "rarity": "RARE"},
+    ],
+    "skills": [{"gems": [{"nameSpec": "Empower Support", "level": 4, "quality": 0}]}],
+}
+
+def uniques(brass_dome_6l: float = 900.0, headhunter: float = 5000.0) -> list:
+    return slim_unique_lines([
+        {"name": "The Brass Dome", "baseType": "Gladiator Plate", "chaosValue": 132.0},
+        {"name": "The Brass Dome", "baseType": "Gladiator Plate", "links": 6, "chaosValue": brass_dome_6l},
+        {"name": "Headhunter", "baseType": "Leather Belt", "chaosValue": headhunter},
+    ])
+
+
+OLD = {
+    "uniques": uniques(),
+    "gems": slim_gem_lines([{"name": "Empower Support", "gemLevel": 4, "gemQuality": 0, "chaosValue": 50.0}]),
+    "divine": 200.0,
+}
+
+
+def prices_of(snapshot: dict) -> tuple:
+    return build_unique_index(snapshot["uniques"]), build_gem_index(snapshot["gems"]), snapshot["divine"]
+
+
+# -------------------
+# Tests
+# -------------------
+def test_price_lines_keys_uniques_and_gems():
+    lines = price_lines(POB_JSON)
+    assert [line["key"] for line in lines] == ["u:The Brass Dome", "u:Headhunter", "g:empower"]
+    assert lines[0]["links"] == 6
+    assert lines[1]["relic"] is False
+
+
+def test_line_price_reads_lines_stored_without_lookup_fields():
+    line = {"key": "u:The Brass Dome", "name": "The Brass Dome", "links": 6}
+    assert reprice_lines([line], {"u:The Brass Dome"}, prices_of(OLD))
+    assert line["chaos"] == 900.0
+
+
+def test_price_build_lines_totals_chaos():
+    lines, total = price_build_lines(POB_JSON, prices_of(OLD))
+    assert [line["chaos"] for line in lines] == [900.0, 5000.0, 50.0]
+    assert total == 5950.0
+
+
+def test_changed_price_keys_only_reports_differences():
+    new = dict(OLD, uniques=uniques(brass_dome_6l=950.0))
+    assert changed_price_keys(OLD, new) == ({"u:The Brass Dome"}, set())
+    # Same parts (revalidated snapshot): nothing to compare
+    assert changed_price_keys(OLD, dict(OLD)) == (set(), set())
+
+    new_gems = slim_gem_lines([{"name": "Empower Support", "gemLevel": 4, "gemQuality": 0, "chaosValue": 60.0,
+                                "variant": "4"}])
+    keys, variants = changed_price_keys(OLD, dict(OLD, gems=new_gems))
+    assert keys == {"g:empower"}
+    assert variants == {"4"}
+
+
+def test_reprice_lines_only_touches_changed_keys():
+    lines, _ = price_build_lines(POB_JSON, prices_of(OLD))
+    new = dict(OLD, uniques=uniques(brass_dome_6l=1.0, headhunter=4000.0))
+
+    # Only the Headhunter key changed for this build: the Brass Dome line keeps its old price
+    assert reprice_lines(lines, {"u:Headhunter"}, prices_of(new))
+    assert [line["chaos"] for line in lines] == [900.0, 4000.0, 50.0]
+    assert not reprice_lines(lines, {"u:Headhunter"}, prices_of(new))
+
+
+def test_affected_keys_expands_gem_variants():
+    indexed = ["g:vaal fireball", "g:fireball", "u:Vaal Regalia"]
+    assert affected_keys({"g:fireball"}, set(), indexed) == {"g:fireball"}
+    assert affected_keys(set(), {"vaal"}, indexed) == {"g:vaal fireball"}
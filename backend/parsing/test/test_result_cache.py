@@ -0,0 +1,65 @@
+import base64
+import zlib
+import pytest
+from unittest.mock import patch
+from ..pricer import result_cache
+from ..pricer.price_cache import price_cache
+from ..pricer.result_cache import PricedBuildCache, build_cache_key, price_pob_cached
+
+XML = "<PathOfBuilding><Build className='Witch'/></PathOfBuilding>"
+POB_CODE = base64.urlsafe_b64encode(zlib.compress(XML.encode("utf-8"))).decode("utf-8")
+
+
+# -------------------
+# Fixtures
+# -------------------
+@pytest.fixture(autouse=True)
+def clear_caches():
+    price_cache.invalidate()
+    result_cache.priced_build_cache.clear()
+    yield
+    price_cache.invalidate()
+    result_cache.priced_build_cache.clear()
+
+
+# -------------------
+# Tests
+# -------------------
+def test_build_cache_key_ignores_whitespace_and_padding():
+    assert build_cache_key(" abc==\n", "Standard", 1) == build_cache_key("abc", "Standard", 1)
+    assert build_cache_key("abc", "Standard", 1) != build_cache_key("abc", "Hardcore", 1)
+    assert build_cache_key("abc", "Standard", 1) != build_cache_key("abc", "Standard", 2)
+
+def test_lru_eviction():
+    cache = PricedBuildCache(max_size=2)
+    cache.put("a", "Standard", 1, {"a": 1})
+    cache.put("b", "Standard", 1, {"b": 1})
+    cache.get("a", "Standard", 1)
+    cache.put("c", "Standard", 1, {"c": 1})
+    # "b" was the least recently used
+    assert cache.get("b", "Standard", 1) is None
+    assert cache.get("a", "Standard", 1) == {"a": 1}
+    assert len(cache) == 2
+
+def test_new_version_drops_league_entries():
+    cache = PricedBuildCache(max_size=10)
+    cache.put("a", "Standard", 1, {"a": 1})
+    cache.put("h", "Hardcore", 1, {"h": 1})
+    assert cache.get("other", "Standard", 2) is None
+    # Only the Hardcore entry is left
+    assert len(cache) == 1
+    assert cache.get("h", "Hardcore", 1) == {"h": 1}
+
+def test_price_pob_cached_decodes_once_per_snapshot():
+    price_cache.put("Standard", "uniques", {"Headhunter": 1.0})
+    with patch.object(result_cache, "get_league_prices"), \
+            patch.object(result_cache, "add_prices_to_json", side_effect=lambda data, **kwargs: data) as pricer:
+        first = price_pob_cached(POB_CODE, league="Standard")
+        second = price_pob_cached(POB_CODE + "\n", league="Standard")
+        assert first is second
+        assert pricer.call_count == 1
+
+        # A new snapshot invalidates the cached result
+        price_cache.put("Standard", "uniques", {"Headhunter": 2.0})
+        price_pob_cached(POB_CODE, league="Standard")
+        assert pricer.call_count == 2
@@ -0,0 +1,103 @@
+import base64
+import zlib
+
+from ..models import BuildPriceKey, League, SavedBuild
+from ..pricer.gem_index import build_gem_index, slim_gem_lines
+from ..pricer.saved_builds import builds_with_keys, reprice_saved_builds, save_build
+from ..pricer.unique_index import build_unique_index, slim_unique_lines
+
+BUILD_XML = """<PathOfBuilding>
+<Build className="Marauder" ascendClassName="Juggernaut"/>
+<Skills><Skill slot="Helmet"><Gem nameSpec="Vaal Fireball" level="20" quality="0"/></Skill></Skills>
+<Items><Item id="1">Rarity: UNIQUE
+Kaom's Heart
+Glorious Plate</Item><Slot name="Body Armour" itemId="1"/></Items>
+</PathOfBuilding>"""
+
+
+def encode(xml: str) -> str:
+    return base64.urlsafe_b64encode(zlib.compress(xml.encode("utf-8"))).decode("utf-8")
+
+CODE = encode(BUILD_XML)
+# Another build sharing no price key with CODE
+OTHER_CODE = encode(BUILD_XML.replace("Kaom's Heart", "Tabula Rasa").replace("Vaal Fireball", "Arc"))
+
+
+def snapshot(kaom: float = 100.0, vaal_fireball: float = 5.0, divine: float = 200.0, gems: list = None) -> dict:
+    return {
+        "uniques": slim_unique_lines([{"name": "Kaom's Heart", "baseType": "Glorious Plate", "chaosValue": kaom},
+                                      {"name": "Tabula Rasa", "baseType": "Simple Robe", "chaosValue": 10.0}]),
+        "gems": slim_gem_lines((gems or []) + [
+            {"name": "Vaal Fireball", "gemLevel": 20, "gemQuality": 0, "chaosValue": vaal_fireball},
+            {"name": "Arc", "gemLevel": 20, "gemQuality": 0, "chaosValue": 1.0},
+        ]),
+        "divine": divine,
+    }
+
+def prices_of(snapshot: dict) -> tuple:
+    return build_unique_index(snapshot["uniques"]), build_gem_index(snapshot["gems"]), snapshot["divine"]
+
+def totals(build: SavedBuild) -> tuple:
+    build.refresh_from_db()
+    return build.total_chaos, build.total_divine
+
+
+# -------------------
+# Tests
+# -------------------
+def test_save_build_stores_lines_and_price_keys(db):
+    build = save_build(CODE, league="Settlers", name="Jugg", prices=prices_of(snapshot()))
+
+    assert totals(build) == (105.0, 0.53)
+    assert [line["chaos"] for line in build.lines] == [100.0, 5.0]
+    assert sorted(build.price_keys.values_list("key", flat=True)) == ["g:vaal fireball", "u:Kaom's Heart"]
+    assert build.league.name == "Settlers"
+
+def test_reprice_saved_builds_updates_changed_builds_only(db):
+    old = snapshot()
+    build = save_build(CODE, league="Settlers", prices=prices_of(old))
+    other = save_build(OTHER_CODE, league="Settlers", prices=prices_of(old))
+    other_priced_at = other.priced_at
+
+    new = snapshot(kaom=150.0)
+    assert reprice_saved_builds("Settlers", old, new, batch_size=1) == 1
+    assert totals(build) == (155.0, 0.78)
+    assert totals(other) == (11.0, 0.06)
+    assert other.priced_at == other_priced_at
+
+def test_reprice_saved_builds_updates_divine_totals_in_one_query(db):
+    old = snapshot()
+    build = save_build(CODE, league="Settlers", prices=prices_of(old))
+    other = save_build(OTHER_CODE, league="Settlers", prices=prices_of(old))
+
+    # Same chaos prices, new divine rate: no build re-priced, every divine total updated
+    assert reprice_saved_builds("Settlers", old, snapshot(divine=100.0)) == 0
+    assert totals(build) == (105.0, 1.05)
+    assert totals(other) == (11.0, 0.11)
+
+    reprice_saved_builds("Settlers", snapshot(divine=100.0), snapshot(divine=None))
+    assert totals(build) == (105.0, None)
+
+def test_reprice_saved_builds_expands_gem_variants(db):
+    old = snapshot()
+    build = save_build(CODE, league="Settlers", prices=prices_of(old))
+
+    # A "Vaal" variant line of Fireball now prices "Vaal Fireball" (key g:fireball changed, variant "vaal")
+    new = snapshot(gems=[{"name": "Fireball", "variant": "Vaal", "gemLevel": 20, "gemQuality": 0, "chaosValue": 7.0}])
+    assert reprice_saved_builds("Settlers", old, new) == 1
+    assert totals(build) == (107.0, 0.54)
+
+def test_reprice_saved_builds_without_old_snapshot_reprices_everything(db):
+    build = save_build(CODE, league="Settlers", prices=prices_of(snapshot()))
+    assert reprice_saved_builds("Settlers", None, snapshot(kaom=120.0, vaal_fireball=6.0)) == 1
+    assert totals(build) == (126.0, 0.63)
+    assert reprice_saved_builds("Unknown league", None, snapshot()) == 0
+
+def test_builds_with_keys_queries_keys_in_batches(db):
+    build = save_build(CODE, league="Settlers", prices=prices_of(snapshot()))
+    other = save_build(OTHER_CODE, league="Settlers", prices=prices_of(snapshot()))
+    index = BuildPriceKey.objects.filter(league=League.objects.get(name="Settlers"))
+
+    keys = {"u:Kaom's Heart", "g:arc", "g:vaal fireball", "u:Headhunter"}
+    assert builds_with_keys(index, keys, batch_size=1) == sorted([build.pk, other.pk])
+    assert builds_with_keys(index, {"u:Headhunter"}, batch_size=1) == []
@@ -0,0 +1,34 @@
+from ..pricer.snapshot_store import (
+    snapshot_path,
+    publish_snapshot,
+    load_snapshot,
+    load_snapshot_if_changed,
+)
+from ..pricer.unique_index import slim_unique_lines
+
+SNAPSHOT = {"league": "Standard", "fetchedAt": 0,
+            "uniques": slim_unique_lines([{"name": "Headhunter", "baseType": "Leather Belt", "chaosValue": 5000.0}]),
+            "gems": [], "divine": 200.0, "currency": {"Divine Orb": 200.0}}
+
+
+def test_snapshot_path_is_file_system_safe(tmp_path):
+    path = snapshot_path("Hardcore Settlers/SSF", str(tmp_path))
+    assert path.startswith(str(tmp_path))
+    assert "/" not in path[len(str(tmp_path)) + 1:]
+
+def test_publish_and_load_snapshot(tmp_path):
+    publish_snapshot("Standard", SNAPSHOT, str(tmp_path))
+    assert load_snapshot("Standard", str(tmp_path)) == SNAPSHOT
+    # No temporary file left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["Standard.prices"]
+
+def test_load_missing_snapshot(tmp_path):
+    assert load_snapshot("Standard", str(tmp_path)) is None
+    assert load_snapshot_if_changed("Standard", str(tmp_path)) is None
+
+def test_load_snapshot_if_changed(tmp_path):
+    publish_snapshot("Standard", SNAPSHOT, str(tmp_path))
+    assert load_snapshot_if_changed("Standard", str(tmp_path)).to_snapshot() == SNAPSHOT
+    assert load_snapshot_if_changed("Standard", str(tmp_path)) is None
+    publish_snapshot("Standard", dict(SNAPSHOT, divine=210.0), str(tmp_path))
+    assert load_snapshot_if_changed("Standard", str(tmp_path)).divine == 210.0
@@ -1,52 +1,35 @@
-// Récupère la ligue active et le taux 1 Divine -> X Chaos via poe.ninja
-const NINJA_BASE = "https://poe.ninja/api/data";
-const TRADE_BASE = "https://www.pathofexile.com/api/trade/data";
+// Récupère la ligue active et le taux 1 Divine -> X Chaos via le backend (/api/economy),
+// qui sert les snapshots de prix partagés par tous les clients (un seul appel à poe.ninja côté serveur).
+// Le cache navigateur suit les en-têtes HTTP du backend (Cache-Control / ETag).
+const ECONOMY_URL = "http://127.0.0.1:8000/api/economy";
 
-const LS_KEY = "poe:divineRate";        // { league, chaosPerDivine, ts }
-const TTL_MS = 30 * 60 * 1000;          // 30 min de cache
+export async function getEconomy(leagueName) {
+    const url = leagueName ? `${ECONOMY_URL}?league=${encodeURIComponent(leagueName)}` : ECONOMY_URL;
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`Erreur API ${res.status}`);
+    const json = await res.json();
+    if (json?.data?.error) throw new Error(json.data.error);
+    // { league, leagues, chaosPerDivine, divinePerChaos, currency, fetchedAt }
+    return json.data;
+}
 
 export async function getCurrentLeague() {
-    const res = await fetch(`${TRADE_BASE}/leagues`, { credentials: "omit" });
-    if (!res.ok) throw new Error("Failed to load leagues");
-    const data = await res.json();
-    const ids = (data?.result || data).map(x => x.id || x);
-    // prend la première "challenge" non-HC si dispo, sinon Standard
-    const challenge = ids.find(id => !/Standard|Hardcore/i.test(id));
-    return challenge || "Standard";
+    const { league } = await getEconomy();
+    return league;
 }
 
 export async function getDivineRate(leagueName) {
-    // cache
-    try {
-        const cached = JSON.parse(localStorage.getItem(LS_KEY) || "null");
-        if (cached && cached.league === leagueName && Date.now() - cached.ts < TTL_MS) {
-            return cached.chaosPerDivine;
-        }
-    } catch {}
-
-    const url = `${NINJA_BASE}/currencyoverview?league=${encodeURIComponent(leagueName)}&type=Currency`;
-    const res = await fetch(url);
-    if (!res.ok) throw new Error("Failed to load poe.ninja");
-    const json = await res.json();
-    const line = (json?.lines || []).find(l => l.currencyTypeName === "Divine Orb");
-
-    const chaosPerDivine =
-        line?.chaosEquivalent ??
-        (line?.receive?.value ? 1 / line.receive.value : null);
-
+    const { chaosPerDivine } = await getEconomy(leagueName);
     if (!Number.isFinite(chaosPerDivine)) {
         throw new Error("Divine rate not found");
     }
-
-    try {
-        localStorage.setItem(LS_KEY, JSON.stringify({ league: leagueName, chaosPerDivine, ts: Date.now() }));
-    } catch {}
-
     return chaosPerDivine;
 }
 
 export async function getLiveDivineRate() {
-    const league = await getCurrentLeague();
-    const chaosPerDivine = await getDivineRate(league);
+    const { league, chaosPerDivine } = await getEconomy();
+    if (!Number.isFinite(chaosPerDivine)) {
+        throw new Error("Divine rate not found");
+    }
     return { league, chaosPerDivine, divinePerChaos: 1 / chaosPerDivine };
 }